@@ -1,145 +1,1913 @@
 #!/usr/bin/env python3
 
 import pandas as pd
+import numpy as np
 import os
 import sys
+import io
+import csv
+import json
+import gzip
+import bz2
+import lzma
+import queue
+import re
+import time
+import select
+import hashlib
+import pickle
+import tempfile
+import threading
+import functools
+import itertools
+import argparse
+import contextlib
+from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_DIR_NAME = '.crocodile_cache'
+USER_CACHE_NAME = 'crocodile_analyzer'
+PRECOMPUTE_TOP_N = 5
+READ_CHUNK_ROWS = 100000
+DECOMPRESS_BLOCK_SIZE = 1024 * 1024
+DECOMPRESS_QUEUE_BLOCKS = 8
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+REGIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crocodile_regions.csv')
+REGION_LEVELS = ['Country/Region', 'Continent', 'Realm']
+UNKNOWN_REGION = 'Unknown'
+MEASURES = {'length': 'Observed Length (m)', 'weight': 'Observed Weight (kg)'}
+CUBE_DIMENSIONS = ['Common Name', 'Habitat Type', 'Conservation Status', 'Age Class', 'Sex', 'Country/Region']
+PERMUTATION_BLOCK_VALUES = 2000000
+SAMPLE_PER_STRATUM = 200
+SAMPLE_STRATA = ['Common Name', 'Country/Region']
+SAMPLE_Z = 1.96
+SAMPLED_COUNT_COLUMNS = {2: 'Common Name', 5: 'Habitat Type', 6: 'Conservation Status', 7: 'Age Class',
+                         8: 'Sex', 9: 'Country/Region'}
+SAMPLED_MEASURE_COLUMNS = {3: 'Observed Length (m)', 4: 'Observed Weight (kg)'}
+# Extremos e contagens de distintos não se estimam por pesos: a amostra pode não ter as linhas que decidem
+SAMPLING_UNSUPPORTED = {10: "os maiores espécimes podem não estar na amostra",
+                        11: "os espécimes mais pesados podem não estar na amostra",
+                        15: "pares habitat/espécie raros podem não estar na amostra"}
+UNESTIMATED = 'não estimável a partir da amostra'
+MONITOR_WINDOW_DAYS = 30
+MONITOR_BATCH_ROWS = 5000
+MONITOR_POLL_SECONDS = 1.0
+MONITOR_REFRESH_SECONDS = 2.0
+MONITOR_TOP_N = 5
+TAXONOMY_COLUMNS = ['Common Name', 'Scientific Name', 'Family', 'Genus']
+TAXONOMY_LEVELS = ['Family', 'Genus']
+TEXT_COLUMNS = ['Notes', 'Common Name', 'Scientific Name', 'Observer Name']
+TOKEN_PATTERN = re.compile(r"\w+")
+ENDANGERED_STATUS = ['Critically Endangered', 'Endangered', 'Vulnerable']
+
+ANALYSIS_OPTIONS = {
+    1: 'basic_info',
+    2: 'species_count',
+    3: 'size_statistics',
+    4: 'weight_statistics',
+    5: 'habitat_distribution',
+    6: 'conservation_status',
+    7: 'age_class_analysis',
+    8: 'sex_distribution',
+    9: 'country_analysis',
+    10: 'largest_specimens',
+    11: 'heaviest_specimens',
+    12: 'size_categories',
+    13: 'yearly_observations',
+    14: 'correlation_analysis',
+    15: 'species_by_habitat',
+    16: 'adult_vs_juvenile',
+    17: 'endangered_species',
+    18: 'observer_statistics',
+    19: 'missing_data_analysis',
+    20: 'summary_report',
+    21: 'taxonomy_rollup'
+}
+
+ANALYSIS_TITLES = {
+    1: 'Informações básicas do dataset',
+    2: 'Contagem por espécie',
+    3: 'Estatísticas de comprimento',
+    4: 'Estatísticas de peso',
+    5: 'Distribuição por habitat',
+    6: 'Status de conservação',
+    7: 'Análise por classe etária',
+    8: 'Distribuição por sexo',
+    9: 'Análise por país/região',
+    10: 'Maiores espécimes (comprimento)',
+    11: 'Espécimes mais pesados',
+    12: 'Categorização por tamanho',
+    13: 'Observações por ano',
+    14: 'Correlação peso vs comprimento',
+    15: 'Espécies por habitat',
+    16: 'Comparação adulto vs juvenil',
+    17: 'Espécies ameaçadas de extinção',
+    18: 'Estatísticas dos observadores',
+    19: 'Análise de dados faltantes',
+    20: 'Relatório resumo completo',
+    21: 'Observações por família e gênero'
+}
+
+REPORT_FORMATS = {'.txt': 'text', '.json': 'json', '.csv': 'csv', '.md': 'markdown'}
+DEFAULT_REPORT_FILE = 'relatorio_crocodilos.txt'
+DEFAULT_BACKEND = 'pandas'
+SESSION_FORMAT = 1
+SPILL_OVERHEAD = 2
+SPILL_MAX_PARTITIONS = 64
+SPILL_MIN_CHUNK_ROWS = 10000
+MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# Ordem usada para pré-calcular quando ainda não há estatísticas de uso
+DEFAULT_PRECOMPUTE_ORDER = [20, 1, 2, 9, 6, 3, 4, 5, 7, 8, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 21]
+
+
+def analysis_function_name(option):
+    return f"function_{option}_{ANALYSIS_OPTIONS[option]}"
+
+
+def analysis_compute_name(option):
+    return f"compute_{ANALYSIS_OPTIONS[option]}"
+
+
+def _source_directory(source):
+    base = os.path.abspath(source)
+    return base if os.path.isdir(base) else os.path.dirname(base)
+
+
+def user_cache_dir(source):
+    # Cache privado do usuário, um subdiretório por diretório de dados
+    root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    key = hashlib.sha256(_source_directory(source).encode()).hexdigest()[:16]
+    directory = os.path.join(root, USER_CACHE_NAME, key)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
+
+
+def cache_path(source, filename):
+    # Ao lado dos dados; sem permissão de escrita ali, no cache do usuário. Se nenhum dos
+    # dois puder ser usado, OSError: quem chama segue sem persistir
+    directory = os.path.join(_source_directory(source), CACHE_DIR_NAME)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if os.access(directory, os.W_OK):
+            return os.path.join(directory, filename)
+    except OSError:
+        pass
+    return os.path.join(user_cache_dir(source), filename)
+
+
+def is_private_file(handle, directory):
+    # Só o usuário atual pode ter escrito o arquivo: ele e o diretório são dele e de mais ninguém
+    if not hasattr(os, 'getuid'):
+        return True
+    for stat in (os.fstat(handle.fileno()), os.stat(directory)):
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+            return False
+    return True
+
+
+def parse_observation_dates(values):
+    return pd.to_datetime(values, format='%d-%m-%Y', errors='coerce')
+
+
+def is_observation_file(name):
+    return name.endswith('.csv') or any(name.endswith('.csv' + ext) for ext in COMPRESSED_EXTENSIONS)
+
+
+def _open_compressed(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rb')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Leitura de arquivos .zst requer o pacote 'zstandard' (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return None
+
+
+class ThreadedDecompressor(io.RawIOBase):
+
+    # Descomprime em uma thread própria enquanto o pandas faz o parsing dos blocos já prontos.
+    # A fila limitada mantém no máximo max_blocks blocos descomprimidos em memória.
+    def __init__(self, compressed, block_size=DECOMPRESS_BLOCK_SIZE, max_blocks=DECOMPRESS_QUEUE_BLOCKS):
+        super().__init__()
+        self._source = compressed
+        self._queue = queue.Queue(maxsize=max_blocks)
+        self._pending = memoryview(b'')
+        self._eof = False
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pump, args=(block_size,), daemon=True)
+        self._thread.start()
+
+    def _pump(self, block_size):
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(block_size)
+                if not block:
+                    break
+                self._put(block)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(None)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            if self._eof:
+                return 0
+            block = self._queue.get()
+            if block is None:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+                return 0
+            self._pending = memoryview(block)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+def open_observation_file(path):
+    compressed = _open_compressed(path)
+    if compressed is None:
+        return None
+    return io.BufferedReader(ThreadedDecompressor(compressed), DECOMPRESS_BLOCK_SIZE)
+
+
+def iter_observation_chunks(path, chunksize=None, usecols=None):
+    chunksize = chunksize or READ_CHUNK_ROWS
+    stream = open_observation_file(path)
+    try:
+        with pd.read_csv(stream if stream is not None else path, chunksize=chunksize, usecols=usecols) as reader:
+            for chunk in reader:
+                yield chunk
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+def read_observations(path, transform=None, usecols=None, chunksize=None):
+    frames = []
+    header = None
+    for chunk in iter_observation_chunks(path, chunksize, usecols):
+        if header is None:
+            header = chunk.iloc[0:0]
+        if transform is not None:
+            chunk = transform(chunk)
+        if len(chunk):
+            frames.append(chunk)
+    if not frames:
+        return header if header is not None else pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_observation_header(path):
+    chunks = iter_observation_chunks(path, chunksize=1)
+    try:
+        return next(chunks).iloc[0:0]
+    finally:
+        chunks.close()
+
+
+def _as_filter_set(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return set(value)
+    return {value}
+
+
+class PartitionCatalog:
+
+    METADATA_COLUMNS = ['Date of Observation', 'Country/Region', 'Common Name']
+
+    def __init__(self, source):
+        self.source = source
+        self.paths = self._discover(source)
+        try:
+            self.metadata_file = cache_path(source, 'partitions.json')
+        except OSError:
+            self.metadata_file = None
+        self.partitions = self._load_metadata()
+
+    @staticmethod
+    def is_partitioned(source):
+        return os.path.isdir(source) or source.endswith('.json')
+
+    def _discover(self, source):
+        if os.path.isdir(source):
+            paths = []
+            for root, dirs, files in os.walk(source):
+                dirs[:] = sorted(d for d in dirs if d != CACHE_DIR_NAME)
+                paths.extend(os.path.join(root, f) for f in sorted(files) if is_observation_file(f))
+            return paths
+
+        with open(source) as f:
+            manifest = json.load(f)
+        entries = manifest['partitions'] if isinstance(manifest, dict) else manifest
+        base = os.path.dirname(os.path.abspath(source))
+        return [os.path.join(base, entry if isinstance(entry, str) else entry['path']) for entry in entries]
+
+    def _load_metadata(self):
+        cached = {}
+        if self.metadata_file is not None:
+            try:
+                with open(self.metadata_file) as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = {}
+
+        partitions = []
+        changed = False
+        for path in self.paths:
+            stat = os.stat(path)
+            entry = cached.get(path)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                entry = self._scan(path, stat)
+                changed = True
+            partitions.append(entry)
+
+        if self.metadata_file is not None and (changed or len(cached) != len(partitions)):
+            try:
+                with open(self.metadata_file, 'w') as f:
+                    json.dump({p['path']: p for p in partitions}, f, indent=2)
+            except OSError:
+                pass
+        return partitions
+
+    def _scan(self, path, stat):
+        frame = read_observations(path, usecols=self.METADATA_COLUMNS)
+        dates = parse_observation_dates(frame['Date of Observation']).dropna()
+        return {
+            'path': path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'rows': len(frame),
+            'min_date': dates.min().strftime('%Y-%m-%d') if len(dates) else None,
+            'max_date': dates.max().strftime('%Y-%m-%d') if len(dates) else None,
+            'countries': sorted(frame['Country/Region'].dropna().unique().tolist()),
+            'species': sorted(frame['Common Name'].dropna().unique().tolist())
+        }
+
+    def total_rows(self):
+        return sum(p['rows'] for p in self.partitions)
+
+    def prune(self, country=None, year=None, species=None):
+        countries = _as_filter_set(country)
+        years = _as_filter_set(year)
+        species_set = _as_filter_set(species)
+
+        selected = []
+        for partition in self.partitions:
+            if countries is not None and countries.isdisjoint(partition['countries']):
+                continue
+            if species_set is not None and species_set.isdisjoint(partition['species']):
+                continue
+            if years is not None:
+                if partition['min_date'] is None:
+                    continue
+                first, last = int(partition['min_date'][:4]), int(partition['max_date'][:4])
+                if not any(first <= int(y) <= last for y in years):
+                    continue
+            selected.append(partition)
+        return selected
+
+
+@functools.lru_cache(maxsize=None)
+def load_region_hierarchy(path=REGIONS_FILE):
+    return pd.read_csv(path).set_index('Country/Region')
+
+
+def aggregate_measures(frame, keys, dropna=True, weights=None):
+    if weights is not None:
+        return _aggregate_weighted_measures(frame, keys, dropna, weights)
+    columns = {'count': (keys[0], 'size')}
+    narrow = frame[keys + list(MEASURES.values())]
+    squares = {}
+    for name, column in MEASURES.items():
+        squares[f"{name}_sq"] = narrow[column] ** 2
+        columns[f"{name}_n"] = (column, 'count')
+        columns[f"{name}_sum"] = (column, 'sum')
+        columns[f"{name}_sumsq"] = (f"{name}_sq", 'sum')
+        columns[f"{name}_min"] = (column, 'min')
+        columns[f"{name}_max"] = (column, 'max')
+    narrow = narrow.assign(**squares)
+    return narrow.groupby(keys, observed=True, dropna=dropna).agg(**columns).reset_index()
+
+
+def _aggregate_weighted_measures(frame, keys, dropna, weights):
+    # Mesmas colunas combináveis, mas cada linha conta pelo seu peso amostral
+    extra = {'_weight': weights}
+    columns = {'count': ('_weight', 'sum')}
+    for name, column in MEASURES.items():
+        values = frame[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        extra[f"{name}_w"] = np.where(valid, weights, 0.0)
+        extra[f"{name}_wy"] = np.where(valid, weights * values, 0.0)
+        extra[f"{name}_wyy"] = np.where(valid, weights * values ** 2, 0.0)
+        columns[f"{name}_n"] = (f"{name}_w", 'sum')
+        columns[f"{name}_sum"] = (f"{name}_wy", 'sum')
+        columns[f"{name}_sumsq"] = (f"{name}_wyy", 'sum')
+        columns[f"{name}_min"] = (column, 'min')
+        columns[f"{name}_max"] = (column, 'max')
+    narrow = frame[keys + list(MEASURES.values())].assign(**extra)
+    return narrow.groupby(keys, observed=True, dropna=dropna).agg(**columns).reset_index()
+
+
+def rollup_measures(cube, keys):
+    columns = {'count': 'sum'}
+    for name in MEASURES:
+        columns.update({f"{name}_n": 'sum', f"{name}_sum": 'sum', f"{name}_sumsq": 'sum',
+                        f"{name}_min": 'min', f"{name}_max": 'max'})
+    if not keys:
+        return cube.agg(columns).to_frame().T
+    return cube.groupby(list(keys), observed=True).agg(columns).reset_index()
+
+
+def finalize_measures(cube):
+    result = cube.copy()
+    for name in MEASURES:
+        n = result[f"{name}_n"]
+        total = result[f"{name}_sum"]
+        result[f"{name}_mean"] = total / n.where(n > 0)
+        variance = (result[f"{name}_sumsq"] - total ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+        result[f"{name}_std"] = variance.clip(lower=0) ** 0.5
+    return result
+
+
+def parse_memory_size(text):
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Tamanho de memória inválido: {text} (ex.: 512M, 2G)")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2).upper()])
+
+
+def estimated_grouping_bytes(frame, columns):
+    # Estado intermediário de um groupby: as colunas envolvidas mais códigos, hashes e cópias
+    return int(frame[columns].memory_usage(deep=True, index=False).sum()) * SPILL_OVERHEAD
+
+
+def _read_spilled(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def spill_groupby(frame, keys, columns, aggregate, memory_limit, where=None):
+    # Agregação particionada por hash: os blocos de linhas são distribuídos em partições
+    # gravadas em arquivos temporários e cada partição, que contém todas as linhas das
+    # suas chaves, é agregada sozinha; os resultados têm chaves disjuntas
+    needed = estimated_grouping_bytes(frame, columns)
+    partitions = int(min(SPILL_MAX_PARTITIONS, max(2, np.ceil(needed / memory_limit))))
+    chunk_rows = max(SPILL_MIN_CHUNK_ROWS, int(len(frame) * memory_limit / max(needed, 1)))
+    with tempfile.TemporaryDirectory(prefix='crocodile-spill-') as directory:
+        paths = [os.path.join(directory, f"part-{i}.pkl") for i in range(partitions)]
+        handles = [open(path, 'wb') for path in paths]
+        try:
+            for start in range(0, len(frame), chunk_rows):
+                chunk = frame.iloc[start:start + chunk_rows][columns]
+                chunk = chunk.assign(_row=np.arange(start, start + len(chunk))).dropna(subset=keys)
+                if where is not None:
+                    chunk = chunk[where(chunk)]
+                buckets = pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() % partitions
+                order = np.argsort(buckets, kind='stable')
+                bounds = np.searchsorted(buckets[order], np.arange(partitions + 1))
+                for bucket in np.flatnonzero(np.diff(bounds)):
+                    pickle.dump(chunk.iloc[order[bounds[bucket]:bounds[bucket + 1]]], handles[bucket],
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            for handle in handles:
+                handle.close()
+        for path in paths:
+            pieces = list(_read_spilled(path))
+            if pieces:
+                yield aggregate(pd.concat(pieces, ignore_index=True))
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+class PandasBackend:
+
+    # Interface mínima usada pelas análises; os demais backends devolvem os
+    # mesmos objetos pandas para que a saída seja idêntica.
+    name = 'pandas'
+
+    def group_measures(self, frame, keys, dropna=True):
+        return aggregate_measures(frame, keys, dropna=dropna)
+
+    def value_counts(self, frame, column):
+        return frame[column].value_counts()
+
+    def nunique(self, frame, column):
+        return frame[column].nunique()
+
+    def null_counts(self, frame):
+        return frame.isnull().sum()
+
+    def measure_statistics(self, frame, column):
+        values = frame[column].dropna()
+        return {
+            'mean': values.mean(),
+            'median': values.median(),
+            'std': values.std(),
+            'min': values.min(),
+            'max': values.max(),
+            'q1': values.quantile(0.25),
+            'q3': values.quantile(0.75),
+            'count': len(values)
+        }
+
+    def year_counts(self, frame, column):
+        # Datas inválidas ficam de fora sem transformar os anos em float
+        years = parse_observation_dates(frame[column]).dt.year.dropna().astype(np.int32)
+        return years.value_counts().sort_index()
+
+
+class PolarsBackend(PandasBackend):
+
+    name = 'polars'
+
+    def __init__(self):
+        try:
+            import polars
+        except ImportError:
+            raise RuntimeError("Backend 'polars' requer o pacote 'polars' (pip install polars)")
+        self.pl = polars
+        self._lock = threading.Lock()
+        self._source = None
+        self._table = None
+
+    def _frame(self, frame):
+        # Conversão coluna a coluna (não exige pyarrow), reaproveitada enquanto o DataFrame for o mesmo
+        with self._lock:
+            if self._source is not frame:
+                columns = []
+                for column in frame.columns:
+                    values = frame[column]
+                    if pd.api.types.is_numeric_dtype(values.dtype):
+                        columns.append(self.pl.Series(column, values.to_numpy(), nan_to_null=True))
+                    else:
+                        values = values.astype(object)
+                        columns.append(self.pl.Series(column, values.where(values.notna(), None).tolist(),
+                                                      dtype=self.pl.String))
+                self._table, self._source = self.pl.DataFrame(columns), frame
+            return self._table
+
+    def group_measures(self, frame, keys, dropna=True):
+        pl = self.pl
+        aggregations = [pl.len().alias('count')]
+        for name, column in MEASURES.items():
+            values = pl.col(column)
+            aggregations += [values.count().alias(f"{name}_n"), values.sum().alias(f"{name}_sum"),
+                             (values * values).sum().alias(f"{name}_sumsq"),
+                             values.min().alias(f"{name}_min"), values.max().alias(f"{name}_max")]
+        table = self._frame(frame)
+        if dropna:
+            table = table.drop_nulls(keys)
+        result = table.group_by(keys).agg(aggregations)
+        return _as_measure_frame(pd.DataFrame(result.to_dict(as_series=False)), keys)
+
+    def value_counts(self, frame, column):
+        result = self._frame(frame).get_column(column).drop_nulls().value_counts(sort=False)
+        counts = pd.Series(result['count'].to_list(), index=pd.Index(result[column].to_list(), name=column),
+                           name='count', dtype=np.int64)
+        return _sort_counts(frame, column, counts)
+
+    def nunique(self, frame, column):
+        return self._frame(frame).get_column(column).drop_nulls().n_unique()
+
+    def null_counts(self, frame):
+        counts = self._frame(frame).null_count().row(0)
+        return pd.Series(counts, index=frame.columns, dtype=np.int64)
+
+    def measure_statistics(self, frame, column):
+        values = self._frame(frame).get_column(column).drop_nulls()
+        return _as_statistics({
+            'mean': values.mean(),
+            'median': None,
+            'std': values.std(),
+            'min': values.min(),
+            'max': values.max(),
+            'q1': None,
+            'q3': None,
+            'count': len(values)
+        }, lambda positions: values.sort().gather(positions).to_numpy())
+
+    def year_counts(self, frame, column):
+        pl = self.pl
+        years = (self._frame(frame).get_column(column)
+                 .str.strptime(pl.Date, '%d-%m-%Y', strict=False).dt.year().drop_nulls())
+        result = years.value_counts().sort(column)
+        return pd.Series(result['count'].to_list(), index=pd.Index(result[column].to_numpy(), name=column),
+                         name='count', dtype=np.int64)
+
+
+class DuckDBBackend(PandasBackend):
+
+    name = 'duckdb'
+
+    def __init__(self):
+        try:
+            import duckdb
+        except ImportError:
+            raise RuntimeError("Backend 'duckdb' requer o pacote 'duckdb' (pip install duckdb)")
+        # Banco embutido em memória: consulta o DataFrame diretamente, sem servidor
+        self.connection = duckdb.connect()
+        self._lock = threading.Lock()
+        self._source = None
+
+    def _query(self, frame, sql, *parameters):
+        with self._lock:
+            if self._source is not frame:
+                # Copiado uma vez para o armazenamento colunar do DuckDB enquanto o DataFrame for o mesmo
+                self.connection.register('source_frame', frame)
+                self.connection.execute("CREATE OR REPLACE TABLE observations AS SELECT * FROM source_frame")
+                self.connection.unregister('source_frame')
+                self._source = frame
+            return self.connection.execute(sql, list(parameters)).df()
+
+    def group_measures(self, frame, keys, dropna=True):
+        selected = [_quote(key) for key in keys]
+        aggregations = ['count(*) AS "count"']
+        for name, column in MEASURES.items():
+            column = _quote(column)
+            aggregations += [f'count({column}) AS "{name}_n"', f'coalesce(sum({column}), 0) AS "{name}_sum"',
+                             f'coalesce(sum({column} * {column}), 0) AS "{name}_sumsq"',
+                             f'min({column}) AS "{name}_min"', f'max({column}) AS "{name}_max"']
+        where = f" WHERE {' AND '.join(f'{key} IS NOT NULL' for key in selected)}" if dropna else ''
+        sql = (f"SELECT {', '.join(selected + aggregations)} FROM observations{where} "
+               f"GROUP BY {', '.join(selected)}")
+        return _as_measure_frame(self._query(frame, sql), keys)
+
+    def value_counts(self, frame, column):
+        result = self._query(frame, f"SELECT {_quote(column)} AS value, count(*) AS n FROM observations "
+                                    f"WHERE {_quote(column)} IS NOT NULL GROUP BY 1")
+        counts = pd.Series(result['n'].to_numpy(dtype=np.int64), name='count',
+                           index=pd.Index(result['value'].astype(object).to_numpy(), name=column))
+        return _sort_counts(frame, column, counts)
+
+    def nunique(self, frame, column):
+        return int(self._query(frame, f"SELECT count(DISTINCT {_quote(column)}) AS n FROM observations")['n'][0])
+
+    def null_counts(self, frame):
+        sql = ', '.join(f"count(*) - count({_quote(column)})" for column in frame.columns)
+        counts = self._query(frame, f"SELECT {sql} FROM observations").iloc[0].to_numpy(dtype=np.int64)
+        return pd.Series(counts, index=frame.columns)
+
+    def measure_statistics(self, frame, column):
+        column = _quote(column)
+        result = self._query(frame, f"SELECT avg({column}) AS mean, NULL AS median, stddev_samp({column}) AS std, "
+                                    f"min({column}) AS min, max({column}) AS max, NULL AS q1, NULL AS q3, "
+                                    f"count({column}) AS count FROM observations")
+
+        def pick(positions):
+            ranked = self._query(frame, f"SELECT x FROM (SELECT {column} AS x, row_number() OVER (ORDER BY {column}) - 1 "
+                                        f"AS i FROM observations WHERE {column} IS NOT NULL) "
+                                        f"WHERE i = ANY($1) ORDER BY i", [int(p) for p in positions])
+            return ranked['x'].to_numpy(dtype=float)
+
+        return _as_statistics(result.iloc[0].to_dict(), pick)
+
+    def year_counts(self, frame, column):
+        result = self._query(frame, f"SELECT year(try_strptime({_quote(column)}, '%d-%m-%Y')) AS year, "
+                                    f"count(*) AS n FROM observations GROUP BY 1 HAVING year IS NOT NULL ORDER BY 1")
+        return pd.Series(result['n'].to_numpy(dtype=np.int64), name='count',
+                         index=pd.Index(result['year'].to_numpy(dtype=np.int32), name=column))
+
+
+def _as_measure_frame(result, keys):
+    # Mesmos tipos e a mesma ordem (chaves ordenadas) que o groupby do pandas
+    for column in result.columns:
+        if column == 'count' or column.endswith('_n'):
+            result[column] = result[column].astype(np.int64)
+        elif column not in keys:
+            result[column] = result[column].astype(float)
+    for key in keys:
+        if isinstance(result[key].dtype, pd.CategoricalDtype):
+            result[key] = result[key].astype(object)
+    return result.sort_values(keys, kind='stable', na_position='last').reset_index(drop=True)
+
+
+def _as_statistics(values, pick):
+    statistics = {key: (np.nan if value is None or pd.isna(value) else float(value)) for key, value in values.items()}
+    statistics['count'] = count = int(values['count'])
+    if count:
+        # Só os vizinhos de cada quantil saem do backend; a interpolação linear é a mesma do numpy
+        quantiles = {'q1': 0.25, 'median': 0.5, 'q3': 0.75}
+        positions = {key: (count - 1) * q for key, q in quantiles.items()}
+        needed = sorted({int(np.floor(p)) for p in positions.values()} |
+                        {min(int(np.floor(p)) + 1, count - 1) for p in positions.values()})
+        ranked = dict(zip(needed, pick(needed)))
+        for key, position in positions.items():
+            below = int(np.floor(position))
+            neighbours = [ranked[below], ranked[min(below + 1, count - 1)]]
+            statistics[key] = float(np.quantile(neighbours, position - below))
+    return statistics
+
+
+def _sort_counts(frame, column, counts):
+    # Empates na ordem de primeira aparição, como no value_counts() do pandas
+    order = pd.Index(pd.unique(frame[column].dropna()))
+    counts = counts.iloc[np.argsort(order.get_indexer(counts.index), kind='stable')]
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+COMPUTE_BACKENDS = {'pandas': PandasBackend, 'polars': PolarsBackend, 'duckdb': DuckDBBackend}
+
+
+def get_backend(backend=None):
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    if not isinstance(backend, str):
+        return backend
+    if backend not in COMPUTE_BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(COMPUTE_BACKENDS)})")
+    return COMPUTE_BACKENDS[backend]()
+
+
+class ObservationCube:
+
+    # Uma célula por combinação observada das dimensões categóricas, com as
+    # dimensões em Categorical (códigos inteiros) e medidas combináveis.
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def build(cls, frame, weights=None, backend=None):
+        # Categorias na ordem de aparição para que value_counts() empate como no pandas
+        categories = {dim: pd.unique(frame[dim].dropna()) for dim in CUBE_DIMENSIONS}
+        if weights is None and backend is not None and backend.name != 'pandas':
+            cells = backend.group_measures(frame, CUBE_DIMENSIONS, dropna=False)
+            for dim in CUBE_DIMENSIONS:
+                cells[dim] = pd.Categorical(cells[dim], categories=categories[dim])
+            return cls(cells.sort_values(CUBE_DIMENSIONS, kind='stable', na_position='last').reset_index(drop=True))
+        keys = {dim: pd.Categorical(frame[dim], categories=categories[dim]) for dim in CUBE_DIMENSIONS}
+        work = frame[list(MEASURES.values())].assign(**keys)
+        cells = aggregate_measures(work, CUBE_DIMENSIONS, dropna=False, weights=weights)
+        if weights is not None:
+            # Contagens estimadas a partir da amostra são arredondadas para observações inteiras
+            cells['count'] = cells['count'].round().astype(np.int64)
+        return cls(cells)
+
+    def _select(self, where):
+        cells = self.cells
+        for dimension, value in (where or {}).items():
+            cells = cells[cells[dimension].isin(_as_filter_set(value))]
+        return cells
+
+    def rollup(self, by=(), where=None):
+        return rollup_measures(self._select(where), list(by))
+
+    def summary(self, by=(), where=None):
+        return finalize_measures(self.rollup(by, where))
+
+    def value_counts(self, dimension, where=None):
+        counts = self._select(where).groupby(dimension, observed=True)['count'].sum()
+        counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        return counts.rename('count')
+
+    def total(self, where=None):
+        return int(self._select(where)['count'].sum())
+
+    def save(self, path):
+        arrays = {}
+        for i, dimension in enumerate(CUBE_DIMENSIONS):
+            column = self.cells[dimension]
+            arrays[f"codes_{i}"] = column.cat.codes.to_numpy()
+            arrays[f"categories_{i}"] = np.array([str(c) for c in column.cat.categories], dtype=str)
+        for column in self.cells.columns.drop(CUBE_DIMENSIONS):
+            arrays[f"measure_{column}"] = self.cells[column].to_numpy()
+        temporary = path + '.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as arrays:
+                columns = {}
+                for i, dimension in enumerate(CUBE_DIMENSIONS):
+                    columns[dimension] = pd.Categorical.from_codes(arrays[f"codes_{i}"], arrays[f"categories_{i}"])
+                for key in arrays.files:
+                    if key.startswith('measure_'):
+                        columns[key[len('measure_'):]] = arrays[key]
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(pd.DataFrame(columns))
+
+
+class StratifiedReservoir:
+
+    # Reservatório por estrato (espécie x país): cada linha recebe uma chave aleatória e
+    # ficam as per_stratum menores chaves do estrato, o que equivale a uma amostra
+    # uniforme sem reposição dentro dele; a memória não depende do tamanho da fonte
+    def __init__(self, per_stratum=SAMPLE_PER_STRATUM, seed=None):
+        self.per_stratum = per_stratum
+        self.rng = np.random.default_rng(seed)
+        self.population = Counter()
+        self.rows_seen = 0
+        self.header = None
+        self._pool = None
+        self._thresholds = {}
+
+    @staticmethod
+    def stratum_labels(frame):
+        labels = [frame[column].astype(object).fillna('').astype(str) for column in SAMPLE_STRATA]
+        return (labels[0] + '\x1f' + labels[1]).to_numpy(dtype=object)
+
+    def add(self, frame):
+        if self.header is None:
+            self.header = frame.iloc[0:0]
+        if not len(frame):
+            return
+        labels = pd.Series(self.stratum_labels(frame))
+        self.population.update(labels.value_counts().to_dict())
+        keys = self.rng.random(len(frame))
+        rows = np.arange(self.rows_seen, self.rows_seen + len(frame))
+        self.rows_seen += len(frame)
+
+        # Estrato cheio só aceita chaves abaixo da maior que ele guarda: o resto do bloco é descartado antes de ordenar
+        candidates = keys < labels.map(self._thresholds).fillna(1.0).to_numpy()
+        if not candidates.any():
+            return
+        chunk = frame[candidates].assign(_stratum=labels.to_numpy()[candidates], _key=keys[candidates],
+                                         _row=rows[candidates])
+        pool = chunk if self._pool is None else pd.concat([self._pool, chunk], ignore_index=True)
+        pool = pool.sort_values('_key', kind='stable')
+        self._pool = pool[pool.groupby('_stratum', sort=False).cumcount().to_numpy() < self.per_stratum]
+        limits = self._pool.groupby('_stratum', sort=False)['_key'].agg(['size', 'max'])
+        self._thresholds = limits.loc[limits['size'] >= self.per_stratum, 'max'].to_dict()
+
+    def result(self):
+        # Amostra na ordem original da fonte, com o estrato de cada linha e N_h por estrato
+        if self._pool is None:
+            header = self.header if self.header is not None else pd.DataFrame()
+            return header, np.array([], dtype=np.int64), np.array([], dtype=float)
+        pool = self._pool.sort_values('_row')
+        codes, strata = pd.factorize(pool['_stratum'])
+        population = np.array([self.population[label] for label in strata], dtype=float)
+        sample = pool.drop(columns=['_stratum', '_key', '_row']).reset_index(drop=True)
+        return sample, codes, population
+
+
+def stratified_count_margins(strata, population, values):
+    # Variância do total estimado de cada categoria: soma por estrato de
+    # N_h^2 (1 - n_h/N_h) p_hc (1 - p_hc) / (n_h - 1)
+    sizes = np.bincount(strata, minlength=len(population)).astype(float)
+    frame = pd.DataFrame({'stratum': strata, 'value': values}).dropna()
+    counts = frame.groupby(['value', 'stratum'], sort=False).size().reset_index(name='hits')
+    h = counts['stratum'].to_numpy()
+    share = counts['hits'].to_numpy() / sizes[h]
+    dof = np.where(sizes[h] > 1, sizes[h] - 1, np.inf)
+    counts['variance'] = population[h] ** 2 * (1 - sizes[h] / population[h]) * share * (1 - share) / dof
+    return SAMPLE_Z * np.sqrt(counts.groupby('value', sort=False)['variance'].sum())
+
+
+def stratified_mean_margin(strata, population, values):
+    sizes = np.bincount(strata, minlength=len(population)).astype(float)
+    valid = ~np.isnan(values)
+    strata, values = strata[valid], values[valid]
+    n = np.bincount(strata, minlength=len(population)).astype(float)
+    if n.sum() < 2:
+        return np.nan
+    totals = np.bincount(strata, weights=values, minlength=len(population))
+    squares = np.bincount(strata, weights=values ** 2, minlength=len(population))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = totals / n
+        variances = np.where(n > 1, (squares - n * means ** 2) / (n - 1), 0.0)
+        # N_h com medida presente, estimado pela fração de não faltantes da amostra do estrato
+        present = population * np.where(sizes > 0, n / sizes, 0.0)
+        share = present / present.sum()
+        variance = np.nansum(np.where(n > 0, share ** 2 * (1 - n / present) * variances / n, 0.0))
+    return SAMPLE_Z * np.sqrt(max(variance, 0.0))
+
+
+def weighted_quantile(values, weights, q):
+    order = np.argsort(values, kind='stable')
+    values, weights = values[order], weights[order]
+    positions = np.cumsum(weights) - weights / 2
+    return float(np.interp(q * weights.sum(), positions, values)) if len(values) else np.nan
+
+
+class ObserverIndex:
+
+    # Perfil por observador (linhas, datas, espécies, países e medidas combináveis),
+    # construído numa passada vetorizada e atualizado a cada ingestão
+    def __init__(self):
+        self.profiles = {}
+        self.total_observations = 0
+        self._ranking = None
+
+    @classmethod
+    def build(cls, frame):
+        index = cls()
+        index.update(frame, 0)
+        return index
+
+    def update(self, frame, offset):
+        codes, observers = pd.factorize(frame['Observer Name'])
+        valid = codes >= 0
+        if not valid.any():
+            return
+        codes = codes[valid]
+        positions = np.arange(offset, offset + len(frame))[valid]
+        counts = np.bincount(codes, minlength=len(observers))
+        rows_by_code = np.split(positions[np.argsort(codes, kind='stable')], np.cumsum(counts)[:-1])
+
+        work = pd.DataFrame({
+            'code': codes,
+            'date': parse_observation_dates(frame['Date of Observation']).to_numpy()[valid],
+            'species': frame['Common Name'].to_numpy()[valid],
+            'country': frame['Country/Region'].to_numpy()[valid]
+        })
+        for column in MEASURES.values():
+            work[column] = frame[column].to_numpy()[valid]
+        grouped = work.groupby('code')
+        first_dates = grouped['date'].min().tolist()
+        last_dates = grouped['date'].max().tolist()
+        species = self._distinct_by_code(codes, work['species'], len(observers))
+        countries = self._distinct_by_code(codes, work['country'], len(observers))
+        measures = aggregate_measures(work, ['code']).drop(columns=['code', 'count']).to_dict('records')
+
+        for code, name in enumerate(observers):
+            update = {
+                'rows': rows_by_code[code],
+                'count': int(counts[code]),
+                'first_date': first_dates[code],
+                'last_date': last_dates[code],
+                'species': species[code],
+                'countries': countries[code],
+                'measures': measures[code]
+            }
+            self._merge(name, update)
+        self.total_observations += int(counts.sum())
+        self._ranking = None
+
+    @staticmethod
+    def _distinct_by_code(codes, values, groups):
+        # Pares (observador, valor) distintos via códigos inteiros, sem apply por grupo
+        value_codes, uniques = pd.factorize(values)
+        valid = value_codes >= 0
+        keys = np.unique(codes[valid].astype(np.int64) * len(uniques) + value_codes[valid])
+        owners = keys // max(len(uniques), 1)
+        labels = uniques.to_numpy()[keys % max(len(uniques), 1)] if len(uniques) else np.array([])
+        bounds = np.searchsorted(owners, np.arange(groups + 1))
+        return [set(labels[bounds[i]:bounds[i + 1]].tolist()) for i in range(groups)]
+
+    def _merge(self, name, update):
+        profile = self.profiles.get(name)
+        if profile is None:
+            self.profiles[name] = update
+            return
+        profile['rows'] = np.concatenate([profile['rows'], update['rows']])
+        profile['count'] += update['count']
+        profile['first_date'] = min(d for d in (profile['first_date'], update['first_date']) if pd.notna(d)) \
+            if pd.notna(profile['first_date']) or pd.notna(update['first_date']) else pd.NaT
+        profile['last_date'] = max(d for d in (profile['last_date'], update['last_date']) if pd.notna(d)) \
+            if pd.notna(profile['last_date']) or pd.notna(update['last_date']) else pd.NaT
+        profile['species'] |= update['species']
+        profile['countries'] |= update['countries']
+        for key, value in update['measures'].items():
+            current = profile['measures'][key]
+            if key.endswith('_min'):
+                profile['measures'][key] = np.fmin(current, value)
+            elif key.endswith('_max'):
+                profile['measures'][key] = np.fmax(current, value)
+            else:
+                profile['measures'][key] = current + value
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def __contains__(self, name):
+        return name in self.profiles
+
+    def profile(self, name):
+        stored = self.profiles[name]
+        profile = {key: value for key, value in stored.items() if key != 'measures'}
+        for measure in MEASURES:
+            n = stored['measures'][f"{measure}_n"]
+            total = stored['measures'][f"{measure}_sum"]
+            profile[f"{measure}_mean"] = total / n if n else np.nan
+            profile[f"{measure}_std"] = (max(stored['measures'][f"{measure}_sumsq"] - total ** 2 / n, 0) / (n - 1)) ** 0.5 \
+                if n > 1 else np.nan
+            profile[f"{measure}_min"] = stored['measures'][f"{measure}_min"]
+            profile[f"{measure}_max"] = stored['measures'][f"{measure}_max"]
+        return profile
+
+    def ranking(self):
+        # Mesmo critério de desempate do value_counts: ordem da primeira aparição
+        if self._ranking is None:
+            self._ranking = sorted(self.profiles,
+                                   key=lambda name: (-self.profiles[name]['count'], self.profiles[name]['rows'].min()))
+        return self._ranking
+
+    def top(self, n=10):
+        return [(name, self.profiles[name]['count']) for name in self.ranking()[:n]]
+
+
+def cohens_d(mean_a, std_a, n_a, mean_b, std_b, n_b):
+    # Diferença de médias em unidades do desvio padrão combinado (aceita arrays)
+    dof = n_a + n_b - 2
+    pooled = np.sqrt(((n_a - 1) * std_a ** 2 + (n_b - 1) * std_b ** 2) / np.where(dof > 0, dof, np.nan))
+    return (mean_a - mean_b) / np.where(pooled > 0, pooled, np.nan)
+
+
+def permutation_test(first, second, permutations, seed=None):
+    # Teste bilateral da diferença de médias; cada bloco embaralha várias cópias de uma vez
+    if permutations <= 0 or not len(first) or not len(second):
+        return np.nan
+    pooled = np.concatenate([first, second])
+    size_a = len(first)
+    total = pooled.sum()
+    observed = abs(first.mean() - second.mean())
+    rng = np.random.default_rng(seed)
+    block = max(1, PERMUTATION_BLOCK_VALUES // len(pooled))
+    extreme = 0
+    done = 0
+    while done < permutations:
+        rows = min(block, permutations - done)
+        shuffled = rng.permuted(np.tile(pooled, (rows, 1)), axis=1)
+        sums = shuffled[:, :size_a].sum(axis=1)
+        differences = np.abs(sums / size_a - (total - sums) / len(second))
+        extreme += int((differences >= observed - 1e-12).sum())
+        done += rows
+    return (extreme + 1) / (permutations + 1)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def _token_pairs(values, offset):
+    # Tokeniza só os textos distintos e replica os tokens para as linhas de cada texto
+    codes, uniques = pd.factorize(values)
+    tokens = pd.Series(uniques, dtype=object).str.lower().str.findall(TOKEN_PATTERN.pattern).explode().dropna()
+    if not len(tokens):
+        return np.array([], dtype=object), np.array([], dtype=np.int64)
+    owners = tokens.index.to_numpy()
+    rows = np.flatnonzero(codes >= 0)
+    rows = rows[np.argsort(codes[rows], kind='stable')]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    starts = np.cumsum(counts) - counts
+    repeats = counts[owners]
+    ends = np.cumsum(repeats)
+    within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - repeats, repeats)
+    positions = rows[np.repeat(starts[owners], repeats) + within] + offset
+    return np.repeat(tokens.to_numpy(dtype=object), repeats), positions
+
+
+class TextIndex:
+
+    # Índice invertido token -> linhas: vocabulário ordenado (busca por prefixo com
+    # searchsorted) e listas de postagens int32 concatenadas, delimitadas por offsets
+    def __init__(self, vocabulary, offsets, postings):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, frame):
+        return cls._from_pairs(*cls._frame_pairs(frame, 0))
+
+    @staticmethod
+    def _frame_pairs(frame, offset):
+        tokens, rows = [], []
+        for column in TEXT_COLUMNS:
+            if column in frame.columns:
+                column_tokens, column_rows = _token_pairs(frame[column], offset)
+                tokens.append(column_tokens)
+                rows.append(column_rows)
+        if not tokens:
+            return np.array([], dtype=object), np.array([], dtype=np.int64)
+        return np.concatenate(tokens), np.concatenate(rows)
+
+    @classmethod
+    def _from_pairs(cls, tokens, rows):
+        codes, vocabulary = pd.factorize(tokens, sort=True)
+        return cls._compile(np.asarray(vocabulary, dtype=str), codes, rows)
+
+    @classmethod
+    def _compile(cls, vocabulary, codes, rows):
+        rows = rows.astype(np.int64)
+        width = int(rows.max()) + 1 if len(rows) else 1
+        keys = np.sort(codes.astype(np.int64) * width + rows)
+        keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+        offsets = np.searchsorted(keys // width, np.arange(len(vocabulary) + 1)).astype(np.int64)
+        return cls(vocabulary, offsets, (keys % width).astype(np.int32))
+
+    def update(self, frame, offset):
+        # Funde as novas postagens remapeando os códigos antigos para o vocabulário ampliado
+        tokens, rows = self._frame_pairs(frame, offset)
+        if not len(tokens):
+            return
+        tokens = np.asarray(tokens, dtype=str)
+        vocabulary = np.union1d(self.vocabulary, tokens)
+        codes = np.concatenate([np.repeat(np.searchsorted(vocabulary, self.vocabulary), np.diff(self.offsets)),
+                                np.searchsorted(vocabulary, tokens)])
+        merged = self._compile(vocabulary, codes, np.concatenate([self.postings, rows]))
+        self.vocabulary, self.offsets, self.postings = merged.vocabulary, merged.offsets, merged.postings
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def _postings(self, first, last):
+        return self.postings[self.offsets[first]:self.offsets[last]]
+
+    def lookup(self, term, prefix=False):
+        start = int(np.searchsorted(self.vocabulary, term, 'left'))
+        if prefix:
+            end = int(np.searchsorted(self.vocabulary, term + '\U0010ffff', 'left'))
+            return np.unique(self._postings(start, end))
+        if start < len(self.vocabulary) and self.vocabulary[start] == term:
+            return self._postings(start, start + 1)
+        return np.array([], dtype=np.int32)
+
+    def search(self, query, prefix=False):
+        # Todos os termos precisam aparecer (AND); "termo*" busca por prefixo
+        result = None
+        for raw in str(query).split():
+            wildcard = prefix or raw.endswith('*')
+            for term in tokenize(raw):
+                rows = self.lookup(term, wildcard)
+                result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        return np.array([], dtype=np.int32) if result is None else result
+
+    def save(self, path):
+        temporary = path + '.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                np.savez_compressed(f, vocabulary=self.vocabulary, offsets=self.offsets, postings=self.postings)
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as arrays:
+                return cls(arrays['vocabulary'], arrays['offsets'], arrays['postings'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def normalize_taxonomy(frame):
+    # Nome comum vira chave inteira (Categorical) e nome científico, família e gênero
+    # saem das linhas para uma tabela de dimensão; só se um determina os outros
+    if any(column not in frame.columns for column in TAXONOMY_COLUMNS):
+        return frame, None
+    codes, names = pd.factorize(frame['Common Name'])
+    known = np.flatnonzero(codes >= 0)
+    first = np.zeros(len(names), dtype=np.int64)
+    first[codes[known][::-1]] = known[::-1]
+    taxonomy = frame[TAXONOMY_COLUMNS].iloc[first].reset_index(drop=True)
+    for column in TAXONOMY_COLUMNS[1:]:
+        actual = frame[column].to_numpy(dtype=object)
+        expected = taxonomy[column].reindex(codes).to_numpy(dtype=object)
+        differs = actual != expected
+        if differs.any() and not (pd.isna(actual[differs]) & pd.isna(expected[differs])).all():
+            return frame, None
+    facts = frame.drop(columns=TAXONOMY_COLUMNS[1:])
+    facts['Common Name'] = pd.Categorical.from_codes(codes, categories=taxonomy['Common Name'])
+    return facts, taxonomy
+
+
+def expand_taxonomy(frame, taxonomy, columns):
+    if taxonomy is None:
+        return frame[columns]
+    codes = frame['Common Name'].cat.codes.to_numpy()
+    return pd.DataFrame({column: taxonomy[column].reindex(codes).set_axis(frame.index)
+                         if column in TAXONOMY_COLUMNS else frame[column] for column in columns})
+
+
+class SharedLock:
+
+    # Várias leituras ao mesmo tempo (inclusive aninhadas); a escrita espera todas
+    # terminarem e segura novas leituras até acabar
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextlib.contextmanager
+    def shared(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        with self._condition:
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+def memoized(method):
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        key = (name,) + args if args else name
+        with self._memo_guard:
+            lock = self._memo_locks.setdefault(key, threading.Lock())
+        # Se outra thread já está calculando esta análise, espera pelo resultado dela
+        with lock:
+            if key in self._memo:
+                return self._memo[key]
+            # Leitura compartilhada: a troca da amostra pelos dados exatos não acontece no meio do cálculo
+            with self._state_lock.shared():
+                generation = self._generation
+                value = method(self, *args)
+            # Resultado calculado antes de uma troca de dados não é memorizado
+            if generation == self._generation:
+                self._memo[key] = value
+            return value
+    return wrapper
+
 
 class CrocodileAnalyzer:
 
-    
-    def __init__(self, csv_file):
-        
+
+    def __init__(self, csv_file, verbose=True, filters=None, data=None, sample=None, refine=False,
+                 backend=None, session=False, memory_limit=None):
+
         self.csv_file = csv_file
+        self.verbose = verbose
+        self.session = session
+        self.memory_limit = memory_limit
+        self.backend = get_backend(backend)
+        self.filters = dict(filters or {})
+        self.catalog = None
+        self.partitions_read = None
         self.data = None
-        self.load_data()
-    
+        self.taxonomy = None
+        self.columns = []
+        self.derived = data is not None
+        self.sample_size = sample
+        self.weights = None
+        self.sample_strata = None
+        self.sample_population = None
+        self.refined = threading.Event()
+        self._refine_thread = None
+        self.ingested_rows = 0
+        self._observer_index = None
+        self._text_index = None
+        self._index_lock = threading.Lock()
+        self._state_lock = SharedLock()
+        self._memo = {}
+        self._memo_locks = {}
+        self._memo_guard = threading.Lock()
+        self._generation = 0
+        if self.derived:
+            # Subconjunto já em memória (ex.: resultado de busca); nada é lido nem persistido
+            self.set_data(data.reset_index(drop=True))
+        else:
+            self.load_data()
+            if self.sampling and refine:
+                self.refine_exact()
+
     def load_data(self):
 
         try:
-            self.data = pd.read_csv(self.csv_file)
-            print(f"Dataset carregado com sucesso! {len(self.data)} observações encontradas.\n")
+            if self.session and not self.sample_size and self.restore_session():
+                if self.verbose:
+                    print(f"Sessão anterior restaurada! {len(self.data)} observações encontradas.\n")
+                return
+            if self.sample_size:
+                self._load_sample()
+            elif PartitionCatalog.is_partitioned(self.csv_file):
+                self.set_data(self._read_partitions())
+            else:
+                self.set_data(read_observations(self.csv_file, self.apply_filters))
+            self.ingested_rows = 0
+            self._observer_index = None
+            self._text_index = None
+            self.clear_cache()
+            if self.verbose and self.sampling:
+                print(f"Amostra estratificada carregada: {len(self.data)} de {self.total_rows} observações.\n")
+            elif self.verbose:
+                print(f"Dataset carregado com sucesso! {len(self.data)} observações encontradas.\n")
         except FileNotFoundError:
             print(f"Erro: Arquivo {self.csv_file} não encontrado!")
             sys.exit(1)
         except Exception as e:
             print(f"Erro ao carregar dados: {e}")
             sys.exit(1)
-    
-    def function_1_basic_info(self):
-        print("=" * 60)
-        print("INFORMAÇÕES BÁSICAS DO DATASET")
-        print("=" * 60)
-        print(f"Total de observações: {len(self.data)}")
-        print(f"Total de colunas: {len(self.data.columns)}")
-        print(f"Tamanho em memória: {self.data.memory_usage(deep=True).sum() / 1024:.2f} KB")
-        print(f"\nColunas disponíveis:")
-        for i, col in enumerate(self.data.columns, 1):
-            print(f"  {i:2d}. {col}")
-        print(f"\nTipos de dados:")
-        print(self.data.dtypes)
-    
-    def function_2_species_count(self):
-        print("=" * 60)
-        print("CONTAGEM POR ESPÉCIE")
-        print("=" * 60)
-        species_count = self.data['Common Name'].value_counts()
-        for i, (species, count) in enumerate(species_count.head(10).items(), 1):
-            print(f"{i:2d}. {species:<35} | {count:3d} observações")
-        print(f"\nTotal de espécies únicas: {len(species_count)}")
-    
-    def function_3_size_statistics(self):
-        print("=" * 60)
-        print("ESTATÍSTICAS DE COMPRIMENTO")
-        print("=" * 60)
-        length_data = self.data['Observed Length (m)'].dropna()
-        print(f"Média: {length_data.mean():.2f} metros")
-        print(f"Mediana: {length_data.median():.2f} metros")
-        print(f"Desvio padrão: {length_data.std():.2f} metros")
-        print(f"Mínimo: {length_data.min():.2f} metros")
-        print(f"Máximo: {length_data.max():.2f} metros")
-        print(f"1º Quartil: {length_data.quantile(0.25):.2f} metros")
-        print(f"3º Quartil: {length_data.quantile(0.75):.2f} metros")
-        print(f"Total de medições válidas: {len(length_data)}")
-    
-    def function_4_weight_statistics(self):
-        print("=" * 60)
-        print("ESTATÍSTICAS DE PESO")
-        print("=" * 60)
-        weight_data = self.data['Observed Weight (kg)'].dropna()
-        print(f"Média: {weight_data.mean():.2f} kg")
-        print(f"Mediana: {weight_data.median():.2f} kg")
-        print(f"Desvio padrão: {weight_data.std():.2f} kg")
-        print(f"Mínimo: {weight_data.min():.2f} kg")
-        print(f"Máximo: {weight_data.max():.2f} kg")
-        print(f"1º Quartil: {weight_data.quantile(0.25):.2f} kg")
-        print(f"3º Quartil: {weight_data.quantile(0.75):.2f} kg")
-        print(f"Total de medições válidas: {len(weight_data)}")
-    
-    def function_5_habitat_distribution(self):
-        print("=" * 60)
-        print("DISTRIBUIÇÃO POR HABITAT")
-        print("=" * 60)
-        habitat_dist = self.data['Habitat Type'].value_counts()
-        for i, (habitat, count) in enumerate(habitat_dist.items(), 1):
-            percentage = (count / len(self.data)) * 100
-            print(f"{i:2d}. {habitat:<25} | {count:3d} ({percentage:5.1f}%)")
-    
-    def function_6_conservation_status(self):
-        print("=" * 60)
-        print("STATUS DE CONSERVAÇÃO")
-        print("=" * 60)
-        conservation = self.data['Conservation Status'].value_counts()
-        for status, count in conservation.items():
-            percentage = (count / len(self.data)) * 100
-            print(f"{status:<20} | {count:3d} ({percentage:5.1f}%)")
-    
-    def function_7_age_class_analysis(self):
-        print("=" * 60)
-        print("DISTRIBUIÇÃO POR IDADE")
-        print("=" * 60)
-        age_dist = self.data['Age Class'].value_counts()
-        for age, count in age_dist.items():
-            percentage = (count / len(self.data)) * 100
-            print(f"{age:<15} | {count:3d} ({percentage:5.1f}%)")
-            
-    def function_8_sex_distribution(self):
-        print("=" * 60)
-        print("DISTRIBUIÇÃO POR SEXO")
-        print("=" * 60)
-        sex_dist = self.data['Sex'].value_counts()
-        for sex, count in sex_dist.items():
-            percentage = (count / len(self.data)) * 100
-            print(f"{sex:<10} | {count:3d} ({percentage:5.1f}%)")
-    
-    def function_9_country_analysis(self):
-        print("=" * 60)
-        print("OBSERVAÇÕES POR PAÍS/REGIÃO")
-        print("=" * 60)
-        country_dist = self.data['Country/Region'].value_counts()
-        for i, (country, count) in enumerate(country_dist.head(15).items(), 1):
-            percentage = (count / len(self.data)) * 100
-            print(f"{i:2d}. {country:<25} | {count:3d} ({percentage:5.1f}%)")
-    
-    def function_10_largest_specimens(self):
-        print("=" * 60)
-        print("MAIORES ESPÉCIMES (COMPRIMENTO)")
-        print("=" * 60)
-        largest = self.data.nlargest(10, 'Observed Length (m)')
-        for i, (idx, row) in enumerate(largest.iterrows(), 1):
-            print(f"{i:2d}. {row['Common Name']:<30} | {row['Observed Length (m)']:5.2f}m | {row['Country/Region']}")
-    def function_11_heaviest_specimens(self):
-        print("=" * 60)
-        print("ESPÉCIMES MAIS PESADOS")
-        print("=" * 60)
-        heaviest = self.data.nlargest(10, 'Observed Weight (kg)')
-        for i, (idx, row) in enumerate(heaviest.iterrows(), 1):
-            print(f"{i:2d}. {row['Common Name']:<30} | {row['Observed Weight (kg)']:6.1f}kg | {row['Country/Region']}")
-    
-    def function_12_size_categories(self):
-        print("=" * 60)
-        print("CATEGORIZAÇÃO POR TAMANHO")
-        print("=" * 60)
-        
+
+    def _load_sample(self):
+        if PartitionCatalog.is_partitioned(self.csv_file):
+            if not os.path.exists(self.csv_file):
+                raise FileNotFoundError(self.csv_file)
+            self.catalog = PartitionCatalog(self.csv_file)
+            self.partitions_read = [p['path'] for p in self.catalog.prune(**self.filters)]
+            paths = self.partitions_read
+        else:
+            paths = [self.csv_file]
+        # Uma passada em blocos: só o reservatório e o bloco atual ficam em memória
+        reservoir = StratifiedReservoir(self.sample_size)
+        for path in paths:
+            for chunk in iter_observation_chunks(path):
+                reservoir.add(self.apply_filters(chunk))
+        sample, strata, population = reservoir.result()
+        self.set_data(sample)
+        self.sample_strata = strata
+        self.sample_population = population
+        sizes = np.bincount(strata, minlength=len(population))
+        self.weights = population[strata] / sizes[strata] if len(strata) else np.array([], dtype=float)
+
+    @property
+    def sampling(self):
+        return self.weights is not None
+
+    @property
+    def total_rows(self):
+        return int(round(self.sample_population.sum())) if self.sampling else len(self.data)
+
+    def refine_exact(self):
+        # Carrega o dataset completo em segundo plano e troca a amostra pelos dados exatos
+        def run():
+            try:
+                exact = CrocodileAnalyzer(self.csv_file, verbose=False, filters=self.filters,
+                                          backend=self.backend.name, memory_limit=self.memory_limit)
+            except SystemExit:
+                # load_data já informou o erro de leitura; a amostra continua valendo
+                return
+            except Exception as e:
+                print(f"Erro ao calcular os resultados exatos: {e}", file=sys.stderr)
+                return
+            # Dados, pesos e índices trocam juntos, sem nenhuma análise em andamento
+            with self._state_lock.exclusive():
+                with self._index_lock:
+                    self.catalog, self.partitions_read = exact.catalog, exact.partitions_read
+                    self.data, self.taxonomy, self.columns = exact.data, exact.taxonomy, exact.columns
+                    self.weights = self.sample_strata = self.sample_population = None
+                    self._observer_index = None
+                    self._text_index = None
+                self.clear_cache()
+            self.refined.set()
+
+        self._refine_thread = threading.Thread(target=run, daemon=True)
+        self._refine_thread.start()
+        return self._refine_thread
+
+    def wait_for_exact(self, timeout=None):
+        return self.refined.wait(timeout)
+
+    def set_data(self, frame):
+        self.columns = list(frame.columns)
+        self.data, self.taxonomy = normalize_taxonomy(frame)
+
+    def column(self, name):
+        # Coluna na visão lógica (original), reconstruindo as colunas de taxonomia pela chave
+        if self.taxonomy is not None and name in TAXONOMY_COLUMNS[1:]:
+            return expand_taxonomy(self.data, self.taxonomy, [name])[name]
+        return self.data[name]
+
+    def logical_frame(self, columns=None):
+        return expand_taxonomy(self.data, self.taxonomy, list(columns or self.columns))
+
+    def missing_counts(self):
+        if self.sampling:
+            # Faltantes estimados: cada linha da amostra vale pelo seu peso
+            nulls = self.logical_frame().isnull().to_numpy()
+            return pd.Series((self.weights @ nulls).round().astype(np.int64), index=self.columns)
+        counts = self.backend.null_counts(self.data).to_dict()
+        if self.taxonomy is not None:
+            codes = self.data['Common Name'].cat.codes.to_numpy()
+            per_key = np.bincount(codes[codes >= 0], minlength=len(self.taxonomy))
+            orphans = int((codes < 0).sum())
+            for column in TAXONOMY_COLUMNS:
+                counts[column] = orphans + int(per_key[self.taxonomy[column].isna().to_numpy()].sum())
+        return pd.Series([counts[column] for column in self.columns], index=self.columns)
+
+    def _read_partitions(self):
+        if not os.path.exists(self.csv_file):
+            raise FileNotFoundError(self.csv_file)
+        self.catalog = PartitionCatalog(self.csv_file)
+        selected = self.catalog.prune(**self.filters)
+        self.partitions_read = [p['path'] for p in selected]
+        frames = [read_observations(path, self.apply_filters) for path in self.partitions_read]
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return read_observation_header(self.catalog.paths[0]) if self.catalog.paths else pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def apply_filters(self, frame):
+        if not self.filters:
+            return frame
+        mask = pd.Series(True, index=frame.index)
+        countries = _as_filter_set(self.filters.get('country'))
+        if countries is not None:
+            mask &= frame['Country/Region'].isin(countries)
+        species = _as_filter_set(self.filters.get('species'))
+        if species is not None:
+            mask &= frame['Common Name'].isin(species)
+        years = _as_filter_set(self.filters.get('year'))
+        if years is not None:
+            mask &= parse_observation_dates(frame['Date of Observation']).dt.year.isin([int(y) for y in years])
+        return frame[mask].reset_index(drop=True)
+
+    def restrict(self, country=None, year=None, species=None):
+        filters = dict(self.filters)
+        for key, value in (('country', country), ('year', year), ('species', species)):
+            if value is not None:
+                filters[key] = value
+        return CrocodileAnalyzer(self.csv_file, verbose=self.verbose, filters=filters, backend=self.backend.name,
+                                 memory_limit=self.memory_limit)
+
+    def source_fingerprint(self):
+        files = self.partitions_read if self.partitions_read is not None else [self.csv_file]
+        parts = [json.dumps(self.filters, sort_keys=True, default=str)]
+        for path in files:
+            stat = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:16]
+
+    def _session_path(self):
+        if PartitionCatalog.is_partitioned(self.csv_file):
+            self.catalog = PartitionCatalog(self.csv_file)
+            self.partitions_read = [p['path'] for p in self.catalog.prune(**self.filters)]
+        return self._session_file()
+
+    def _session_prefix(self):
+        # Fonte e conjunto de filtros: só snapshots antigos desta mesma combinação são descartados
+        filters = hashlib.sha256(json.dumps(self.filters, sort_keys=True, default=str).encode()).hexdigest()[:8]
+        return f"session-{os.path.basename(os.path.abspath(self.csv_file))}-{filters}-"
+
+    def _session_file(self):
+        # Ler um pickle executa código: a sessão fica no cache privado do usuário, nunca ao lado dos dados
+        return os.path.join(user_cache_dir(self.csv_file), f"{self._session_prefix()}{self.source_fingerprint()}.pkl")
+
+    def save_session(self):
+        # Dados tipados, índices e análises já calculadas num único pickle binário
+        if self.sampling or self.derived or self.ingested_rows:
+            return None
+        with self._memo_guard:
+            memo = dict(self._memo)
+        state = {'format': SESSION_FORMAT, 'data': self.data, 'taxonomy': self.taxonomy, 'columns': self.columns,
+                 'catalog': self.catalog, 'partitions_read': self.partitions_read, 'memo': memo,
+                 'observer_index': self._observer_index, 'text_index': self._text_index}
+        try:
+            path = self._session_file()
+            temporary = path + '.tmp'
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary)
+            # Criado do zero e legível só pelo dono; restore_session recusa qualquer outro modo
+            with os.fdopen(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            return None
+        # Sessões de versões anteriores da mesma fonte nunca mais serão restauradas
+        directory, current = os.path.split(path)
+        for stale in os.listdir(directory):
+            if stale.startswith(self._session_prefix()) and stale.endswith('.pkl') and stale != current:
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(directory, stale))
+        return path
+
+    def restore_session(self):
+        # Só vale se a fonte não mudou: o nome do arquivo carrega a impressão digital dela
+        try:
+            path = self._session_path()
+            with os.fdopen(os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0)), 'rb') as f:
+                state = pickle.load(f) if is_private_file(f, os.path.dirname(path)) else None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            self.catalog = self.partitions_read = None
+            return False
+        if not isinstance(state, dict) or state.get('format') != SESSION_FORMAT:
+            self.catalog = self.partitions_read = None
+            return False
+        self.data, self.taxonomy, self.columns = state['data'], state['taxonomy'], state['columns']
+        self.catalog, self.partitions_read = state['catalog'], state['partitions_read']
+        with self._index_lock:
+            self._observer_index = state['observer_index']
+            self._text_index = state['text_index']
+        with self._memo_guard:
+            self._memo.update(state['memo'])
+        return True
+
+    def clear_cache(self):
+        with self._memo_guard:
+            self._generation += 1
+            self._memo.clear()
+
+    @property
+    def observer_index(self):
+        with self._index_lock:
+            if self._observer_index is None:
+                self._observer_index = ObserverIndex.build(self.data)
+            return self._observer_index
+
+    def observer_profile(self, name):
+        return self.observer_index.profile(name)
+
+    @property
+    def text_index(self):
+        with self._index_lock:
+            if self._text_index is None:
+                text = self.logical_frame([column for column in TEXT_COLUMNS if column in self.columns])
+                path = None
+                # Linhas diferentes das da fonte em disco: o índice persistido não se aplica
+                if not (self.sampling or self.ingested_rows or self.derived):
+                    try:
+                        path = cache_path(self.csv_file, f"text-{self.source_fingerprint()}.npz")
+                    except OSError:
+                        # Nenhum cache gravável: índice só em memória
+                        pass
+                self._text_index = TextIndex.load(path) if path is not None else None
+                if self._text_index is None:
+                    self._text_index = TextIndex.build(text)
+                    if path is not None:
+                        self._text_index.save(path)
+            return self._text_index
+
+    def search_rows(self, query, prefix=False, where=None):
+        rows = self.text_index.search(query, prefix)
+        for column, value in (where or {}).items():
+            # Filtros nas demais colunas só olham as linhas já encontradas
+            keep = self.column(column).to_numpy()[rows]
+            rows = rows[pd.Series(keep).isin(_as_filter_set(value)).to_numpy()]
+        return rows
+
+    def search(self, query, prefix=False, where=None):
+        rows = self.data.iloc[self.search_rows(query, prefix, where)]
+        return expand_taxonomy(rows, self.taxonomy, self.columns)
+
+    def search_analyzer(self, query, prefix=False, where=None):
+        # Analisador sobre as linhas encontradas: qualquer uma das análises roda sobre ele
+        return CrocodileAnalyzer(self.csv_file, verbose=False, filters=self.filters,
+                                 data=self.search(query, prefix, where), backend=self.backend.name,
+                                 memory_limit=self.memory_limit)
+
+    def ingest(self, rows):
+        if self.sampling:
+            raise ValueError("Ingestão não é suportada sobre uma amostra; use o dataset completo")
+        new = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        new = new.reindex(columns=self.columns)
+        for column in list(MEASURES.values()) + ['Observation ID']:
+            if column in new.columns:
+                new[column] = pd.to_numeric(new[column], errors='coerce')
+        new = self.apply_filters(new)
+        if not len(new):
+            return 0
+
+        with self._index_lock:
+            offset = len(self.data)
+            self._append(new)
+            self.ingested_rows += len(new)
+            # Os índices incrementais absorvem só as linhas novas; os agregados memorizados são refeitos
+            if self._observer_index is not None:
+                self._observer_index.update(new, offset)
+            if self._text_index is not None:
+                self._text_index.update(new, offset)
+        self.clear_cache()
+        return len(new)
+
+    def _append(self, new):
+        if self.taxonomy is None:
+            self.data = pd.concat([self.data, new], ignore_index=True)
+            return
+        # Espécies novas ganham chaves no fim da tabela; as chaves existentes não mudam
+        _, taxonomy = normalize_taxonomy(pd.concat([self.taxonomy, new[TAXONOMY_COLUMNS]], ignore_index=True))
+        if taxonomy is None:
+            # Linha nova contradiz a taxonomia: volta às colunas completas
+            self.data = pd.concat([self.logical_frame(), new], ignore_index=True)
+            self.taxonomy = None
+            return
+        categories = taxonomy['Common Name']
+        facts = new.drop(columns=TAXONOMY_COLUMNS[1:])
+        facts['Common Name'] = pd.Categorical(new['Common Name'], categories=categories)
+        current = self.data.assign(**{'Common Name': self.data['Common Name'].cat.set_categories(categories)})
+        self.data = pd.concat([current, facts], ignore_index=True)
+        self.taxonomy = taxonomy
+
+    def is_computed(self, option):
+        return analysis_compute_name(option) in self._memo
+
+    def precompute(self, options, stop_event=None):
+        for option in options:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if self.estimable(option):
+                getattr(self, analysis_compute_name(option))()
+
+    def _measurement_statistics(self, column):
+        if self.sampling:
+            return self._weighted_statistics(column)
+        return self.backend.measure_statistics(self.data, column)
+
+    def _weighted_statistics(self, column):
+        values = self.data[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        values, weights = values[valid], self.weights[valid]
+        total = weights.sum()
+        mean = (weights @ values) / total if total else np.nan
+        variance = (weights @ (values - mean) ** 2) / (total - 1) if total > 1 else np.nan
+        return {
+            'mean': mean,
+            'median': weighted_quantile(values, weights, 0.5),
+            'std': variance ** 0.5,
+            'min': values.min() if len(values) else np.nan,
+            'max': values.max() if len(values) else np.nan,
+            'q1': weighted_quantile(values, weights, 0.25),
+            'q3': weighted_quantile(values, weights, 0.75),
+            'count': int(round(total))
+        }
+
+    def _weighted_describe(self, column):
+        # Mesmo formato do describe() do pandas, com cada linha valendo pelo seu peso
+        stats = self._weighted_statistics(column)
+        return pd.Series({'count': float(stats['count']), 'mean': stats['mean'], 'std': stats['std'],
+                          'min': stats['min'], '25%': stats['q1'], '50%': stats['median'],
+                          '75%': stats['q3'], 'max': stats['max']}, name=column)
+
+    def _weighted_value_counts(self, values):
+        counts = pd.Series(self.weights, index=pd.Index(values)).groupby(level=0, sort=False).sum()
+        return counts.round().astype(np.int64).sort_values(ascending=False, kind='stable').rename('count')
+
+    @memoized
+    def compute_cube(self):
+        if self.sampling:
+            return ObservationCube.build(self.data, self.weights)
+        if self.ingested_rows or self.derived:
+            # Dados já diferem da fonte em disco: o cubo persistido não se aplica
+            return ObservationCube.build(self.data, backend=self.backend)
+        try:
+            path = cache_path(self.csv_file, f"cube-{self.source_fingerprint()}.npz")
+        except OSError:
+            # Nenhum cache gravável: o cubo vale só para esta sessão
+            return ObservationCube.build(self.data, backend=self.backend)
+        cube = ObservationCube.load(path)
+        if cube is None:
+            cube = ObservationCube.build(self.data, backend=self.backend)
+            cube.save(path)
+        return cube
+
+    @memoized
+    def compute_region_base_cube(self):
+        return self.compute_cube().rollup(['Country/Region', 'Common Name', 'Conservation Status'])
+
+    @memoized
+    def compute_region_rollup(self, level, by=()):
+        cube = self.compute_region_base_cube()
+        if level != 'Country/Region':
+            regions = load_region_hierarchy()[level]
+            cube = cube.assign(**{level: cube['Country/Region'].astype(object).map(regions).fillna(UNKNOWN_REGION)})
+        rollup = rollup_measures(cube, [level] + list(by))
+        return finalize_measures(rollup).sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+    def region_rollup(self, level='Continent', by=(), **where):
+        if level not in REGION_LEVELS:
+            raise ValueError(f"Nível de região inválido: {level}")
+        # Filtros em espécie/status são aplicados sobre o cubo já agregado, nunca sobre as linhas
+        keys = tuple(by) + tuple(column for column in where if column not in by)
+        rollup = self.compute_region_rollup(level, keys)
+        for column, value in where.items():
+            rollup = rollup[rollup[column].isin(_as_filter_set(value))]
+        if keys != tuple(by):
+            rollup = finalize_measures(rollup_measures(rollup, [level] + list(by)))
+            rollup = rollup.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+        return rollup
+
+    @memoized
+    def compute_cohort_statistics(self, column):
+        # Um único groupby para todos os níveis; colunas do cubo nem tocam nas linhas
+        if column in CUBE_DIMENSIONS:
+            stats = self.compute_cube().summary(by=[column])
+        elif column in TAXONOMY_COLUMNS:
+            stats = self.compute_taxonomy_level(column).drop(columns=['species'])
+        elif self.sampling:
+            stats = aggregate_measures(self.data, [column], weights=self.weights)
+            stats['count'] = stats['count'].round().astype(np.int64)
+            stats = finalize_measures(stats)
+        else:
+            stats = finalize_measures(self.backend.group_measures(self.data, [column]))
+        stats[column] = stats[column].astype(object)
+        return stats.reset_index(drop=True)
+
+    def _cohort_values(self, column, measure):
+        # Valores de cada nível como fatias de um único array ordenado, sem cópias do DataFrame
+        codes, levels = pd.factorize(self.column(column))
+        values = self.data[MEASURES[measure]].to_numpy(dtype=float)
+        keep = (codes >= 0) & ~np.isnan(values)
+        codes, values = codes[keep], values[keep]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(levels) + 1))
+        return {level: values[order[bounds[i]:bounds[i + 1]]] for i, level in enumerate(levels)}
+
+    def compare_cohorts(self, column, levels=None, pairs=None, effect_sizes=True,
+                        permutations=0, seed=None, workers=None):
+        stats = self.compute_cohort_statistics(column)
+        if levels is not None:
+            stats = stats[stats[column].isin(_as_filter_set(levels))]
+        stats = stats.reset_index(drop=True)
+        if pairs is None:
+            pairs = list(itertools.combinations(stats[column], 2))
+
+        position = {level: i for i, level in enumerate(stats[column])}
+        missing = [level for pair in pairs for level in pair if level not in position]
+        if missing:
+            raise ValueError(f"Nível inexistente em {column}: {missing[0]}")
+        first = np.array([position[a] for a, _ in pairs], dtype=int)
+        second = np.array([position[b] for _, b in pairs], dtype=int)
+
+        result = pd.DataFrame({
+            'level_a': [a for a, _ in pairs],
+            'level_b': [b for _, b in pairs],
+            'count_a': stats['count'].to_numpy()[first],
+            'count_b': stats['count'].to_numpy()[second]
+        })
+        for measure in MEASURES:
+            mean = stats[f"{measure}_mean"].to_numpy(dtype=float)
+            std = stats[f"{measure}_std"].to_numpy(dtype=float)
+            n = stats[f"{measure}_n"].to_numpy(dtype=float)
+            result[f"{measure}_diff"] = mean[first] - mean[second]
+            if effect_sizes:
+                result[f"{measure}_cohen_d"] = cohens_d(mean[first], std[first], n[first],
+                                                        mean[second], std[second], n[second])
+
+        if permutations and len(pairs):
+            # Sementes derivadas por par: o resultado não depende do número de processos
+            seeds = np.random.SeedSequence(seed).spawn(len(pairs) * len(MEASURES))
+            for m, measure in enumerate(MEASURES):
+                values = self._cohort_values(column, measure)
+                tasks = [(values.get(a, np.array([])), values.get(b, np.array([])), permutations,
+                          seeds[m * len(pairs) + i]) for i, (a, b) in enumerate(pairs)]
+                if workers and workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        p_values = list(pool.map(permutation_test, *zip(*tasks)))
+                else:
+                    p_values = [permutation_test(*task) for task in tasks]
+                result[f"{measure}_p_value"] = p_values
+        return {'levels': stats, 'pairs': result}
+
+    @memoized
+    def compute_sampling_error(self, option):
+        # Margens de erro (IC 95%) das estimativas feitas sobre a amostra estratificada
+        if not self.sampling:
+            return None
+        if option in SAMPLED_COUNT_COLUMNS or option == 13:
+            if option == 13:
+                values = parse_observation_dates(self.data['Date of Observation']).dt.year.to_numpy()
+            else:
+                values = self.column(SAMPLED_COUNT_COLUMNS[option]).to_numpy(dtype=object)
+            return {'margins': stratified_count_margins(self.sample_strata, self.sample_population, values)}
+        if option in SAMPLED_MEASURE_COLUMNS:
+            values = self.data[SAMPLED_MEASURE_COLUMNS[option]].to_numpy(dtype=float)
+            return {'mean': stratified_mean_margin(self.sample_strata, self.sample_population, values)}
+        if option == 14:
+            correlation = self.compute_correlation_analysis()['correlation']
+            n = len(self.data[['Observed Length (m)', 'Observed Weight (kg)']].dropna())
+            if correlation is None or n < 4 or abs(correlation) >= 1:
+                return None
+            # Intervalo pela transformação z de Fisher com o tamanho efetivo da amostra
+            spread = SAMPLE_Z / np.sqrt(n - 3)
+            return {'interval': tuple(np.tanh(np.arctanh(correlation) + np.array([-spread, spread])))}
+        return None
+
+    def estimable(self, option):
+        return not (self.sampling and option in SAMPLING_UNSUPPORTED)
+
+    def _require_estimable(self, option):
+        if not self.estimable(option):
+            raise ValueError(f"Análise {option} indisponível sobre uma amostra: {SAMPLING_UNSUPPORTED[option]}")
+
+    def sampling_note(self, option):
+        with self._state_lock.shared():
+            return self._sampling_note(option)
+
+    def _sampling_note(self, option):
+        if not self.sampling:
+            return ''
+        lines = [f"[Amostra estratificada: {len(self.data)} de {self.total_rows} observações]"]
+        error = self.compute_sampling_error(option) if self.estimable(option) else None
+        if not self.estimable(option):
+            lines.append(f"Análise indisponível na amostra: {SAMPLING_UNSUPPORTED[option]}. "
+                         f"Use --refine ou rode sem --sample.")
+        elif error is None:
+            lines.append("Estimativa a partir da amostra, sem margem de erro calculada.")
+        elif 'margins' in error:
+            widest = float(error['margins'].max()) if len(error['margins']) else 0.0
+            if widest == 0:
+                lines.append("Contagens exatas: a categoria coincide com os estratos da amostra.")
+            else:
+                lines.append(f"Margem de erro (IC 95%): até ±{widest:.0f} observações por categoria.")
+        elif 'mean' in error:
+            lines.append(f"Margem de erro da média (IC 95%): ±{error['mean']:.3f}")
+        else:
+            low, high = error['interval']
+            lines.append(f"Intervalo de confiança da correlação (IC 95%): [{low:.3f}, {high:.3f}]")
+        if self._refine_thread is not None and not self.refined.is_set():
+            lines.append("Resultado exato sendo calculado em segundo plano.")
+        return '\n'.join(lines) + '\n'
+
+    @memoized
+    def compute_basic_info(self):
+        return {
+            'rows': self.total_rows,
+            'columns': list(self.columns),
+            'memory_bytes': self.data.memory_usage(deep=True).sum() +
+                            (self.taxonomy.memory_usage(deep=True).sum() if self.taxonomy is not None else 0),
+            'dtypes': pd.Series([self.taxonomy[column].dtype if self.taxonomy is not None and column in TAXONOMY_COLUMNS
+                                 else self.data[column].dtype for column in self.columns], index=self.columns)
+        }
+
+    @memoized
+    def compute_species_count(self):
+        return self.compute_cube().value_counts('Common Name')
+
+    @memoized
+    def compute_size_statistics(self):
+        return self._measurement_statistics('Observed Length (m)')
+
+    @memoized
+    def compute_weight_statistics(self):
+        return self._measurement_statistics('Observed Weight (kg)')
+
+    @memoized
+    def compute_habitat_distribution(self):
+        return self.compute_cube().value_counts('Habitat Type')
+
+    @memoized
+    def compute_conservation_status(self):
+        return self.compute_cube().value_counts('Conservation Status')
+
+    @memoized
+    def compute_age_class_analysis(self):
+        return self.compute_cube().value_counts('Age Class')
+
+    @memoized
+    def compute_sex_distribution(self):
+        return self.compute_cube().value_counts('Sex')
+
+    @memoized
+    def compute_country_analysis(self):
+        return self.compute_cube().value_counts('Country/Region')
+
+    @memoized
+    def compute_largest_specimens(self):
+        self._require_estimable(10)
+        return self.data.nlargest(10, 'Observed Length (m)')
+
+    @memoized
+    def compute_heaviest_specimens(self):
+        self._require_estimable(11)
+        return self.data.nlargest(10, 'Observed Weight (kg)')
+
+    @memoized
+    def compute_size_categories(self):
+
         def categorize_size(length):
             if pd.isna(length):
                 return 'Desconhecido'
@@ -151,272 +1919,1063 @@ class CrocodileAnalyzer:
                 return 'Grande (3-4.5m)'
             else:
                 return 'Muito Grande (>4.5m)'
-        
-        
-        temp_data = self.data.copy()
-        temp_data['Size_Category'] = temp_data['Observed Length (m)'].apply(categorize_size)
-        size_dist = temp_data['Size_Category'].value_counts()
-        
+
+        categories = self.data['Observed Length (m)'].apply(categorize_size)
+        if self.sampling:
+            return self._weighted_value_counts(categories.to_numpy())
+        return categories.value_counts()
+
+    @memoized
+    def compute_yearly_observations(self):
+        if self.sampling:
+            years = parse_observation_dates(self.data['Date of Observation']).dt.year.to_numpy()
+            valid = ~np.isnan(years)
+            counts = pd.Series(self.weights[valid], index=years[valid].astype(np.int32)).groupby(level=0).sum()
+            return counts.round().astype(np.int64).rename('count')
+        return self.backend.year_counts(self.data, 'Date of Observation')
+
+    @memoized
+    def compute_correlation_analysis(self):
+        valid_data = self.data[['Observed Length (m)', 'Observed Weight (kg)']].dropna()
+        correlation = None
+        if self.sampling:
+            weights = self.weights[valid_data.index.to_numpy()]
+            if len(valid_data) > 1:
+                cov = np.cov(valid_data.to_numpy().T, aweights=weights)
+                correlation = cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1])
+            return {'correlation': correlation, 'valid': int(round(weights.sum()))}
+        if len(valid_data) > 1:
+            correlation = valid_data['Observed Length (m)'].corr(valid_data['Observed Weight (kg)'])
+        return {'correlation': correlation, 'valid': len(valid_data)}
+
+    def _spills(self, columns, materialized):
+        # Acima do teto de memória a agregação vai para disco, salvo se o resultado já existe
+        if not self.memory_limit or self.sampling or materialized:
+            return False
+        return estimated_grouping_bytes(self.data, columns) > self.memory_limit
+
+    @memoized
+    def compute_species_by_habitat(self):
+        self._require_estimable(15)
+        keys = ['Habitat Type', 'Common Name']
+        if self._spills(keys, 'compute_cube' in self._memo):
+            # Particionado pelo par: um habitat grande se espalha por várias partições e, como os
+            # pares são disjuntos entre elas, a soma das contagens por habitat é exata
+            parts = spill_groupby(self.data, keys, keys, lambda part: part.drop_duplicates(keys)
+                                  .groupby('Habitat Type', observed=True).size(), self.memory_limit)
+            diversity = pd.concat(list(parts) or [pd.Series(dtype=np.int64)])
+            diversity = diversity.groupby(level=0).sum().astype(np.int64)
+        else:
+            pairs = self.compute_cube().rollup(keys)
+            diversity = pairs.groupby('Habitat Type', observed=True).size()
+        diversity.index = pd.Index(diversity.index.astype(object), name='Habitat Type')
+        return diversity.sort_index().sort_values(ascending=False)
+
+    @memoized
+    def compute_adult_vs_juvenile(self):
+        stats = self.compute_cohort_statistics('Age Class').set_index('Age Class')
+        cohorts = {}
+        for age_class in ['Adult', 'Juvenile']:
+            found = age_class in stats.index
+            cohorts[age_class] = {
+                'count': int(stats.at[age_class, 'count']) if found else 0,
+                'mean_length': stats.at[age_class, 'length_mean'] if found else np.nan,
+                'mean_weight': stats.at[age_class, 'weight_mean'] if found else np.nan
+            }
+        return cohorts
+
+    @memoized
+    def compute_endangered_species(self):
+        keys = ['Common Name', 'Conservation Status']
+        if self._spills(keys, 'compute_cube' in self._memo):
+            parts = spill_groupby(self.data, keys, keys, lambda part: part.groupby(keys, observed=True).size()
+                                  .reset_index(name='count'), self.memory_limit,
+                                  where=lambda chunk: chunk['Conservation Status'].isin(ENDANGERED_STATUS))
+            endangered = pd.concat(list(parts) or [pd.DataFrame(columns=keys + ['count'])], ignore_index=True)
+            endangered = endangered.astype({'count': np.int64})
+        else:
+            endangered = self.compute_cube().rollup(keys, where={'Conservation Status': ENDANGERED_STATUS})
+        endangered = endangered[keys + ['count']].astype({key: object for key in keys})
+        return endangered.sort_values(keys).reset_index(drop=True).rename(columns={'count': 'Count'})
+
+    @memoized
+    def compute_observer_statistics(self):
+        if self.sampling:
+            # Cada observação da amostra vale pelo peso do seu estrato; quantos observadores
+            # distintos existem não se estima assim
+            names = self.data['Observer Name']
+            counts = self._weighted_value_counts(names.to_numpy(dtype=object))
+            return {
+                'observers': None,
+                'observations': int(round(self.weights[names.notna().to_numpy()].sum())),
+                'top': [(name, int(count)) for name, count in counts.head(10).items()]
+            }
+        if self._spills(['Observer Name'], self._observer_index is not None):
+            return self._spilled_observer_statistics()
+        index = self.observer_index
+        return {
+            'observers': len(index),
+            'observations': index.total_observations,
+            'top': index.top(10)
+        }
+
+    def _spilled_observer_statistics(self, n=10):
+        # Só a contagem por observador de cada partição e um top-n corrente ficam em memória,
+        # com o mesmo desempate do índice de observadores (primeira aparição)
+        observers, observations, top = 0, 0, None
+
+        def counts(part):
+            rows = part.groupby('Observer Name', sort=False)['_row']
+            return pd.DataFrame({'count': rows.size(), 'first': rows.min()})
+
+        for part in spill_groupby(self.data, ['Observer Name'], ['Observer Name'], counts, self.memory_limit):
+            observers += len(part)
+            observations += int(part['count'].sum())
+            top = part if top is None else pd.concat([top, part])
+            top = top.sort_values(['count', 'first'], ascending=[False, True], kind='stable').head(n)
+        return {
+            'observers': observers,
+            'observations': observations,
+            'top': [] if top is None else [(name, int(count)) for name, count in top['count'].items()]
+        }
+
+    @memoized
+    def compute_taxonomy_level(self, level):
+        # Agrega por chave de espécie no cubo e só então junta com a tabela de taxonomia
+        species = self.compute_cube().rollup(['Common Name'])
+        names = species['Common Name'].astype(object)
+        if self.taxonomy is not None:
+            species[level] = names.map(self.taxonomy.set_index('Common Name')[level])
+        else:
+            species[level] = names.map(self.data.drop_duplicates('Common Name').set_index('Common Name')[level])
+        rollup = finalize_measures(rollup_measures(species, [level]))
+        rollup['species'] = rollup[level].map(species.groupby(level)['Common Name'].nunique())
+        rollup[level] = rollup[level].astype(object)
+        return rollup.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+    @memoized
+    def compute_taxonomy_rollup(self):
+        return {level: self.compute_taxonomy_level(level) for level in TAXONOMY_LEVELS}
+
+    @memoized
+    def compute_missing_data_analysis(self):
+        return {'missing': self.missing_counts(), 'total': self.total_rows}
+
+    @memoized
+    def compute_summary_report(self):
+        total = self.total_rows
+        return {
+            'total': total,
+            'species': self.backend.nunique(self.data, 'Common Name'),
+            'countries': self.backend.nunique(self.data, 'Country/Region'),
+            'habitats': self.backend.nunique(self.data, 'Habitat Type') if not self.sampling else None,
+            'observers': self.backend.nunique(self.data, 'Observer Name') if not self.sampling else None,
+            'length': self.data['Observed Length (m)'].describe() if not self.sampling
+            else self._weighted_describe('Observed Length (m)'),
+            'weight': self.data['Observed Weight (kg)'].describe() if not self.sampling
+            else self._weighted_describe('Observed Weight (kg)'),
+            'conservation': self.backend.value_counts(self.data, 'Conservation Status') if not self.sampling
+            else self.compute_conservation_status(),
+            'completeness': (total - self.missing_counts()) / total * 100
+        }
+
+    def function_1_basic_info(self, file=None):
+        print("=" * 60, file=file)
+        print("INFORMAÇÕES BÁSICAS DO DATASET", file=file)
+        print("=" * 60, file=file)
+        info = self.compute_basic_info()
+        print(f"Total de observações: {info['rows']}", file=file)
+        print(f"Total de colunas: {len(info['columns'])}", file=file)
+        print(f"Tamanho em memória: {info['memory_bytes'] / 1024:.2f} KB", file=file)
+        print(f"\nColunas disponíveis:", file=file)
+        for i, col in enumerate(info['columns'], 1):
+            print(f"  {i:2d}. {col}", file=file)
+        print(f"\nTipos de dados:", file=file)
+        print(info['dtypes'], file=file)
+
+    def function_2_species_count(self, file=None):
+        print("=" * 60, file=file)
+        print("CONTAGEM POR ESPÉCIE", file=file)
+        print("=" * 60, file=file)
+        species_count = self.compute_species_count()
+        for i, (species, count) in enumerate(species_count.head(10).items(), 1):
+            print(f"{i:2d}. {species:<35} | {count:3d} observações", file=file)
+        print(f"\nTotal de espécies únicas: {len(species_count)}", file=file)
+
+    def function_3_size_statistics(self, file=None):
+        print("=" * 60, file=file)
+        print("ESTATÍSTICAS DE COMPRIMENTO", file=file)
+        print("=" * 60, file=file)
+        stats = self.compute_size_statistics()
+        print(f"Média: {stats['mean']:.2f} metros", file=file)
+        print(f"Mediana: {stats['median']:.2f} metros", file=file)
+        print(f"Desvio padrão: {stats['std']:.2f} metros", file=file)
+        print(f"Mínimo: {stats['min']:.2f} metros", file=file)
+        print(f"Máximo: {stats['max']:.2f} metros", file=file)
+        print(f"1º Quartil: {stats['q1']:.2f} metros", file=file)
+        print(f"3º Quartil: {stats['q3']:.2f} metros", file=file)
+        print(f"Total de medições válidas: {stats['count']}", file=file)
+
+    def function_4_weight_statistics(self, file=None):
+        print("=" * 60, file=file)
+        print("ESTATÍSTICAS DE PESO", file=file)
+        print("=" * 60, file=file)
+        stats = self.compute_weight_statistics()
+        print(f"Média: {stats['mean']:.2f} kg", file=file)
+        print(f"Mediana: {stats['median']:.2f} kg", file=file)
+        print(f"Desvio padrão: {stats['std']:.2f} kg", file=file)
+        print(f"Mínimo: {stats['min']:.2f} kg", file=file)
+        print(f"Máximo: {stats['max']:.2f} kg", file=file)
+        print(f"1º Quartil: {stats['q1']:.2f} kg", file=file)
+        print(f"3º Quartil: {stats['q3']:.2f} kg", file=file)
+        print(f"Total de medições válidas: {stats['count']}", file=file)
+
+    def function_5_habitat_distribution(self, file=None):
+        print("=" * 60, file=file)
+        print("DISTRIBUIÇÃO POR HABITAT", file=file)
+        print("=" * 60, file=file)
+        habitat_dist = self.compute_habitat_distribution()
+        for i, (habitat, count) in enumerate(habitat_dist.items(), 1):
+            percentage = (count / self.total_rows) * 100
+            print(f"{i:2d}. {habitat:<25} | {count:3d} ({percentage:5.1f}%)", file=file)
+
+    def function_6_conservation_status(self, file=None):
+        print("=" * 60, file=file)
+        print("STATUS DE CONSERVAÇÃO", file=file)
+        print("=" * 60, file=file)
+        conservation = self.compute_conservation_status()
+        for status, count in conservation.items():
+            percentage = (count / self.total_rows) * 100
+            print(f"{status:<20} | {count:3d} ({percentage:5.1f}%)", file=file)
+
+    def function_7_age_class_analysis(self, file=None):
+        print("=" * 60, file=file)
+        print("DISTRIBUIÇÃO POR IDADE", file=file)
+        print("=" * 60, file=file)
+        age_dist = self.compute_age_class_analysis()
+        for age, count in age_dist.items():
+            percentage = (count / self.total_rows) * 100
+            print(f"{age:<15} | {count:3d} ({percentage:5.1f}%)", file=file)
+
+    def function_8_sex_distribution(self, file=None):
+        print("=" * 60, file=file)
+        print("DISTRIBUIÇÃO POR SEXO", file=file)
+        print("=" * 60, file=file)
+        sex_dist = self.compute_sex_distribution()
+        for sex, count in sex_dist.items():
+            percentage = (count / self.total_rows) * 100
+            print(f"{sex:<10} | {count:3d} ({percentage:5.1f}%)", file=file)
+
+    def function_9_country_analysis(self, file=None):
+        print("=" * 60, file=file)
+        print("OBSERVAÇÕES POR PAÍS/REGIÃO", file=file)
+        print("=" * 60, file=file)
+        country_dist = self.compute_country_analysis()
+        for i, (country, count) in enumerate(country_dist.head(15).items(), 1):
+            percentage = (count / self.total_rows) * 100
+            print(f"{i:2d}. {country:<25} | {count:3d} ({percentage:5.1f}%)", file=file)
+
+        for level, title in (('Continent', 'POR CONTINENTE'), ('Realm', 'POR REINO BIOGEOGRÁFICO')):
+            print(f"\n{title}:", file=file)
+            for _, row in self.region_rollup(level).iterrows():
+                percentage = (row['count'] / self.total_rows) * 100
+                print(f"    {row[level]:<25} | {int(row['count']):3d} ({percentage:5.1f}%) | "
+                      f"média {row['length_mean']:.2f}m / {row['weight_mean']:.1f}kg", file=file)
+
+    def function_10_largest_specimens(self, file=None):
+        print("=" * 60, file=file)
+        print("MAIORES ESPÉCIMES (COMPRIMENTO)", file=file)
+        print("=" * 60, file=file)
+        largest = self.compute_largest_specimens()
+        for i, (idx, row) in enumerate(largest.iterrows(), 1):
+            print(f"{i:2d}. {row['Common Name']:<30} | {row['Observed Length (m)']:5.2f}m | {row['Country/Region']}", file=file)
+    def function_11_heaviest_specimens(self, file=None):
+        print("=" * 60, file=file)
+        print("ESPÉCIMES MAIS PESADOS", file=file)
+        print("=" * 60, file=file)
+        heaviest = self.compute_heaviest_specimens()
+        for i, (idx, row) in enumerate(heaviest.iterrows(), 1):
+            print(f"{i:2d}. {row['Common Name']:<30} | {row['Observed Weight (kg)']:6.1f}kg | {row['Country/Region']}", file=file)
+
+    def function_12_size_categories(self, file=None):
+        print("=" * 60, file=file)
+        print("CATEGORIZAÇÃO POR TAMANHO", file=file)
+        print("=" * 60, file=file)
+        size_dist = self.compute_size_categories()
+
         for category, count in size_dist.items():
-            percentage = (count / len(self.data)) * 100
-            print(f"{category:<20} | {count:3d} ({percentage:5.1f}%)")
-    
-    def function_13_yearly_observations(self):
-        print("=" * 60)
-        print("OBSERVAÇÕES POR ANO")
-        print("=" * 60)
+            percentage = (count / self.total_rows) * 100
+            print(f"{category:<20} | {count:3d} ({percentage:5.1f}%)", file=file)
+
+    def function_13_yearly_observations(self, file=None):
+        print("=" * 60, file=file)
+        print("OBSERVAÇÕES POR ANO", file=file)
+        print("=" * 60, file=file)
         try:
-            
-            dates = pd.to_datetime(self.data['Date of Observation'], format='%d-%m-%Y', errors='coerce')
-            yearly = dates.dt.year.value_counts().sort_index()
-            
+
+            yearly = self.compute_yearly_observations()
+
             for year, count in yearly.items():
                 if not pd.isna(year):
-                    print(f"{int(year)} | {'*' * (count // 5)}{count:3d} observações")
+                    print(f"{int(year)} | {'*' * (count // 5)}{count:3d} observações", file=file)
         except (ValueError, TypeError) as e:
-            print(f"Erro na conversão de datas: {e}")
-    
-    def function_14_correlation_analysis(self):
-        print("=" * 60)
-        print("CORRELAÇÃO PESO vs COMPRIMENTO")
-        print("=" * 60)
-        
+            print(f"Erro na conversão de datas: {e}", file=file)
+
+    def function_14_correlation_analysis(self, file=None):
+        print("=" * 60, file=file)
+        print("CORRELAÇÃO PESO vs COMPRIMENTO", file=file)
+        print("=" * 60, file=file)
+
+
+        result = self.compute_correlation_analysis()
+        correlation = result['correlation']
+
+        if correlation is not None:
+            print(f"Coeficiente de correlação de Pearson: {correlation:.4f}", file=file)
 
-        valid_data = self.data[['Observed Length (m)', 'Observed Weight (kg)']].dropna()
-        
-        if len(valid_data) > 1:
-            correlation = valid_data['Observed Length (m)'].corr(valid_data['Observed Weight (kg)'])
-            print(f"Coeficiente de correlação de Pearson: {correlation:.4f}")
-            
             if correlation > 0.8:
-                print("Correlação muito forte e positiva")
+                print("Correlação muito forte e positiva", file=file)
             elif correlation > 0.6:
-                print("Correlação forte e positiva")
+                print("Correlação forte e positiva", file=file)
             elif correlation > 0.4:
-                print("Correlação moderada e positiva")
+                print("Correlação moderada e positiva", file=file)
             elif correlation > 0.2:
-                print("Correlação fraca e positiva")
+                print("Correlação fraca e positiva", file=file)
             else:
-                print("Correlação muito fraca")
-            
-            print(f"\nDados válidos para análise: {len(valid_data)}")
+                print("Correlação muito fraca", file=file)
+
+            print(f"\nDados válidos para análise: {result['valid']}", file=file)
         else:
-            print("Dados insuficientes para análise de correlação")
-    def function_15_species_by_habitat(self):
-        print("=" * 60)
-        print("DIVERSIDADE DE ESPÉCIES POR HABITAT")
-        print("=" * 60)
-        
-        habitat_diversity = self.data.groupby('Habitat Type')['Common Name'].nunique().sort_values(ascending=False)
-        
+            print("Dados insuficientes para análise de correlação", file=file)
+    def function_15_species_by_habitat(self, file=None):
+        print("=" * 60, file=file)
+        print("DIVERSIDADE DE ESPÉCIES POR HABITAT", file=file)
+        print("=" * 60, file=file)
+
+        habitat_diversity = self.compute_species_by_habitat()
+
         for habitat, species_count in habitat_diversity.items():
-            print(f"{habitat:<25} | {species_count:2d} espécies diferentes")
-    
-    def function_16_adult_vs_juvenile(self):
-        print("=" * 60)
-        print("COMPARAÇÃO ADULTO vs JUVENIL")
-        print("=" * 60)
-        
-        adults = self.data[self.data['Age Class'] == 'Adult']
-        juveniles = self.data[self.data['Age Class'] == 'Juvenile']
-        
-        print("ADULTOS:")
-        if len(adults) > 0:
-            adult_length = adults['Observed Length (m)'].dropna()
-            adult_weight = adults['Observed Weight (kg)'].dropna()
-            print(f"  Comprimento médio: {adult_length.mean():.2f}m")
-            print(f"  Peso médio: {adult_weight.mean():.2f}kg")
-            print(f"  Total: {len(adults)} observações")
-        
-        print("\nJUVENIS:")
-        if len(juveniles) > 0:
-            juv_length = juveniles['Observed Length (m)'].dropna()
-            juv_weight = juveniles['Observed Weight (kg)'].dropna()
-            print(f"  Comprimento médio: {juv_length.mean():.2f}m")
-            print(f"  Peso médio: {juv_weight.mean():.2f}kg")
-            print(f"  Total: {len(juveniles)} observações")
-    
-    def function_17_endangered_species(self):
-        print("=" * 60)
-        print("ESPÉCIES AMEAÇADAS DE EXTINÇÃO")
-        print("=" * 60)
-        
-        endangered_status = ['Critically Endangered', 'Endangered', 'Vulnerable']
-        endangered = self.data[self.data['Conservation Status'].isin(endangered_status)]
-        
-        if len(endangered) > 0:
-            endangered_species = endangered.groupby(['Common Name', 'Conservation Status']).size().reset_index(name='Count')
-            
+            print(f"{habitat:<25} | {species_count:2d} espécies diferentes", file=file)
+
+    def function_16_adult_vs_juvenile(self, file=None):
+        print("=" * 60, file=file)
+        print("COMPARAÇÃO ADULTO vs JUVENIL", file=file)
+        print("=" * 60, file=file)
+
+        cohorts = self.compute_adult_vs_juvenile()
+        adults = cohorts['Adult']
+        juveniles = cohorts['Juvenile']
+
+        print("ADULTOS:", file=file)
+        if adults['count'] > 0:
+            print(f"  Comprimento médio: {adults['mean_length']:.2f}m", file=file)
+            print(f"  Peso médio: {adults['mean_weight']:.2f}kg", file=file)
+            print(f"  Total: {adults['count']} observações", file=file)
+
+        print("\nJUVENIS:", file=file)
+        if juveniles['count'] > 0:
+            print(f"  Comprimento médio: {juveniles['mean_length']:.2f}m", file=file)
+            print(f"  Peso médio: {juveniles['mean_weight']:.2f}kg", file=file)
+            print(f"  Total: {juveniles['count']} observações", file=file)
+
+    def function_17_endangered_species(self, file=None):
+        print("=" * 60, file=file)
+        print("ESPÉCIES AMEAÇADAS DE EXTINÇÃO", file=file)
+        print("=" * 60, file=file)
+
+        endangered_species = self.compute_endangered_species()
+
+        if len(endangered_species) > 0:
             for _, row in endangered_species.iterrows():
-                print(f"{row['Common Name']:<35} | {row['Conservation Status']:<20} | {row['Count']} obs.")
+                print(f"{row['Common Name']:<35} | {row['Conservation Status']:<20} | {row['Count']} obs.", file=file)
         else:
-            print("Nenhuma espécie ameaçada encontrada no dataset")
-    
-    def function_18_observer_statistics(self):
-        print("=" * 60)
-        print("ESTATÍSTICAS DOS OBSERVADORES")
-        print("=" * 60)
-        
-        observer_stats = self.data['Observer Name'].value_counts()
-        print(f"Total de observadores: {len(observer_stats)}")
-        print(f"Observador mais ativo: {observer_stats.index[0]} ({observer_stats.iloc[0]} observações)")
-        print(f"Média de observações por observador: {observer_stats.mean():.1f}")
-        
-        print("\nTop 10 observadores mais ativos:")
-        for i, (observer, count) in enumerate(observer_stats.head(10).items(), 1):
-            print(f"{i:2d}. {observer:<25} | {count:3d} observações")
-    
-    def function_19_missing_data_analysis(self):
-        print("=" * 60)
-        print("ANÁLISE DE DADOS FALTANTES")
-        print("=" * 60)
-        
-        missing_data = self.data.isnull().sum()
-        total_rows = len(self.data)
-        
-        print(f"Total de registros: {total_rows}")
-        print("\nDados faltantes por coluna:")
-        
+            print("Nenhuma espécie ameaçada encontrada no dataset", file=file)
+
+    def function_18_observer_statistics(self, file=None):
+        print("=" * 60, file=file)
+        print("ESTATÍSTICAS DOS OBSERVADORES", file=file)
+        print("=" * 60, file=file)
+
+        observer_stats = self.compute_observer_statistics()
+        most_active, most_active_count = observer_stats['top'][0]
+        observers = observer_stats['observers']
+        print(f"Total de observadores: {observers if observers is not None else UNESTIMATED}", file=file)
+        print(f"Observador mais ativo: {most_active} ({most_active_count} observações)", file=file)
+        if observers is not None:
+            print(f"Média de observações por observador: {observer_stats['observations'] / observers:.1f}", file=file)
+
+        print("\nTop 10 observadores mais ativos:", file=file)
+        for i, (observer, count) in enumerate(observer_stats['top'], 1):
+            print(f"{i:2d}. {observer:<25} | {count:3d} observações", file=file)
+
+    def function_19_missing_data_analysis(self, file=None):
+        print("=" * 60, file=file)
+        print("ANÁLISE DE DADOS FALTANTES", file=file)
+        print("=" * 60, file=file)
+
+        result = self.compute_missing_data_analysis()
+        missing_data = result['missing']
+        total_rows = result['total']
+
+        print(f"Total de registros: {total_rows}", file=file)
+        print("\nDados faltantes por coluna:", file=file)
+
         for column, missing_count in missing_data.items():
             if missing_count > 0:
                 percentage = (missing_count / total_rows) * 100
-                print(f"{column:<30} | {missing_count:3d} ({percentage:5.1f}%)")
+                print(f"{column:<30} | {missing_count:3d} ({percentage:5.1f}%)", file=file)
             else:
-                print(f"{column:<30} | Completo")
-    
-    def function_20_summary_report(self):
-        print("=" * 80)
-        print("RELATÓRIO RESUMO COMPLETO DO DATASET")
-        print("=" * 80)
-        
-        print(f"DADOS GERAIS:")
-        print(f"   Total de observações: {len(self.data)}")
-        print(f"   Espécies únicas: {self.data['Common Name'].nunique()}")
-        print(f"   Países/regiões: {self.data['Country/Region'].nunique()}")
-        print(f"   Tipos de habitat: {self.data['Habitat Type'].nunique()}")
-        print(f"   Observadores: {self.data['Observer Name'].nunique()}")
-        
-        print(f"\nMEDIDAS FÍSICAS:")
-        length_stats = self.data['Observed Length (m)'].describe()
-        weight_stats = self.data['Observed Weight (kg)'].describe()
-        print(f"   Comprimento: {length_stats['min']:.2f}m - {length_stats['max']:.2f}m (média: {length_stats['mean']:.2f}m)")
-        print(f"   Peso: {weight_stats['min']:.1f}kg - {weight_stats['max']:.1f}kg (média: {weight_stats['mean']:.1f}kg)")
-        
-        print(f"\nCONSERVAÇÃO:")
-        conservation_counts = self.data['Conservation Status'].value_counts()
+                print(f"{column:<30} | Completo", file=file)
+
+    def function_20_summary_report(self, file=None):
+        print("=" * 80, file=file)
+        print("RELATÓRIO RESUMO COMPLETO DO DATASET", file=file)
+        print("=" * 80, file=file)
+
+        summary = self.compute_summary_report()
+
+        print(f"DADOS GERAIS:", file=file)
+        print(f"   Total de observações: {summary['total']}", file=file)
+        print(f"   Espécies únicas: {summary['species']}", file=file)
+        print(f"   Países/regiões: {summary['countries']}", file=file)
+        print(f"   Tipos de habitat: {summary['habitats'] if summary['habitats'] is not None else UNESTIMATED}", file=file)
+        print(f"   Observadores: {summary['observers'] if summary['observers'] is not None else UNESTIMATED}", file=file)
+
+        print(f"\nMEDIDAS FÍSICAS:", file=file)
+        length_stats = summary['length']
+        weight_stats = summary['weight']
+        print(f"   Comprimento: {length_stats['min']:.2f}m - {length_stats['max']:.2f}m (média: {length_stats['mean']:.2f}m)", file=file)
+        print(f"   Peso: {weight_stats['min']:.1f}kg - {weight_stats['max']:.1f}kg (média: {weight_stats['mean']:.1f}kg)", file=file)
+
+        print(f"\nCONSERVAÇÃO:", file=file)
+        conservation_counts = summary['conservation']
         endangered = conservation_counts.get('Critically Endangered', 0) + conservation_counts.get('Endangered', 0)
-        print(f"   Espécies em perigo crítico/extinção: {endangered}")
-        print(f"   Status mais comum: {conservation_counts.index[0]} ({conservation_counts.iloc[0]} obs.)")
-        
-        print(f"\nQUALIDADE DOS DADOS:")
-        completeness = ((len(self.data) - self.data.isnull().sum()) / len(self.data) * 100)
+        print(f"   Espécies em perigo crítico/extinção: {endangered}", file=file)
+        print(f"   Status mais comum: {conservation_counts.index[0]} ({conservation_counts.iloc[0]} obs.)", file=file)
+
+        print(f"\nQUALIDADE DOS DADOS:", file=file)
+        completeness = summary['completeness']
         avg_completeness = completeness.mean()
-        print(f"   Completude média: {avg_completeness:.1f}%")
-        print(f"   Coluna mais completa: {completeness.idxmax()} ({completeness.max():.1f}%)")
+        print(f"   Completude média: {avg_completeness:.1f}%", file=file)
+        print(f"   Coluna mais completa: {completeness.idxmax()} ({completeness.max():.1f}%)", file=file)
         if completeness.min() < 100:
-            print(f"   Coluna com mais dados faltantes: {completeness.idxmin()} ({completeness.min():.1f}%)")
+            print(f"   Coluna com mais dados faltantes: {completeness.idxmin()} ({completeness.min():.1f}%)", file=file)
+
+    def function_21_taxonomy_rollup(self, file=None):
+        print("=" * 60, file=file)
+        print("OBSERVAÇÕES POR FAMÍLIA E GÊNERO", file=file)
+        print("=" * 60, file=file)
+
+        rollups = self.compute_taxonomy_rollup()
+        for level, title in (('Family', 'POR FAMÍLIA'), ('Genus', 'POR GÊNERO')):
+            print(f"{title}:", file=file)
+            for _, row in rollups[level].iterrows():
+                percentage = (row['count'] / self.total_rows) * 100
+                print(f"    {row[level]:<25} | {int(row['count']):3d} ({percentage:5.1f}%) | "
+                      f"{int(row['species']):2d} espécies | média {row['length_mean']:.2f}m / {row['weight_mean']:.1f}kg", file=file)
+            print(file=file)
+
+
+class UsageStatistics:
+
+    # Sem caminho (nenhum cache gravável) as contagens ficam só em memória
+    def __init__(self, path):
+        self.path = path
+        self.counts = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as f:
+                self.counts = {int(option): count for option, count in json.load(f).items()}
+        except (OSError, ValueError):
+            self.counts = {}
+
+    def record(self, option):
+        with self._lock:
+            self.counts[option] = self.counts.get(option, 0) + 1
+            if self.path is None:
+                return
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump(self.counts, f, indent=2)
+            except OSError:
+                pass
+
+    def ranking(self):
+        default_rank = {option: i for i, option in enumerate(DEFAULT_PRECOMPUTE_ORDER)}
+        return sorted(ANALYSIS_OPTIONS,
+                      key=lambda option: (-self.counts.get(option, 0), default_rank.get(option, len(default_rank))))
+
+
+class BackgroundPreloader:
+
+    def __init__(self, csv_file, top_n=PRECOMPUTE_TOP_N, filters=None, sample=None, refine=False,
+                 backend=None, session=False, memory_limit=None):
+        self.csv_file = csv_file
+        self.top_n = top_n
+        self.filters = filters
+        self.sample = sample
+        self.refine = refine
+        self.backend = backend
+        self.session = session
+        self.memory_limit = memory_limit
+        try:
+            usage_file = cache_path(csv_file, 'usage.json')
+        except OSError:
+            usage_file = None
+        self.usage = UsageStatistics(usage_file)
+        self._analyzer = None
+        self._error = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            self._analyzer = CrocodileAnalyzer(self.csv_file, verbose=False, filters=self.filters,
+                                               sample=self.sample, refine=self.refine, backend=self.backend,
+                                               session=self.session, memory_limit=self.memory_limit)
+        except BaseException as e:
+            # sys.exit() dentro da thread é repassado para quem pedir o analisador
+            self._error = e
+            return
+        finally:
+            self._ready.set()
+
+        for option in self.usage.ranking()[:self.top_n]:
+            if self._stop.is_set():
+                break
+            try:
+                self._analyzer.precompute([option])
+            except Exception:
+                # O cálculo especulativo será refeito (e reportado) quando a opção for escolhida
+                pass
+
+        if not self._stop.is_set():
+            try:
+                # Índice de busca textual fica pronto (e persistido) sem atrasar o menu
+                self._analyzer.text_index
+            except Exception:
+                pass
+
+    def get_analyzer(self, timeout=None):
+        if not self._ready.wait(timeout):
+            return None
+        if self._error is not None:
+            raise self._error
+        return self._analyzer
+
+    def wait_until_idle(self, timeout=None):
+        self._thread.join(timeout)
+
+    def save_session(self):
+        if not self.session or not self._ready.is_set() or self._error is not None:
+            return None
+        return self._analyzer.save_session()
+
+
+def follow_observations(path, follow=True, poll_interval=MONITOR_POLL_SECONDS, stop_event=None):
+    # Lê o CSV em blocos e continua acompanhando o que for anexado (como tail -f);
+    # uma linha só é processada quando termina em quebra de linha
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader([f.readline()]))
+        pending = ''
+        while stop_event is None or not stop_event.is_set():
+            block = f.read(DECOMPRESS_BLOCK_SIZE)
+            if block:
+                complete, _, pending = (pending + block).rpartition('\n')
+                if complete:
+                    yield pd.read_csv(io.StringIO(complete), names=header, header=None)
+                continue
+            if not follow:
+                break
+            if stop_event is not None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+
+
+def read_ndjson(stream, batch_rows=MONITOR_BATCH_ROWS):
+    # Um registro JSON por linha; o lote é entregue quando enche ou quando não há mais nada pronto
+    batch = []
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                batch.append(json.loads(line))
+            except ValueError:
+                continue
+        if batch and (len(batch) >= batch_rows or not _input_pending(stream)):
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+
+def _input_pending(stream):
+    try:
+        return bool(select.select([stream], [], [], 0)[0])
+    except (ValueError, TypeError, OSError, io.UnsupportedOperation):
+        return True
+
+
+class ObservationMonitor:
+
+    # Janela deslizante de N dias sobre a data de observação: um balde por dia num
+    # anel de tamanho fixo e totais correntes que somam na entrada e subtraem na expiração
+    def __init__(self, window_days=MONITOR_WINDOW_DAYS, endangered_share=None, species_threshold=None):
+        self.window_days = window_days
+        self.endangered_share = endangered_share
+        self.species_threshold = species_threshold
+        self.buckets = [None] * window_days
+        self.latest_day = None
+        self.total = 0
+        self.endangered = 0
+        self.species = Counter()
+        self.countries = Counter()
+        self.discarded = 0
+        self.active_alerts = {}
+
+    def _advance(self, day):
+        if self.latest_day is not None:
+            for expired in range(self.latest_day + 1, min(day, self.latest_day + self.window_days) + 1):
+                self._evict(expired % self.window_days)
+        self.latest_day = day
+
+    def _evict(self, slot):
+        bucket = self.buckets[slot]
+        self.buckets[slot] = None
+        if bucket is None:
+            return
+        self.total -= bucket['total']
+        self.endangered -= bucket['endangered']
+        for running, counts in ((self.species, bucket['species']), (self.countries, bucket['countries'])):
+            running.subtract(counts)
+            for key in counts:
+                if running[key] <= 0:
+                    del running[key]
+
+    def _bucket(self, day):
+        slot = day % self.window_days
+        bucket = self.buckets[slot]
+        if bucket is None or bucket['day'] != day:
+            self._evict(slot)
+            bucket = {'day': day, 'total': 0, 'endangered': 0, 'species': Counter(), 'countries': Counter()}
+            self.buckets[slot] = bucket
+        return bucket
+
+    def add(self, records):
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        if not len(frame) or 'Date of Observation' not in frame.columns:
+            self.discarded += len(frame)
+            return []
+        dates = parse_observation_dates(frame['Date of Observation'])
+        valid = dates.notna().to_numpy()
+        days = dates.to_numpy()[valid].astype('datetime64[D]').astype(np.int64)
+        if not len(days):
+            self.discarded += len(frame)
+            return []
+        if self.latest_day is None or days.max() > self.latest_day:
+            self._advance(int(days.max()))
+
+        # Registros mais antigos que a janela não entram em balde nenhum
+        keep = days > self.latest_day - self.window_days
+        self.discarded += len(frame) - int(keep.sum())
+        batch = pd.DataFrame({
+            'day': days[keep],
+            'species': frame['Common Name'].to_numpy(dtype=object)[valid][keep] if 'Common Name' in frame else None,
+            'country': frame['Country/Region'].to_numpy(dtype=object)[valid][keep] if 'Country/Region' in frame else None,
+            'endangered': frame['Conservation Status'].isin(ENDANGERED_STATUS).to_numpy()[valid][keep]
+            if 'Conservation Status' in frame else False
+        })
+        for day, group in batch.groupby('day', sort=False):
+            bucket = self._bucket(int(day))
+            species = group['species'].value_counts().to_dict()
+            countries = group['country'].value_counts().to_dict()
+            endangered = int(group['endangered'].sum())
+            bucket['total'] += len(group)
+            bucket['endangered'] += endangered
+            bucket['species'].update(species)
+            bucket['countries'].update(countries)
+            self.total += len(group)
+            self.endangered += endangered
+            self.species.update(species)
+            self.countries.update(countries)
+        return self.check_alerts()
+
+    def share_endangered(self):
+        return self.endangered / self.total if self.total else 0.0
+
+    def check_alerts(self):
+        # Alertas disparam só ao cruzar o limite; voltam a disparar depois de normalizar
+        current = {}
+        if self.endangered_share is not None and self.total and self.share_endangered() >= self.endangered_share:
+            current['endangered_share'] = (f"Participação de espécies ameaçadas em {self.share_endangered():.1%} "
+                                           f"(limite {self.endangered_share:.1%})")
+        if self.species_threshold is not None:
+            for name, count in self.species.items():
+                if count >= self.species_threshold:
+                    current[('species', name)] = (f"{name}: {count} avistamentos em {self.window_days} dias "
+                                                  f"(limite {self.species_threshold})")
+        fired = [message for key, message in current.items() if key not in self.active_alerts]
+        self.active_alerts = current
+        return fired
+
+    def window_range(self):
+        if self.latest_day is None:
+            return None, None
+        end = np.datetime64(self.latest_day, 'D')
+        return end - np.timedelta64(self.window_days - 1, 'D'), end
+
+    def render(self, top_n=MONITOR_TOP_N):
+        start, end = self.window_range()
+        lines = ["=" * 60]
+        if start is None:
+            lines.append("MONITORAMENTO: aguardando observações...")
+            lines.append("=" * 60)
+            return '\n'.join(lines)
+        lines.append(f"MONITORAMENTO: {pd.Timestamp(start):%d-%m-%Y} a {pd.Timestamp(end):%d-%m-%Y} ({self.window_days} dias)")
+        lines.append("=" * 60)
+        lines.append(f"Observações na janela: {self.total}")
+        lines.append(f"Espécies ameaçadas: {self.endangered} ({self.share_endangered() * 100:.1f}%)")
+        for title, counts in (("ESPÉCIES MAIS AVISTADAS", self.species), ("PAÍSES/REGIÕES", self.countries)):
+            lines.append(f"\n{title}:")
+            for i, (name, count) in enumerate(counts.most_common(top_n), 1):
+                lines.append(f"{i:2d}. {name:<35} | {count:3d} observações")
+        if self.active_alerts:
+            lines.append("\nALERTAS ATIVOS:")
+            lines.extend(f"   {message}" for message in self.active_alerts.values())
+        if self.discarded:
+            lines.append(f"\nRegistros fora da janela ou sem data: {self.discarded}")
+        return '\n'.join(lines)
+
+
+def run_monitor(source, window_days=MONITOR_WINDOW_DAYS, endangered_share=None, species_threshold=None,
+                refresh_seconds=MONITOR_REFRESH_SECONDS, follow=True, stop_event=None):
+    monitor = ObservationMonitor(window_days, endangered_share, species_threshold)
+    batches = read_ndjson(sys.stdin) if source == '-' else \
+        follow_observations(source, follow=follow, stop_event=stop_event)
+    last_refresh = None
+    stale = False
+    # No terminal a tela é redesenhada no lugar; redirecionada, cada quadro é anexado
+    clear = "\033[H\033[J" if sys.stdout.isatty() else ""
+    try:
+        for batch in batches:
+            for message in monitor.add(batch):
+                print(f"ALERTA: {message}")
+            stale = True
+            now = time.monotonic()
+            if last_refresh is None or now - last_refresh >= refresh_seconds:
+                # A tela usa só os totais da janela; o histórico nunca é recalculado
+                print(clear + monitor.render())
+                last_refresh = now
+                stale = False
+    except KeyboardInterrupt:
+        print("\nMonitoramento encerrado pelo usuário.")
+    if stale or last_refresh is None:
+        print(monitor.render())
+    return monitor
+
+
+def report_tables(result, name='resultado'):
+    # Converte o retorno de um compute_* em tabelas (nome, DataFrame) para os formatos estruturados
+    if isinstance(result, pd.DataFrame):
+        return [(name, result.reset_index(drop=True))]
+    if isinstance(result, pd.Series):
+        frame = result.rename(result.name if result.name is not None else 'valor')
+        return [(name, frame.rename_axis(result.index.name or 'chave').reset_index())]
+    if not isinstance(result, dict):
+        return [(name, pd.DataFrame({'chave': [name], 'valor': [result]}))]
+
+    scalars, tables = {}, []
+    for key, value in result.items():
+        if isinstance(value, (pd.DataFrame, pd.Series, dict)):
+            tables.extend(report_tables(value, str(key)))
+        elif isinstance(value, list) and value and isinstance(value[0], tuple):
+            tables.append((str(key), pd.DataFrame(value, columns=['chave', 'valor'])))
+        elif isinstance(value, (list, tuple)):
+            tables.append((str(key), pd.DataFrame({str(key): list(value)})))
+        else:
+            scalars[str(key)] = value
+    if scalars:
+        tables.insert(0, (name, pd.DataFrame({'chave': list(scalars), 'valor': list(scalars.values())})))
+    return tables
+
+
+def _plain(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if value is pd.NaT or (not isinstance(value, (list, tuple, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _render_text(analyzer, options):
+    # O layout de texto é o das funções do menu, escrito direto no buffer do relatório: o stdout
+    # do processo não é desviado, então prints de outras threads não se misturam ao relatório
+    buffer = io.StringIO()
+    for position, option in enumerate(options):
+        if position:
+            buffer.write('\n')
+        if analyzer.estimable(option):
+            getattr(analyzer, analysis_function_name(option))(file=buffer)
+        buffer.write(analyzer.sampling_note(option))
+    return buffer.getvalue()
+
+
+def _analysis_tables(analyzer, options):
+    for option in options:
+        if not analyzer.estimable(option):
+            # Recusada sobre a amostra: a nota da amostragem explica o motivo
+            yield option, []
+            continue
+        yield option, report_tables(getattr(analyzer, analysis_compute_name(option))(), ANALYSIS_OPTIONS[option])
+
+
+def _render_json(analyzer, options):
+    report = {
+        'source': analyzer.csv_file,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'analyses': [{
+            'option': option,
+            'name': ANALYSIS_OPTIONS[option],
+            'title': ANALYSIS_TITLES[option],
+            'sampling_note': analyzer.sampling_note(option) or None,
+            'tables': {name: [{str(column): _plain(value) for column, value in row.items()}
+                              for row in table.to_dict('records')] for name, table in tables}
+        } for option, tables in _analysis_tables(analyzer, options)]
+    }
+    return json.dumps(report, ensure_ascii=False, indent=2) + '\n'
+
+
+def _render_csv(analyzer, options):
+    # Formato longo: uma célula por linha, legível por qualquer ferramenta sem conhecer cada tabela
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['analysis', 'table', 'row', 'column', 'value'])
+    for option, tables in _analysis_tables(analyzer, options):
+        for name, table in tables:
+            for row, record in enumerate(table.itertuples(index=False, name=None)):
+                writer.writerows([analysis_function_name(option), name, row, column, _plain(value)]
+                                 for column, value in zip(table.columns, record))
+    return buffer.getvalue()
+
+
+def _markdown_cell(value):
+    value = _plain(value)
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        value = f"{value:.4g}"
+    return str(value).replace('|', '\\|')
+
+
+def _render_markdown(analyzer, options):
+    lines = ["# Relatório do dataset de crocodilos", "", f"Fonte: `{analyzer.csv_file}`"]
+    for option, tables in _analysis_tables(analyzer, options):
+        lines += ["", f"## {option}. {ANALYSIS_TITLES[option]}"]
+        if not analyzer.estimable(option):
+            lines += ["", f"_Indisponível na amostra: {SAMPLING_UNSUPPORTED[option]}._"]
+        for name, table in tables:
+            lines += ["", f"### {name}", "",
+                      "| " + " | ".join(str(column) for column in table.columns) + " |",
+                      "|" + "---|" * len(table.columns)]
+            lines += ["| " + " | ".join(_markdown_cell(value) for value in record) + " |"
+                      for record in table.itertuples(index=False, name=None)]
+    return '\n'.join(lines) + '\n'
+
+
+REPORT_RENDERERS = {
+    'text': _render_text,
+    'json': _render_json,
+    'csv': _render_csv,
+    'markdown': _render_markdown
+}
+
+
+def report_format_for(path):
+    return REPORT_FORMATS.get(os.path.splitext(path)[1].lower(), 'text')
+
+
+def render_report(analyzer, options=None, fmt='text'):
+    if fmt not in REPORT_RENDERERS:
+        raise ValueError(f"Formato de relatório inválido: {fmt}")
+    return REPORT_RENDERERS[fmt](analyzer, sorted(options or ANALYSIS_OPTIONS))
+
+
+def write_report(analyzer, path, fmt=None, options=None):
+    # O relatório inteiro é montado em memória e gravado numa única escrita
+    content = render_report(analyzer, options, fmt or report_format_for(path))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(content)
+    return len(content)
 
 
 def show_menu():
     print("\n" + "=" * 80)
     print("🐊 ANÁLISE INTERATIVA DO DATASET DE CROCODILOS 🐊")
     print("=" * 80)
-    print("Escolha uma das 20 opções de análise:")
+    print(f"Escolha uma das {len(ANALYSIS_TITLES)} opções de análise:")
     print()
-    
-    options = [
-        "1.  Informações básicas do dataset",
-        "2.  Contagem por espécie",  
-        "3.  Estatísticas de comprimento",
-        "4.  Estatísticas de peso",
-        "5.  Distribuição por habitat",
-        "6.  Status de conservação",
-        "7.  Análise por classe etária",
-        "8.  Distribuição por sexo",
-        "9.  Análise por país/região",
-        "10. Maiores espécimes (comprimento)",
-        "11. Espécimes mais pesados",
-        "12. Categorização por tamanho",
-        "13. Observações por ano",
-        "14. Correlação peso vs comprimento",
-        "15. Espécies por habitat",
-        "16. Comparação adulto vs juvenil",
-        "17. Espécies ameaçadas de extinção",
-        "18. Estatísticas dos observadores",
-        "19. Análise de dados faltantes",
-        "20. Relatório resumo completo"
-    ]
-    
-    
+
+    options = [f"{f'{option}.':<4}{title}" for option, title in ANALYSIS_TITLES.items()]
+
+
     for i in range(0, len(options), 2):
         left = options[i] if i < len(options) else ""
         right = options[i+1] if i+1 < len(options) else ""
         print(f"{left:<40} {right}")
-    
+
     print()
+    print("R.  Exportar relatório completo (todas as análises)")
     print("0.  Sair")
     print("=" * 80)
 
-def main():
-    
-    csv_file = 'crocodile_dataset.csv'
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Análise interativa do dataset de crocodilos")
+    parser.add_argument('source', nargs='?', default='crocodile_dataset.csv',
+                        help="Arquivo CSV, diretório de partições ou manifesto JSON")
+    parser.add_argument('--country', action='append', help="Restringe a análise a um país/região")
+    parser.add_argument('--year', action='append', type=int, help="Restringe a análise a um ano")
+    parser.add_argument('--species', action='append', help="Restringe a análise a uma espécie (nome comum)")
+    parser.add_argument('--monitor', action='store_true',
+                        help="Acompanha o CSV à medida que cresce ('-' lê JSON por linha da entrada padrão)")
+    parser.add_argument('--window-days', type=int, default=MONITOR_WINDOW_DAYS, help="Tamanho da janela do monitoramento")
+    parser.add_argument('--alert-endangered-share', type=float,
+                        help="Alerta quando a fração de espécies ameaçadas na janela atinge o valor (ex.: 0.4)")
+    parser.add_argument('--alert-species', type=int,
+                        help="Alerta quando uma espécie atinge esse número de avistamentos na janela")
+    parser.add_argument('--report', metavar='ARQUIVO',
+                        help="Executa todas as análises e grava o relatório completo no arquivo")
+    parser.add_argument('--format', choices=sorted(REPORT_RENDERERS),
+                        help="Formato do relatório (padrão: pela extensão do arquivo, senão texto)")
+    parser.add_argument('--sample', nargs='?', type=int, const=SAMPLE_PER_STRATUM, metavar='POR_ESTRATO',
+                        help=f"Responde a partir de uma amostra estratificada por espécie e país "
+                             f"(padrão: {SAMPLE_PER_STRATUM} linhas por estrato)")
+    parser.add_argument('--refine', action='store_true',
+                        help="Com --sample, calcula os resultados exatos em segundo plano e os usa quando prontos")
+    parser.add_argument('--backend', choices=sorted(COMPUTE_BACKENDS), default=DEFAULT_BACKEND,
+                        help="Motor de cálculo das análises (polars/duckdb são opcionais e multi-thread)")
+    parser.add_argument('--no-session', dest='session', action='store_false',
+                        help="Não restaura nem salva a sessão (dados e análises calculadas) entre execuções")
+    parser.add_argument('--memory-limit', type=parse_memory_size, metavar='TAMANHO',
+                        help="Teto de memória dos agrupamentos (ex.: 512M); acima dele as análises 15, 17 e 18 "
+                             "agregam em partições gravadas em disco")
+    parser.add_argument('--search', help="Analisa só as observações cujas notas/nomes contêm os termos (aceita prefixo*)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+
+    args = parse_arguments(argv)
+    csv_file = args.source
+    filters = {key: value for key, value in
+               (('country', args.country), ('year', args.year), ('species', args.species)) if value}
+    try:
+        get_backend(args.backend)
+    except RuntimeError as e:
+        print(e)
+        return
+    if args.monitor:
+        if csv_file != '-' and not os.path.exists(csv_file):
+            print(f"Arquivo {csv_file} não encontrado!")
+            return
+        run_monitor(csv_file, args.window_days, args.alert_endangered_share, args.alert_species)
+        return
+    if args.report:
+        if not os.path.exists(csv_file):
+            print(f"Arquivo {csv_file} não encontrado!")
+            return
+        analyzer = CrocodileAnalyzer(csv_file, verbose=False, filters=filters, sample=args.sample,
+                                     backend=args.backend, session=args.session, memory_limit=args.memory_limit)
+        report_analyzer = analyzer.search_analyzer(args.search) if args.search else analyzer
+        write_report(report_analyzer, args.report, args.format)
+        if args.session:
+            analyzer.save_session()
+        print(f"Relatório salvo em {args.report}")
+        return
     if not os.path.exists(csv_file):
         print(f"Arquivo {csv_file} não encontrado no diretório atual!")
         print("Certifique-se de que o arquivo está no mesmo diretório do programa.")
         return
-    
-
-    analyzer = CrocodileAnalyzer(csv_file)
-    
-
-    functions = {
-        1: analyzer.function_1_basic_info,
-        2: analyzer.function_2_species_count,
-        3: analyzer.function_3_size_statistics,
-        4: analyzer.function_4_weight_statistics,
-        5: analyzer.function_5_habitat_distribution,
-        6: analyzer.function_6_conservation_status,
-        7: analyzer.function_7_age_class_analysis,
-        8: analyzer.function_8_sex_distribution,
-        9: analyzer.function_9_country_analysis,
-        10: analyzer.function_10_largest_specimens,
-        11: analyzer.function_11_heaviest_specimens,
-        12: analyzer.function_12_size_categories,
-        13: analyzer.function_13_yearly_observations,
-        14: analyzer.function_14_correlation_analysis,
-        15: analyzer.function_15_species_by_habitat,
-        16: analyzer.function_16_adult_vs_juvenile,
-        17: analyzer.function_17_endangered_species,
-        18: analyzer.function_18_observer_statistics,
-        19: analyzer.function_19_missing_data_analysis,
-        20: analyzer.function_20_summary_report
-    }
-    
-    
+
+
+    # O menu aparece imediatamente enquanto os dados são carregados em segundo plano
+    preloader = BackgroundPreloader(csv_file, filters=filters, sample=args.sample, refine=args.refine,
+                                    backend=args.backend, session=args.session,
+                                    memory_limit=args.memory_limit).start()
+    searched = None
+
+    def current_analyzer():
+        nonlocal searched
+        analyzer = preloader.get_analyzer(timeout=0)
+        if analyzer is None:
+            print("\nAguardando o carregamento do dataset...")
+            analyzer = preloader.get_analyzer()
+        if args.search:
+            if searched is None:
+                searched = analyzer.search_analyzer(args.search)
+                print(f"\nBusca \"{args.search}\": {len(searched.data)} observações encontradas.")
+            analyzer = searched
+        return analyzer
+
+
     while True:
         show_menu()
-        
+
         try:
-            choice = input("Digite sua opção (0-20): ").strip()
-            
+            choice = input("Digite sua opção (0-21): ").strip()
+
             if choice == '0':
+                preloader.stop()
+                if preloader.save_session():
+                    print("\nSessão salva: o próximo início será imediato.")
                 print("\nObrigado por usar o Analisador de Crocodilos! Até mais!")
                 break
-            
+
+            if choice.upper() == 'R':
+                path = input(f"Arquivo do relatório [{DEFAULT_REPORT_FILE}]: ").strip() or DEFAULT_REPORT_FILE
+                write_report(current_analyzer(), path)
+                print(f"Relatório ({report_format_for(path)}) salvo em {path}")
+                input("\nPressione ENTER para continuar...")
+                continue
+
             choice_int = int(choice)
-            
-            if choice_int in functions:
+
+            if choice_int in ANALYSIS_OPTIONS:
+                analyzer = current_analyzer()
+                preloader.usage.record(choice_int)
                 print("\n")
-                functions[choice_int]()
+                # Cada análise é montada num buffer e vai ao terminal numa única escrita
+                sys.stdout.write(render_report(analyzer, [choice_int]))
+                sys.stdout.flush()
                 input("\nPressione ENTER para continuar...")
             else:
-                print("Opção inválida! Por favor, digite um número de 0 a 20.")
+                print("Opção inválida! Por favor, digite um número de 0 a 21.")
                 input("Pressione ENTER para continuar...")
-                
+
         except ValueError:
             print("Por favor, digite apenas números!")
             input("Pressione ENTER para continuar...")
         except KeyboardInterrupt:
+            preloader.stop()
+            preloader.save_session()
             print("\n\nPrograma interrompido pelo usuário. Até mais!")
             break
         except Exception as e:
@@ -6,12 +6,157 @@ import shutil
 import zipfile
 import tarfile
 import json
+import hashlib
+import queue
+import threading
 from datetime import datetime
 import subprocess
 
-def create_build_info():
-
-    build_info = {
+CHUNK_SIZE = 1024 * 1024
+QUEUE_CHUNKS = 16
+BUILD_MANIFEST = '.build-manifest.json'
+GENERATED_FILES = ('build-info.json', 'installed-packages.json', 'INSTALL.md')
+_END_OF_FILE = object()
+
+
+class _QueueReader:
+
+    # Entrega ao tarfile os blocos de um único arquivo, exatamente no tamanho pedido
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = bytearray()
+        self._finished = False
+
+    def read(self, size=-1):
+        while not self._finished and (size < 0 or len(self._buffer) < size):
+            chunk = self._chunks.get()
+            if chunk is _END_OF_FILE:
+                self._finished = True
+            else:
+                self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def drain(self):
+        while not self._finished:
+            self.read(CHUNK_SIZE)
+
+
+class StreamingPackager:
+
+    # Lê cada arquivo uma única vez e envia os blocos em paralelo para a cópia em dist/,
+    # para o .zip e para o .tar.gz, calculando tamanho e SHA-256 durante a leitura.
+    def __init__(self, zip_filename, tar_filename, dist_dir='dist'):
+        self.zip_filename = zip_filename
+        self.tar_filename = tar_filename
+        self.dist_dir = dist_dir
+        self.records = []
+        self._errors = []
+        self._queues = []
+        self._threads = []
+        for target in (self._write_zip, self._write_tar):
+            chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+            thread = threading.Thread(target=self._run_sink, args=(target, chunks), daemon=True)
+            self._queues.append(chunks)
+            self._threads.append(thread)
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _run_sink(self, target, chunks):
+        try:
+            target(chunks)
+        except Exception as e:
+            self._errors.append(e)
+            # Continua consumindo para não travar a leitura dos arquivos
+            while chunks.get() is not None:
+                pass
+
+    def _write_zip(self, chunks):
+        with zipfile.ZipFile(self.zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            while True:
+                entry = chunks.get()
+                if entry is None:
+                    break
+                info = zipfile.ZipInfo(entry['arcname'], date_time=datetime.fromtimestamp(entry['mtime']).timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = (entry['mode'] & 0xFFFF) << 16
+                reader = _QueueReader(chunks)
+                with zipf.open(info, 'w', force_zip64=entry['size'] > zipfile.ZIP64_LIMIT) as target:
+                    while True:
+                        data = reader.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        target.write(data)
+
+    def _write_tar(self, chunks):
+        with tarfile.open(self.tar_filename, "w:gz") as tarf:
+            while True:
+                entry = chunks.get()
+                if entry is None:
+                    break
+                info = tarfile.TarInfo(entry['arcname'])
+                info.size = entry['size']
+                info.mtime = entry['mtime']
+                info.mode = entry['mode'] & 0o7777
+                reader = _QueueReader(chunks)
+                tarf.addfile(info, reader)
+                reader.drain()
+
+    def add_file(self, source, arcname, copy_to_dist=True):
+        stat = os.stat(source)
+        entry = {'arcname': arcname, 'size': stat.st_size, 'mtime': stat.st_mtime, 'mode': stat.st_mode}
+        for chunks in self._queues:
+            chunks.put(entry)
+
+        digest = hashlib.sha256()
+        size = 0
+        destination = os.path.join(self.dist_dir, arcname)
+        if copy_to_dist:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+        target = open(destination, 'wb') if copy_to_dist else None
+        try:
+            with open(source, 'rb') as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    digest.update(data)
+                    size += len(data)
+                    if target is not None:
+                        target.write(data)
+                    for chunks in self._queues:
+                        chunks.put(data)
+        finally:
+            for chunks in self._queues:
+                chunks.put(_END_OF_FILE)
+            if target is not None:
+                target.close()
+                shutil.copystat(source, destination)
+
+        record = {'path': arcname, 'size': size, 'sha256': digest.hexdigest()}
+        self.records.append(record)
+        return record
+
+    def close(self):
+        for chunks in self._queues:
+            chunks.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+def collect_build_info():
+
+    return {
         "build_timestamp": datetime.now().isoformat(),
         "repository": os.getenv('GITHUB_REPOSITORY', 'local-build'),
         "commit_sha": os.getenv('GITHUB_SHA', 'unknown')[:8],
@@ -24,13 +169,88 @@ def create_build_info():
         "project_name": "Crocodile Analyzer",
         "project_version": "1.0.0"
     }
+
+def create_build_info(file_hashes=None):
+
+    build_info = collect_build_info()
+    if file_hashes is not None:
+        build_info["files"] = {path: entry['sha256'] for path, entry in sorted(file_hashes.items())}
     
     with open('dist/build-info.json', 'w') as f:
         json.dump(build_info, f, indent=2)
     
     return build_info
 
-def create_requirements_check():
+def file_sha256(path):
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+def load_build_manifest():
+
+    try:
+        with open(BUILD_MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_build_manifest(manifest):
+
+    with open(BUILD_MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def hash_source_files(sources, previous):
+
+    # Só relê o conteúdo quando tamanho ou mtime mudaram desde a última build
+    hashes = {}
+    changed = []
+    for source, arcname, label in sources:
+        stat = os.stat(source)
+        cached = previous.get(arcname)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            digest = cached['sha256']
+        else:
+            digest = file_sha256(source)
+        hashes[arcname] = {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if not cached or cached['sha256'] != digest or not os.path.exists(os.path.join('dist', arcname)):
+            changed.append(arcname)
+    return hashes, changed
+
+def dependency_key():
+
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode())
+    digest.update(sys.version.encode())
+    if os.path.exists('requirements.txt'):
+        digest.update(file_sha256('requirements.txt').encode())
+    return digest.hexdigest()
+
+def remove_stale_files(expected):
+
+    for root, dirs, files in os.walk('dist', topdown=False):
+        for file in files:
+            path = os.path.join(root, file)
+            if os.path.relpath(path, 'dist').replace(os.sep, '/') not in expected:
+                os.remove(path)
+        if root != 'dist' and not os.listdir(root):
+            os.rmdir(root)
+
+def create_requirements_check(manifest=None):
+
+    key = dependency_key()
+    cached = (manifest or {}).get('dependencies', {})
+    if cached.get('key') == key and 'packages' in cached:
+        if not os.path.exists('dist/installed-packages.json'):
+            with open('dist/installed-packages.json', 'w') as f:
+                json.dump(cached['packages'], f, indent=2)
+        print(f" Reutilizando lista de {len(cached['packages'])} dependências (requirements.txt e interpretador inalterados)")
+        return cached
 
     try:
         result = subprocess.run([sys.executable, '-m', 'pip', 'list', '--format=json'], 
@@ -40,17 +260,49 @@ def create_requirements_check():
             with open('dist/installed-packages.json', 'w') as f:
                 json.dump(installed_packages, f, indent=2)
             print(f" Documentadas {len(installed_packages)} dependências instaladas")
+            return {'key': key, 'packages': installed_packages}
         else:
             print("  Não foi possível listar as dependências instaladas")
     except Exception as e:
         print(f"  Erro ao verificar dependências: {e}")
+    return {}
 
-def package_application():
+def archive_filenames(build_info):
+
+    version = build_info['project_version']
+    commit = build_info['commit_sha']
+    base = f"crocodile-analyzer-v{version}-{commit}"
+    return f"{base}.zip", f"{base}.tar.gz"
+
+def collect_source_files(essential_files, optional_files):
+
+    sources = []
+    for file in essential_files:
+        if not os.path.exists(file):
+            print(f" Arquivo essencial não encontrado: {file}")
+            return None
+        sources.append((file, file, "Copiado"))
+
+    for file in optional_files:
+        if os.path.exists(file):
+            sources.append((file, file, "✅ Copiado (opcional)"))
+
+    if os.path.exists('scripts'):
+        for root, dirs, files in os.walk('scripts'):
+            dirs.sort()
+            for file in sorted(files):
+                path = os.path.join(root, file)
+                sources.append((path, os.path.relpath(path).replace(os.sep, '/'), None))
+
+    return sources
+
+def package_application(clean=False):
 
     print(" Iniciando empacotamento da aplicação...")
     
     
-    if os.path.exists('dist'):
+    manifest = {} if clean else load_build_manifest()
+    if clean and os.path.exists('dist'):
         shutil.rmtree('dist')
     os.makedirs('dist', exist_ok=True)
     
@@ -58,6 +310,7 @@ def package_application():
     essential_files = [
         'crocodile_analyzer_terminal.py',
         'crocodile_dataset.csv',
+        'crocodile_regions.csv',
         'requirements.txt',
         'README.md'
     ]
@@ -67,42 +320,78 @@ def package_application():
         'test_crocodile_analyzer.py'
     ]
     
+    sources = collect_source_files(essential_files, optional_files)
+    if sources is None:
+        return False
 
-    for file in essential_files:
-        if os.path.exists(file):
-            shutil.copy2(file, 'dist/')
-            print(f" Copiado: {file}")
-        else:
-            print(f" Arquivo essencial não encontrado: {file}")
-            return False
-    
+    file_hashes, changed = hash_source_files(sources, manifest.get('files', {}))
+    remove_stale_files(set(file_hashes) | set(GENERATED_FILES))
+    print(f" {len(changed)} de {len(sources)} arquivos alterados desde a última build")
 
-    for file in optional_files:
-        if os.path.exists(file):
-            shutil.copy2(file, 'dist/')
-            print(f"✅ Copiado (opcional): {file}")
-    
 
-    if os.path.exists('scripts'):
-        shutil.copytree('scripts', 'dist/scripts')
-        print("✅ Copiado: diretório scripts/")
-    
+    dependencies = create_requirements_check(manifest)
+
 
-    build_info = create_build_info()
+    create_installation_instructions()
+    file_hashes_with_generated = dict(file_hashes)
+    for generated in ('installed-packages.json', 'INSTALL.md'):
+        path = os.path.join('dist', generated)
+        if os.path.exists(path):
+            file_hashes_with_generated[generated] = {'sha256': file_sha256(path)}
+
+
+    build_info = collect_build_info()
+    inputs = {key: build_info[key] for key in ('project_name', 'project_version', 'commit_sha', 'python_version')}
+    archive_key = hashlib.sha256(json.dumps({
+        'files': {path: entry['sha256'] for path, entry in file_hashes_with_generated.items()},
+        'dependencies': dependencies.get('key'),
+        'inputs': inputs
+    }, sort_keys=True).encode()).hexdigest()
+
+    zip_filename, tar_filename = archive_filenames(build_info)
+    archives_present = os.path.exists(zip_filename) and os.path.exists(tar_filename)
+    if (not changed and manifest.get('archive_key') == archive_key and archives_present
+            and os.path.exists('dist/build-info.json')):
+        print(" Nenhuma alteração desde a última build: pacotes reaproveitados")
+        calculate_package_stats(manifest.get('records', []))
+        print(" Empacotamento concluído com sucesso!")
+        return True
+
+
+    build_info = create_build_info(file_hashes_with_generated)
     print(" Criado: build-info.json")
     
 
-    create_requirements_check()
-    
+    # Cada arquivo é lido uma vez e gravado em dist/ (se alterado), no .zip e no .tar.gz ao mesmo tempo
+    with StreamingPackager(zip_filename, tar_filename) as packager:
+        for source, arcname, label in sources:
+            copy = arcname in changed
+            packager.add_file(source, arcname, copy_to_dist=copy)
+            if label:
+                print(f" {label}: {source}" if copy else f" Inalterado: {source}")
+        if os.path.exists('scripts'):
+            print("✅ Copiado: diretório scripts/")
+
+        for generated in GENERATED_FILES:
+            path = os.path.join('dist', generated)
+            if os.path.exists(path):
+                packager.add_file(path, generated, copy_to_dist=False)
+
+    print(f" Criado pacote ZIP: {zip_filename}")
+    print(f" Criado pacote TAR.GZ: {tar_filename}")
 
-    create_installation_instructions()
-    
 
-    create_zip_package(build_info)
-    create_tar_package(build_info)
+    save_build_manifest({
+        'files': file_hashes,
+        'dependencies': dependencies,
+        'inputs': inputs,
+        'archive_key': archive_key,
+        'archives': [zip_filename, tar_filename],
+        'records': packager.records
+    })
     
 
-    calculate_package_stats()
+    calculate_package_stats(packager.records)
     
     print(" Empacotamento concluído com sucesso!")
     return True
@@ -147,6 +436,7 @@ pytest test_crocodile_analyzer.py -v
 ##  Arquivos Incluídos
 - `crocodile_analyzer_terminal.py` - Aplicação principal
 - `crocodile_dataset.csv` - Dataset de crocodilos
+- `crocodile_regions.csv` - Tabela de países/regiões por continente e reino biogeográfico
 - `requirements.txt` - Dependências Python
 - `README.md` - Documentação do projeto
 - `build-info.json` - Informações da build
@@ -162,37 +452,7 @@ Este pacote foi gerado automaticamente pelo pipeline CI/CD do projeto C14.
     
     print(" Criado: INSTALL.md")
 
-def create_zip_package(build_info):
-
-    version = build_info['project_version']
-    commit = build_info['commit_sha']
-    zip_filename = f"crocodile-analyzer-v{version}-{commit}.zip"
-    
-    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk('dist'):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arc_name = os.path.relpath(file_path, 'dist')
-                zipf.write(file_path, arc_name)
-    
-    print(f" Criado pacote ZIP: {zip_filename}")
-
-def create_tar_package(build_info):
-
-    version = build_info['project_version']
-    commit = build_info['commit_sha']
-    tar_filename = f"crocodile-analyzer-v{version}-{commit}.tar.gz"
-    
-    with tarfile.open(tar_filename, "w:gz") as tarf:
-        for root, dirs, files in os.walk('dist'):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arc_name = os.path.relpath(file_path, 'dist')
-                tarf.add(file_path, arcname=arc_name)
-    
-    print(f" Criado pacote TAR.GZ: {tar_filename}")
-
-def calculate_package_stats():
+def calculate_package_stats(records):
 
     print("\n ESTATÍSTICAS DOS PACOTES:")
     print("-" * 40)
@@ -203,15 +463,13 @@ def calculate_package_stats():
             size_mb = size / (1024 * 1024)
             print(f"{file}: {size:,} bytes ({size_mb:.2f} MB)")
 
-    dist_size = 0
-    file_count = 0
-    for root, dirs, files in os.walk('dist'):
-        for file in files:
-            file_path = os.path.join(root, file)
-            dist_size += os.path.getsize(file_path)
-            file_count += 1
+    # Tamanhos e checksums já foram calculados durante a leitura dos arquivos
+    dist_size = sum(record['size'] for record in records)
+    file_count = len(records)
     
     print(f"\nDiretório dist: {file_count} arquivos, {dist_size:,} bytes ({dist_size/(1024*1024):.2f} MB)")
+    for record in records:
+        print(f"  {record['sha256'][:16]}  {record['path']}")
 
 def validate_package():
  
@@ -256,7 +514,7 @@ def main():
     print(" Iniciando processo de build...")
     
     try:
-        success = package_application()
+        success = package_application(clean='--clean' in sys.argv[1:])
         if success and validate_package():
             print("\n BUILD CONCLUÍDA COM SUCESSO!")
             sys.exit(0)
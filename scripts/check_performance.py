@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from crocodile_analyzer_terminal import (CrocodileAnalyzer, ANALYSIS_OPTIONS, CACHE_DIR_NAME,
+                                         analysis_function_name)
+
+BASELINE_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'performance_baseline.json')
+SOURCE_DATASET = os.path.join(ROOT_DIR, 'crocodile_dataset.csv')
+DEFAULT_ROWS = 100000
+DEFAULT_REPEATS = 3
+DEFAULT_MARGIN = 0.5
+DEFAULT_MIN_DELTA = 0.01
+INGEST_ROWS = 1000
+REFERENCE_SCENARIO = 'reference'
+REFERENCE_REPEATS = 5
+
+def generate_dataset(path, rows, seed=42):
+
+    # Dataset determinístico: mesmas linhas em toda execução para que os tempos sejam comparáveis
+    source = pd.read_csv(SOURCE_DATASET)
+    rng = np.random.default_rng(seed)
+    data = source.sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+    data['Observation ID'] = np.arange(1, rows + 1)
+    data['Observed Length (m)'] = np.round(rng.uniform(0.3, 6.5, rows), 2)
+    data['Observed Weight (kg)'] = np.round(rng.uniform(1, 1000, rows), 1)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, rows), unit='D')
+    data['Date of Observation'] = dates.strftime('%d-%m-%Y')
+    data['Observer Name'] = [f"Observer {i}" for i in rng.integers(0, max(rows // 10, 1), rows)]
+    data.to_csv(path, index=False)
+
+def time_call(func, repeats, setup=None):
+
+    # setup() prepara cada repetição fora da medição e o resultado é passado para func
+    best = None
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def reference_workload(csv_file):
+
+    # Carga fixa só de pandas, sem código do analisador: mede a velocidade da máquina
+    data = pd.read_csv(csv_file)
+    data.groupby(['Common Name', 'Habitat Type'])['Observed Weight (kg)'].describe()
+    data.sort_values(['Country/Region', 'Observed Length (m)'])['Observer Name'].value_counts()
+
+def run_scenarios(rows, repeats):
+
+    workdir = tempfile.mkdtemp(prefix='crocodile-perf-')
+    try:
+        csv_file = os.path.join(workdir, 'performance_dataset.csv')
+        generate_dataset(csv_file, rows)
+        cache_dir = os.path.join(workdir, CACHE_DIR_NAME)
+
+        results = {}
+
+        def cold_load():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            CrocodileAnalyzer(csv_file, verbose=False)
+
+        results['load'] = time_call(cold_load, repeats)
+
+        # Cada repetição usa um analisador novo e sem cache em disco: cubo e índices
+        # são construídos dentro da medição, como numa sessão nova
+        def fresh_analyzer():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return CrocodileAnalyzer(csv_file, verbose=False)
+
+        for option in sorted(ANALYSIS_OPTIONS):
+            name = analysis_function_name(option)
+            results[name] = time_call(lambda analyzer, name=name: getattr(analyzer, name)(), repeats,
+                                      setup=fresh_analyzer)
+
+        # Ingestão de um lote com os índices de observadores e de texto já construídos:
+        # mede a atualização incremental deles, não a reconstrução
+        def indexed_analyzer():
+            analyzer = fresh_analyzer()
+            analyzer.observer_index
+            analyzer.text_index
+            batch = analyzer.logical_frame().tail(INGEST_ROWS).assign(
+                **{'Observer Name': [f"New Observer {i}" for i in range(INGEST_ROWS)]})
+            return analyzer, batch
+
+        def ingest(prepared):
+            analyzer, batch = prepared
+            analyzer.ingest(batch)
+            analyzer.compute_observer_statistics()
+
+        results['ingest'] = time_call(ingest, repeats, setup=indexed_analyzer)
+
+        # Medida por último, com o processo já aquecido, e com mais repetições: é a régua das demais
+        results[REFERENCE_SCENARIO] = time_call(lambda: reference_workload(csv_file),
+                                                max(repeats, REFERENCE_REPEATS))
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def load_baseline(path):
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_baseline(path, rows, results):
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        "created_at": datetime.now().isoformat(),
+        "python_version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
+        "pandas_version": pd.__version__,
+        "rows": rows,
+        "scenarios": {name: round(seconds, 6) for name, seconds in results.items()}
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+def machine_scale(results, baseline):
+
+    # Razão entre a carga de referência desta execução e a da baseline: a baseline
+    # gravada em outra máquina é ajustada à velocidade da máquina atual
+    recorded = baseline.get('scenarios', {}).get(REFERENCE_SCENARIO)
+    current = results.get(REFERENCE_SCENARIO)
+    if not recorded or not current:
+        return None
+    return current / recorded
+
+def compare_with_baseline(results, baseline, margin, min_delta, scale=1.0):
+
+    regressions = []
+    print(f"\n{'Cenário':<40} {'Baseline':>10} {'Atual':>10} {'Variação':>10}")
+    print("-" * 74)
+    for name, seconds in results.items():
+        reference = baseline.get('scenarios', {}).get(name)
+        if name == REFERENCE_SCENARIO:
+            continue
+        if reference is None:
+            print(f"{name:<40} {'-':>10} {seconds:>9.4f}s {'novo':>10}")
+            continue
+        reference *= scale
+        change = (seconds - reference) / reference if reference > 0 else 0.0
+        regressed = seconds > reference * (1 + margin) and seconds - reference > min_delta
+        marker = "  <-- REGRESSÃO" if regressed else ""
+        print(f"{name:<40} {reference:>9.4f}s {seconds:>9.4f}s {change:>+9.1%}{marker}")
+        if regressed:
+            regressions.append((name, reference, seconds, change))
+    return regressions
+
+def parse_arguments(argv=None):
+
+    parser = argparse.ArgumentParser(description="Verificação de regressão de desempenho das análises")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Arquivo JSON com os tempos de referência")
+    parser.add_argument('--update-baseline', action='store_true', help="Grava os tempos atuais como nova referência")
+    parser.add_argument('--rows', type=int, help="Tamanho do dataset gerado (padrão: o da baseline)")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="Repetições por cenário (usa o menor tempo)")
+    parser.add_argument('--margin', type=float, default=float(os.getenv('PERF_MARGIN', DEFAULT_MARGIN)),
+                        help="Tolerância relativa sobre a baseline (0.5 = 50%% mais lento)")
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help="Diferença absoluta mínima em segundos para acusar regressão")
+    parser.add_argument('--absolute', dest='normalize', action='store_false',
+                        help="Compara tempos absolutos, sem ajustar a baseline pela carga de referência")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+
+    args = parse_arguments(argv)
+    baseline = load_baseline(args.baseline)
+    rows = args.rows or (baseline or {}).get('rows', DEFAULT_ROWS)
+
+    print(f" Executando cenários de desempenho ({rows:,} linhas, {args.repeats} repetições)...")
+    results = run_scenarios(rows, args.repeats)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, rows, results)
+        for name, seconds in results.items():
+            print(f"{name:<40} {seconds:>9.4f}s")
+        print(f"\n Baseline atualizada: {args.baseline}")
+        sys.exit(0)
+
+    if baseline is None:
+        print(f" Baseline não encontrada: {args.baseline}")
+        print(" Execute com --update-baseline para criá-la.")
+        sys.exit(1)
+
+    if baseline.get('rows') != rows:
+        recorded = f"{baseline['rows']:,}" if isinstance(baseline.get('rows'), int) else "um número desconhecido de"
+        print(f" AVISO: baseline medida com {recorded} linhas, execução atual com {rows:,}")
+
+    scale = machine_scale(results, baseline) if args.normalize else None
+    if scale is not None:
+        print(f" Baseline ajustada à máquina atual: fator {scale:.2f} (cenário '{REFERENCE_SCENARIO}')")
+    elif args.normalize:
+        print(f" AVISO: baseline sem o cenário '{REFERENCE_SCENARIO}'; comparando tempos absolutos")
+
+    regressions = compare_with_baseline(results, baseline, args.margin, args.min_delta, scale or 1.0)
+    if regressions:
+        print(f"\n FALHA: {len(regressions)} cenário(s) acima da baseline + {args.margin:.0%}:")
+        for name, reference, seconds, change in regressions:
+            print(f"   {name}: {reference:.4f}s -> {seconds:.4f}s ({change:+.1%})")
+        sys.exit(1)
+
+    print(f"\n Nenhuma regressão acima de {args.margin:.0%} da baseline.")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -4,105 +4,207 @@
 import smtplib
 import os
 import sys
+import time
+import queue
+import threading
+import functools
+import html
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import json
 
+BATCH_SIZE = 50
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0
+_STOP = object()
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S UTC"
+
+
+class NotificationDispatcher:
+    """Fila de emails enviada em segundo plano reutilizando uma conexão SMTP por lote"""
+
+    def __init__(self, smtp_server, smtp_port, sender, password=None, use_tls=True,
+                 batch_size=BATCH_SIZE, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS,
+                 smtp_factory=smtplib.SMTP):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender = sender
+        self.password = password
+        self.use_tls = use_tls
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.smtp_factory = smtp_factory
+        self.sent = []
+        self.failed = []
+        self.connections = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, recipient, message):
+        self._queue.put((recipient, message))
+
+    def close(self, timeout=None):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        return not self.failed
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._deliver(batch)
+
+    def _connect(self):
+        server = self.smtp_factory(self.smtp_server, self.smtp_port)
+        self.connections += 1
+        if self.use_tls:
+            server.starttls()
+        if self.password:
+            server.login(self.sender, self.password)
+        return server
+
+    def _deliver(self, batch):
+        pending = list(batch)
+        attempt = 0
+        while pending:
+            server = None
+            try:
+                server = self._connect()
+                while pending:
+                    recipient, message = pending[0]
+                    try:
+                        server.sendmail(self.sender, recipient, message.as_string())
+                        self.sent.append(recipient)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                        # Erro permanente deste destinatário: não adianta tentar de novo
+                        self.failed.append((recipient, str(e)))
+                    pending.pop(0)
+            except (smtplib.SMTPException, OSError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.failed.extend((recipient, str(e)) for recipient, _ in pending)
+                    return
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            finally:
+                if server is not None:
+                    try:
+                        server.quit()
+                    except (smtplib.SMTPException, OSError):
+                        pass
+
+
+def parse_recipients(value):
+
+    return [recipient.strip() for recipient in (value or '').split(',') if recipient.strip()]
+
+def read_pipeline_context(status=None):
+    """Lê uma única vez as variáveis de ambiente usadas na notificação"""
+    return {
+        'sender': os.getenv('PIPELINE_EMAIL_SENDER', 'noreply@github.com'),
+        'recipient': os.getenv('PIPELINE_EMAIL_RECIPIENT'),
+        'status': status or os.getenv('PIPELINE_STATUS', 'UNKNOWN'),
+        'repository': os.getenv('GITHUB_REPOSITORY', 'Unknown Repository'),
+        'actor': os.getenv('GITHUB_ACTOR', 'Unknown User'),
+        'sha': os.getenv('GITHUB_SHA', 'Unknown Commit')[:8],
+        'branch': os.getenv('GITHUB_REF', 'Unknown Branch').split('/')[-1],
+        'run_id': os.getenv('GITHUB_RUN_ID', 'Unknown Run'),
+        'workflow': os.getenv('GITHUB_WORKFLOW', 'CI/CD Pipeline')
+    }
+
+def create_notification_message(sender, recipient, status, repository, body):
+
+    text_body, html_body = body
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = f"[{status}] Pipeline CI/CD - {repository}"
+    msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
+    msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+    return msg
+
 def send_pipeline_notification():
 
     
     # Variáveis de ambiente obrigatórias
-    email_recipient = os.getenv('PIPELINE_EMAIL_RECIPIENT')
-    email_sender = os.getenv('PIPELINE_EMAIL_SENDER', 'noreply@github.com')
+    context = read_pipeline_context()
+    email_recipient = context['recipient']
+    email_sender = context['sender']
     email_password = os.getenv('PIPELINE_EMAIL_PASSWORD')
     smtp_server = os.getenv('PIPELINE_SMTP_SERVER', 'smtp.gmail.com')
     smtp_port = int(os.getenv('PIPELINE_SMTP_PORT', '587'))
     
-    # Informações do pipeline (passadas como argumentos ou variáveis de ambiente)
-    pipeline_status = os.getenv('PIPELINE_STATUS', 'UNKNOWN')
-    github_repository = os.getenv('GITHUB_REPOSITORY', 'Unknown Repository')
-    github_actor = os.getenv('GITHUB_ACTOR', 'Unknown User')
-    github_sha = os.getenv('GITHUB_SHA', 'Unknown Commit')[:8]
-    github_ref = os.getenv('GITHUB_REF', 'Unknown Branch').split('/')[-1]
-    github_run_id = os.getenv('GITHUB_RUN_ID', 'Unknown Run')
-    github_workflow = os.getenv('GITHUB_WORKFLOW', 'CI/CD Pipeline')
-    
     # Validar variáveis obrigatórias
-    if not email_recipient:
+    recipients = parse_recipients(email_recipient)
+    if not recipients:
         print("ERRO: Variável de ambiente PIPELINE_EMAIL_RECIPIENT não definida!")
         return False
         
-    if not email_password:
+    use_auth = os.getenv('PIPELINE_SMTP_AUTH', 'true').lower() != 'false'
+    if use_auth and not email_password:
         print("AVISO: Variável de ambiente PIPELINE_EMAIL_PASSWORD não definida!")
         print("Simulando envio de email...")
-        print_email_simulation()
+        print_email_simulation(context)
         return True
     
     try:
-        # Criar mensagem de email
-        msg = MIMEMultipart()
-        msg['From'] = email_sender
-        msg['To'] = email_recipient
-        msg['Subject'] = f"[{pipeline_status}] Pipeline CI/CD - {github_repository}"
+        # Criar corpo do email (o mesmo para todos os destinatários, renderizado uma vez)
+        body = render_email(context)
         
-        # Criar corpo do email
-        body = create_email_body(
-            pipeline_status, github_repository, github_actor,
-            github_sha, github_ref, github_run_id, github_workflow
+        # Enfileirar as mensagens: uma única conexão SMTP atende o lote inteiro
+        dispatcher = NotificationDispatcher(
+            smtp_server, smtp_port, email_sender,
+            password=email_password if use_auth else None,
+            use_tls=os.getenv('PIPELINE_SMTP_TLS', 'true').lower() != 'false',
+            max_retries=int(os.getenv('PIPELINE_SMTP_RETRIES', str(MAX_RETRIES))),
+            backoff=float(os.getenv('PIPELINE_SMTP_BACKOFF', str(BACKOFF_SECONDS)))
         )
+        with dispatcher:
+            for recipient in recipients:
+                dispatcher.submit(recipient, create_notification_message(
+                    email_sender, recipient, context['status'], context['repository'], body))
         
-        msg.attach(MIMEText(body, 'html'))
-        
-        # Conectar ao servidor SMTP e enviar email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(email_sender, email_password)
-        
-        text = msg.as_string()
-        server.sendmail(email_sender, email_recipient, text)
-        server.quit()
-        
-        print(f" Email enviado com sucesso para: {email_recipient}")
+        for recipient in dispatcher.sent:
+            print(f" Email enviado com sucesso para: {recipient}")
+        if dispatcher.failed:
+            for recipient, error in dispatcher.failed:
+                print(f" Erro ao enviar email para {recipient}: {error}")
+            print("Simulando envio de email...")
+            print_email_simulation(context)
         return True
         
     except Exception as e:
         print(f" Erro ao enviar email: {str(e)}")
         print("Simulando envio de email...")
-        print_email_simulation()
+        print_email_simulation(context)
         return True  # Retorna True para não falhar o pipeline
 
-def create_email_body(status, repository, actor, sha, branch, run_id, workflow):
-
-    
-    status_color = "#28a745" if status == "SUCCESS" else "#dc3545"
-    status_emoji = "" if status == "SUCCESS" else ""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-    
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Pipeline CI/CD Notification</title>
-    </head>
-    <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px;">
-            <h2 style="color: {status_color};">{status_emoji} Pipeline CI/CD - {status}</h2>
-            
-            <div style="background-color: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                <h3>📋 Informações do Pipeline</h3>
-                <ul>
-                    <li><strong>Repositório:</strong> {repository}</li>
-                    <li><strong>Workflow:</strong> {workflow}</li>
-                    <li><strong>Branch:</strong> {branch}</li>
-                    <li><strong>Commit:</strong> {sha}</li>
-                    <li><strong>Autor:</strong> {actor}</li>
-                    <li><strong>Run ID:</strong> {run_id}</li>
-                    <li><strong>Timestamp:</strong> {timestamp}</li>
-                </ul>
-            </div>
-            
+# Seções estáticas: montadas uma única vez na importação do módulo
+_STEPS_HTML = """
             <div style="background-color: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
                 <h3>🔄 Etapas Executadas</h3>
                 <ul>
@@ -126,7 +228,43 @@ def create_email_body(status, repository, actor, sha, branch, run_id, workflow):
                     <li>John Gabriel (Colaborador)</li>
                 </ul>
             </div>
+"""
+
+_STEPS_TEXT = """Etapas Executadas:
+  - Tests: Execução dos testes unitários
+  - Build: Empacotamento da aplicação
+  - Artifacts: Armazenamento de artefatos
+  - Notification: Envio desta notificação
+
+Projeto Acadêmico - C14
+Integrantes do Grupo: Eduardo (Owner do repositório), Gustavo (Colaborador), John Gabriel (Colaborador)
+"""
+
+# Templates pré-compilados: só os campos dinâmicos são substituídos a cada renderização
+_HTML_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Pipeline CI/CD Notification</title>
+    </head>
+    <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px;">
+            <h2 style="color: {status_color};">{status_emoji} Pipeline CI/CD - {status}</h2>
             
+            <div style="background-color: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
+                <h3>📋 Informações do Pipeline</h3>
+                <ul>
+                    <li><strong>Repositório:</strong> {repository}</li>
+                    <li><strong>Workflow:</strong> {workflow}</li>
+                    <li><strong>Branch:</strong> {branch}</li>
+                    <li><strong>Commit:</strong> {sha}</li>
+                    <li><strong>Autor:</strong> {actor}</li>
+                    <li><strong>Run ID:</strong> {run_id}</li>
+                    <li><strong>Timestamp:</strong> {timestamp}</li>
+                </ul>
+            </div>
+            ::STEPS::
             <div style="text-align: center; margin-top: 20px; color: #6c757d;">
                 <p>🤖 Mensagem automática do GitHub Actions</p>
                 <p>Gerada em: {timestamp}</p>
@@ -134,30 +272,106 @@ def create_email_body(status, repository, actor, sha, branch, run_id, workflow):
         </div>
     </body>
     </html>
-    """
+    """.replace("::STEPS::", _STEPS_HTML.replace("{", "{{").replace("}", "}}"))
+
+_TEXT_TEMPLATE = """Pipeline CI/CD - {status}
+
+Informações do Pipeline:
+  Repositório: {repository}
+  Workflow: {workflow}
+  Branch: {branch}
+  Commit: {sha}
+  Autor: {actor}
+  Run ID: {run_id}
+  Timestamp: {timestamp}
+
+::STEPS::
+Mensagem automática do GitHub Actions - gerada em {timestamp}
+""".replace("::STEPS::", _STEPS_TEXT.replace("{", "{{").replace("}", "}}"))
+
+_CONTEXT_FIELDS = ('status', 'repository', 'actor', 'sha', 'branch', 'run_id', 'workflow')
+
+# O timestamp muda a cada segundo: fica fora do cache e é encaixado entre os trechos renderizados
+_TEXT_PARTS = tuple(_TEXT_TEMPLATE.split("{timestamp}"))
+_HTML_PARTS = tuple(_HTML_TEMPLATE.split("{timestamp}"))
+
+@functools.lru_cache(maxsize=1024)
+def _render_cached(status, repository, actor, sha, branch, run_id, workflow):
+
+    values = {
+        'status': status, 'repository': repository, 'actor': actor, 'sha': sha,
+        'branch': branch, 'run_id': run_id, 'workflow': workflow
+    }
+    text_parts = tuple(part.format_map(values) for part in _TEXT_PARTS)
+    escaped = {key: html.escape(str(value)) for key, value in values.items()}
+    escaped['status_color'] = "#28a745" if status == "SUCCESS" else "#dc3545"
+    escaped['status_emoji'] = "" if status == "SUCCESS" else ""
+    return text_parts, tuple(part.format_map(escaped) for part in _HTML_PARTS)
+
+def render_email(context, timestamp=None):
+
+    timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+    text_parts, html_parts = _render_cached(*(str(context[field]) for field in _CONTEXT_FIELDS))
+    return timestamp.join(text_parts), html.escape(timestamp).join(html_parts)
+
+def render_emails(contexts, timestamp=None):
+
+    # Um único timestamp para todo o lote; variantes repetidas saem do cache
+    timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+    return [render_email(context, timestamp) for context in contexts]
 
-def print_email_simulation():
+def create_email_body(status, repository, actor, sha, branch, run_id, workflow, timestamp=None):
+
+    context = dict(zip(_CONTEXT_FIELDS, (status, repository, actor, sha, branch, run_id, workflow)))
+    return render_email(context, timestamp)[1]
+
+def benchmark_rendering(count=10000, variants=100):
+
+    base = read_pipeline_context()
+    contexts = [dict(base, status=('SUCCESS', 'FAILURE')[i % 2], run_id=f"run-{i % variants}")
+                for i in range(count)]
+
+    _render_cached.cache_clear()
+    start = time.perf_counter()
+    render_emails(contexts)
+    elapsed = time.perf_counter() - start
+
+    cold = [dict(base, run_id=f"cold-{i}") for i in range(count)]
+    _render_cached.cache_clear()
+    cold_start = time.perf_counter()
+    render_emails(cold)
+    cold_elapsed = time.perf_counter() - cold_start
+
+    print("\n" + "="*60)
+    print(" BENCHMARK DE RENDERIZAÇÃO DE EMAILS")
+    print("="*60)
+    print(f"Renderizações: {count} ({variants} variantes distintas)")
+    print(f"Com cache: {elapsed:.4f}s ({count / elapsed:,.0f} emails/s)")
+    print(f"Sem cache: {cold_elapsed:.4f}s ({count / cold_elapsed:,.0f} emails/s)")
+    print("="*60)
+    return count / elapsed, count / cold_elapsed
+
+def print_email_simulation(context=None):
     """Imprime uma simulação do email que seria enviado"""
+    context = context or read_pipeline_context()
     print("\n" + "="*60)
     print(" SIMULAÇÃO DE ENVIO DE EMAIL")
     print("="*60)
-    print(f"De: {os.getenv('PIPELINE_EMAIL_SENDER', 'noreply@github.com')}")
-    print(f"Para: {os.getenv('PIPELINE_EMAIL_RECIPIENT', 'NÃO DEFINIDO')}")
-    print(f"Assunto: [{os.getenv('PIPELINE_STATUS', 'UNKNOWN')}] Pipeline CI/CD - {os.getenv('GITHUB_REPOSITORY', 'Unknown')}")
+    print(f"De: {context['sender']}")
+    print(f"Para: {context['recipient'] or 'NÃO DEFINIDO'}")
+    print(f"Assunto: [{context['status']}] Pipeline CI/CD - {context['repository']}")
     print("\nConteúdo:")
-    print(f"Status: {os.getenv('PIPELINE_STATUS', 'UNKNOWN')}")
-    print(f"Repositório: {os.getenv('GITHUB_REPOSITORY', 'Unknown')}")
-    print(f"Branch: {os.getenv('GITHUB_REF', 'Unknown').split('/')[-1]}")
-    print(f"Autor: {os.getenv('GITHUB_ACTOR', 'Unknown')}")
-    print(f"Commit: {os.getenv('GITHUB_SHA', 'Unknown')[:8]}")
-    print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
-    print("\n Pipeline executado com sucesso!")
+    print(render_email(context)[0])
     print("="*60)
 
 def main():
 
     print(" Iniciando script de notificação do pipeline...")
     
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark_rendering(int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
+        sys.exit(0)
+    
     # Definir status baseado nos argumentos da linha de comando
     if len(sys.argv) > 1:
         os.environ['PIPELINE_STATUS'] = sys.argv[1].upper()
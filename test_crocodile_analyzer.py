@@ -1,15 +1,39 @@
 #!/usr/bin/env python3
 
 import pytest
+import crocodile_analyzer_terminal
 import pandas as pd
+import numpy as np
 import os
 import sys
+import time
+import gzip
+import bz2
+import io
+import json
+import pickle
+import argparse
+import contextlib
 from unittest.mock import patch, MagicMock
-from crocodile_analyzer_terminal import CrocodileAnalyzer
+from crocodile_analyzer_terminal import ANALYSIS_OPTIONS, CACHE_DIR_NAME, analysis_function_name, analysis_compute_name
+from crocodile_analyzer_terminal import CrocodileAnalyzer, BackgroundPreloader, UsageStatistics, PartitionCatalog, ObservationCube, TextIndex
+from crocodile_analyzer_terminal import ObservationMonitor, follow_observations, read_ndjson
+from crocodile_analyzer_terminal import render_report, main, parse_memory_size
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+import smtplib
+from email.mime.text import MIMEText
+from send_notification import NotificationDispatcher
+import send_notification
+import build_package
+import check_performance
+import threading
+import zipfile
+import tarfile
 
-@pytest.fixture
-def sample_csv_file(tmp_path):
+
+@pytest.fixture(scope="session")
+def sample_csv_file(tmp_path_factory):
     
     csv_content = """Observation ID,Common Name,Scientific Name,Family,Genus,Observed Length (m),Observed Weight (kg),Age Class,Sex,Date of Observation,Country/Region,Habitat Type,Conservation Status,Observer Name,Notes
 1,Morelet's Crocodile,Crocodylus moreletii,Crocodylidae,Crocodylus,1.9,62,Adult,Male,31-03-2018,Belize,Swamps,Least Concern,Allison Hill,Test observation 1
@@ -18,15 +42,80 @@ def sample_csv_file(tmp_path):
 4,Morelet's Crocodile,Crocodylus moreletii,Crocodylidae,Crocodylus,2.42,90.4,Adult,Male,01-11-2019,Mexico,Rivers,Least Concern,Edward Fuller,Test observation 4
 5,Mugger Crocodile,Crocodylus palustris,Crocodylidae,Crocodylus,3.75,269.4,Adult,Unknown,15-07-2019,India,Rivers,Vulnerable,Donald Reid,Test observation 5"""
     
-    csv_file = tmp_path / "test_crocodiles.csv"
+    csv_file = tmp_path_factory.mktemp("sample") / "test_crocodiles.csv"
     csv_file.write_text(csv_content)
     return str(csv_file)
 
 
+# O analisador é compartilhado por toda a sessão: os testes que o usam apenas leem os dados
+@pytest.fixture(scope="session")
+def analyzer(sample_csv_file):
+    return CrocodileAnalyzer(sample_csv_file, verbose=False)
+
+
+@pytest.fixture(autouse=True)
+def user_cache(tmp_path_factory, monkeypatch):
+    # Sessões e caches de reserva nunca vão para o ~/.cache de quem roda os testes
+    directory = tmp_path_factory.mktemp("user-cache")
+    monkeypatch.setenv('XDG_CACHE_HOME', str(directory))
+    return directory
+
+
+@pytest.fixture
+def read_only_csv(tmp_path, sample_csv_file, monkeypatch):
+    # CSV num diretório sem permissão de escrita; o cache do usuário fica dentro de tmp_path
+    directory = tmp_path / "somente_leitura"
+    directory.mkdir()
+    csv_file = directory / "crocodiles.csv"
+    csv_file.write_text(open(sample_csv_file).read())
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / "user-cache"))
+    directory.chmod(0o555)
+    if os.geteuid() == 0:
+        # root ignora as permissões do diretório: a falha de escrita é simulada
+        real_makedirs = os.makedirs
+
+        def makedirs(path, *args, **kwargs):
+            if os.path.abspath(path).startswith(str(directory)):
+                raise PermissionError(13, "Permission denied", str(path))
+            return real_makedirs(path, *args, **kwargs)
+        monkeypatch.setattr(os, 'makedirs', makedirs)
+    yield str(csv_file)
+    directory.chmod(0o755)
+
+
+SCALE_ROWS = int(os.getenv("CROCODILE_SCALE_ROWS", "200000"))
+SCALE_TIME_BUDGET = float(os.getenv("CROCODILE_SCALE_BUDGET", "5.0"))
+
+
+@pytest.fixture(scope="session")
+def scale_csv_file(tmp_path_factory, sample_csv_file):
+    sample = pd.read_csv(sample_csv_file)
+    rng = np.random.default_rng(42)
+    rows = sample.sample(SCALE_ROWS, replace=True, random_state=42).reset_index(drop=True)
+    rows['Observation ID'] = np.arange(1, SCALE_ROWS + 1)
+    rows['Observed Length (m)'] = np.round(rng.uniform(0.3, 6.5, SCALE_ROWS), 2)
+    rows['Observed Weight (kg)'] = np.round(rng.uniform(1, 1000, SCALE_ROWS), 1)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, SCALE_ROWS), unit='D')
+    rows['Date of Observation'] = dates.strftime('%d-%m-%Y')
+    rows['Observer Name'] = [f"Observer {i}" for i in rng.integers(0, SCALE_ROWS // 10, SCALE_ROWS)]
+    rows['Notes'] = [f"Scale observation {i}" for i in range(SCALE_ROWS)]
+
+    csv_file = tmp_path_factory.mktemp("scale") / "scale_crocodiles.csv"
+    rows.to_csv(csv_file, index=False)
+    return str(csv_file)
+
+
+@pytest.fixture(scope="session")
+def scale_analyzer(scale_csv_file):
+    start = time.perf_counter()
+    analyzer = CrocodileAnalyzer(scale_csv_file, verbose=False)
+    analyzer.load_seconds = time.perf_counter() - start
+    return analyzer
+
+
 class TestCrocodileAnalyzer:
     
-    def test_1_initialization_with_valid_file(self, sample_csv_file):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_1_initialization_with_valid_file(self, analyzer, sample_csv_file):
         assert analyzer.csv_file == sample_csv_file
         assert analyzer.data is not None
         assert len(analyzer.data) == 5
@@ -38,8 +127,7 @@ class TestCrocodileAnalyzer:
                 CrocodileAnalyzer("arquivo_inexistente.csv")
                 mock_print.assert_called()
     
-    def test_3_basic_info_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_3_basic_info_function(self, analyzer, capsys):
         analyzer.function_1_basic_info()
         
         captured = capsys.readouterr()
@@ -48,8 +136,7 @@ class TestCrocodileAnalyzer:
         assert "Total de colunas: 15" in captured.out
         assert "Common Name" in captured.out
     
-    def test_4_species_count_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_4_species_count_function(self, analyzer, capsys):
         analyzer.function_2_species_count()
         
         captured = capsys.readouterr()
@@ -58,8 +145,7 @@ class TestCrocodileAnalyzer:
         assert "2 observações" in captured.out
         assert "Total de espécies únicas: 4" in captured.out
     
-    def test_5_size_statistics_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_5_size_statistics_function(self, analyzer, capsys):
         analyzer.function_3_size_statistics()
         
         captured = capsys.readouterr()
@@ -72,9 +158,8 @@ class TestCrocodileAnalyzer:
        
         assert "2.65" in captured.out or "2.64" in captured.out  
 
-    def test_6_weight_statistics_function(self, sample_csv_file, capsys):
+    def test_6_weight_statistics_function(self, analyzer, capsys):
 
-        analyzer = CrocodileAnalyzer(sample_csv_file)
         analyzer.function_4_weight_statistics()
         
         captured = capsys.readouterr()
@@ -88,8 +173,7 @@ class TestCrocodileAnalyzer:
         assert "1º Quartil:" in captured.out
         assert "3º Quartil:" in captured.out
     
-    def test_7_habitat_distribution_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_7_habitat_distribution_function(self, analyzer, capsys):
         analyzer.function_5_habitat_distribution()
         
         captured = capsys.readouterr()
@@ -101,8 +185,7 @@ class TestCrocodileAnalyzer:
         assert "20.0%" in captured.out 
         assert "40.0%" in captured.out  
     
-    def test_8_sex_distribution_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_8_sex_distribution_function(self, analyzer, capsys):
         analyzer.function_8_sex_distribution()
         
         captured = capsys.readouterr()
@@ -115,8 +198,7 @@ class TestCrocodileAnalyzer:
         assert "60.0%" in captured.out  # Male
         assert "40.0%" in captured.out  # Unknown
     
-    def test_9_country_analysis_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_9_country_analysis_function(self, analyzer, capsys):
         analyzer.function_9_country_analysis()
         
         captured = capsys.readouterr()
@@ -131,8 +213,7 @@ class TestCrocodileAnalyzer:
         assert "40.0%" in captured.out  # Venezuela
         assert "20.0%" in captured.out  # Outros países
     
-    def test_10_largest_specimens_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_10_largest_specimens_function(self, analyzer, capsys):
         analyzer.function_10_largest_specimens()
         
         captured = capsys.readouterr()
@@ -146,8 +227,7 @@ class TestCrocodileAnalyzer:
         first_specimen_line = next(line for line in lines if "1." in line and "m |" in line)
         assert "4.09" in first_specimen_line
         
-    def test_11_heaviest_specimens_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_11_heaviest_specimens_function(self, analyzer, capsys):
         analyzer.function_11_heaviest_specimens()
         
         captured = capsys.readouterr()
@@ -161,8 +241,7 @@ class TestCrocodileAnalyzer:
         first_specimen_line = next(line for line in lines if "1." in line and "kg |" in line)
         assert "334.5" in first_specimen_line
     
-    def test_12_size_categories_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_12_size_categories_function(self, analyzer, capsys):
         analyzer.function_12_size_categories()
         
         captured = capsys.readouterr()
@@ -178,8 +257,7 @@ class TestCrocodileAnalyzer:
         assert "40.0%" in captured.out  # 2 Médios
         # 2 Grandes também serão 40%
     
-    def test_13_yearly_observations_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_13_yearly_observations_function(self, analyzer, capsys):
         analyzer.function_13_yearly_observations()
         
         captured = capsys.readouterr()
@@ -192,8 +270,7 @@ class TestCrocodileAnalyzer:
         assert "2018" in captured.out
         assert "2019" in captured.out
     
-    def test_14_correlation_analysis_function(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_14_correlation_analysis_function(self, analyzer, capsys):
         analyzer.function_14_correlation_analysis()
         
         captured = capsys.readouterr()
@@ -211,8 +288,7 @@ class TestCrocodileAnalyzer:
         ]
         assert any(pattern in captured.out for pattern in correlation_patterns)
 
-    def test_15_species_by_habitat(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_15_species_by_habitat(self, analyzer, capsys):
         analyzer.function_15_species_by_habitat()
 
         captured = capsys.readouterr()
@@ -224,8 +300,7 @@ class TestCrocodileAnalyzer:
         assert "espécies diferentes" in captured.out
 
 
-    def test_16_adult_vs_juvenile(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_16_adult_vs_juvenile(self, analyzer, capsys):
         analyzer.function_16_adult_vs_juvenile()
 
         captured = capsys.readouterr()
@@ -237,8 +312,7 @@ class TestCrocodileAnalyzer:
         assert "observações" in captured.out
 
 
-    def test_17_endangered_species(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_17_endangered_species(self, analyzer, capsys):
         analyzer.function_17_endangered_species()
 
         captured = capsys.readouterr()
@@ -249,8 +323,7 @@ class TestCrocodileAnalyzer:
         assert "Orinoco Crocodile" in captured.out or "Mugger Crocodile" in captured.out
 
 
-    def test_18_observer_statistics(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_18_observer_statistics(self, analyzer, capsys):
         analyzer.function_18_observer_statistics()
 
         captured = capsys.readouterr()
@@ -263,8 +336,7 @@ class TestCrocodileAnalyzer:
         assert "Brandon Hall" in captured.out
 
 
-    def test_19_missing_data_analysis(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_19_missing_data_analysis(self, analyzer, capsys):
         analyzer.function_19_missing_data_analysis()
 
         captured = capsys.readouterr()
@@ -274,8 +346,7 @@ class TestCrocodileAnalyzer:
         assert "Total de registros: 5" in captured.out
 
 
-    def test_20_summary_report(self, sample_csv_file, capsys):
-        analyzer = CrocodileAnalyzer(sample_csv_file)
+    def test_20_summary_report(self, analyzer, capsys):
         analyzer.function_20_summary_report()
 
         captured = capsys.readouterr()
@@ -289,6 +360,986 @@ class TestCrocodileAnalyzer:
         assert "Peso:" in captured.out
         assert "Espécies em perigo crítico/extinção:" in captured.out
         assert "Completude média" in captured.out
-        
+
+
+    def test_21_computed_results_are_memoized(self, sample_csv_file):
+        analyzer = CrocodileAnalyzer(sample_csv_file)
+        first = analyzer.compute_species_count()
+
+        assert analyzer.is_computed(2)
+        assert analyzer.compute_species_count() is first
+        assert first["Morelet's Crocodile"] == 2
+
+        analyzer.clear_cache()
+        assert not analyzer.is_computed(2)
+
+
+    def test_22_background_preloader_ranks_by_usage(self, sample_csv_file, capsys):
+        usage = UsageStatistics(str(os.path.join(os.path.dirname(sample_csv_file), "usage.json")))
+        usage.record(17)
+        usage.record(17)
+        usage.record(5)
+        assert usage.ranking()[:2] == [17, 5]
+
+        preloader = BackgroundPreloader(sample_csv_file, top_n=2)
+        preloader.usage = usage
+        preloader.start()
+        analyzer = preloader.get_analyzer(timeout=10)
+        preloader.wait_until_idle(timeout=10)
+
+        assert len(analyzer.data) == 5
+        assert analyzer.is_computed(17)
+        assert analyzer.is_computed(5)
+        assert not analyzer.is_computed(12)
+
+        analyzer.function_17_endangered_species()
+        captured = capsys.readouterr()
+        assert "Dataset carregado" not in captured.out
+        assert "Orinoco Crocodile" in captured.out
+
+
+    def test_23_partitioned_dataset_prunes_partitions(self, sample_csv_file, tmp_path):
+        data = pd.read_csv(sample_csv_file)
+        archive = tmp_path / "archive"
+        for country, group in data.groupby('Country/Region'):
+            partition_dir = archive / country
+            partition_dir.mkdir(parents=True)
+            group.to_csv(partition_dir / "part-0.csv", index=False)
+
+        catalog = PartitionCatalog(str(archive))
+        assert len(catalog.partitions) == 4
+        assert catalog.total_rows() == 5
+        venezuela = next(p for p in catalog.partitions if 'Venezuela' in p['countries'])
+        assert venezuela['rows'] == 2
+        assert venezuela['min_date'] == '2010-12-07'
+        assert venezuela['max_date'] == '2015-01-28'
+
+        analyzer = CrocodileAnalyzer(str(archive))
+        assert len(analyzer.data) == 5
+
+        restricted = analyzer.restrict(country='Venezuela', year=2015)
+        assert len(restricted.partitions_read) == 1
+        assert len(restricted.data) == 1
+        assert restricted.data.iloc[0]['Common Name'] == 'American Crocodile'
+
+        by_species = CrocodileAnalyzer(str(archive), filters={'species': "Morelet's Crocodile"})
+        assert len(by_species.partitions_read) == 2
+        assert len(by_species.data) == 2
+
+
+    def test_24_compressed_input_is_streamed(self, sample_csv_file, tmp_path):
+        with open(sample_csv_file, 'rb') as f:
+            raw = f.read()
+        gz_file = tmp_path / "observations.csv.gz"
+        gz_file.write_bytes(gzip.compress(raw))
+        bz2_file = tmp_path / "observations.csv.bz2"
+        bz2_file.write_bytes(bz2.compress(raw))
+
+        expected = pd.read_csv(sample_csv_file)
+        for compressed_file in (gz_file, bz2_file):
+            analyzer = CrocodileAnalyzer(str(compressed_file))
+            pd.testing.assert_frame_equal(analyzer.logical_frame(), expected)
+
+        with patch('crocodile_analyzer_terminal.READ_CHUNK_ROWS', 2):
+            analyzer = CrocodileAnalyzer(str(gz_file), filters={'country': 'Venezuela'})
+        assert len(analyzer.data) == 2
+
+
+    def test_25_zstd_input_is_streamed(self, sample_csv_file, tmp_path):
+        zstandard = pytest.importorskip("zstandard")
+        with open(sample_csv_file, 'rb') as f:
+            raw = f.read()
+        zst_file = tmp_path / "observations.csv.zst"
+        zst_file.write_bytes(zstandard.ZstdCompressor().compress(raw))
+
+        analyzer = CrocodileAnalyzer(str(zst_file))
+        pd.testing.assert_frame_equal(analyzer.logical_frame(), pd.read_csv(sample_csv_file))
+
+
+    def test_26_region_rollups(self, analyzer, capsys):
+
+        continents = analyzer.region_rollup('Continent').set_index('Continent')
+        assert continents.loc['South America', 'count'] == 2
+        assert continents.loc['North America', 'count'] == 2
+        assert continents.loc['Asia', 'count'] == 1
+        assert continents.loc['South America', 'length_mean'] == pytest.approx((4.09 + 1.08) / 2)
+        assert continents.loc['South America', 'weight_max'] == 334.5
+        assert continents.loc['North America', 'length_std'] == pytest.approx(pd.Series([1.9, 2.42]).std())
+
+        vulnerable = analyzer.region_rollup('Realm', by=('Common Name',), **{'Conservation Status': 'Vulnerable'})
+        assert set(vulnerable['Common Name']) == {'American Crocodile', 'Mugger Crocodile'}
+        assert vulnerable['count'].sum() == 2
+
+        analyzer.function_9_country_analysis()
+        captured = capsys.readouterr()
+        assert "POR CONTINENTE:" in captured.out
+        assert "North America" in captured.out
+        assert "Neotropical" in captured.out
+
+
+    def test_27_cube_answers_slices_and_persists(self, sample_csv_file):
+        analyzer = CrocodileAnalyzer(sample_csv_file)
+        cube = analyzer.compute_cube()
+
+        assert cube.total() == 5
+        assert cube.value_counts('Sex').to_dict() == {'Male': 3, 'Unknown': 2}
+        assert cube.total(where={'Country/Region': 'Venezuela', 'Age Class': 'Adult'}) == 1
+
+        rivers = cube.summary(by=['Habitat Type'], where={'Habitat Type': 'Rivers'}).iloc[0]
+        assert rivers['count'] == 2
+        assert rivers['length_mean'] == pytest.approx((2.42 + 3.75) / 2)
+        assert rivers['weight_min'] == 90.4
+
+        overall = cube.summary().iloc[0]
+        assert overall['weight_sum'] == pytest.approx(analyzer.data['Observed Weight (kg)'].sum())
+        assert overall['length_std'] == pytest.approx(analyzer.data['Observed Length (m)'].std())
+
+        with patch.object(ObservationCube, 'build', side_effect=AssertionError("cube rebuilt")):
+            restored = CrocodileAnalyzer(sample_csv_file).compute_cube()
+        pd.testing.assert_frame_equal(restored.cells, cube.cells, check_dtype=False, check_categorical=False)
+
+
+    def test_30_observer_index_is_updated_incrementally(self, sample_csv_file):
+        analyzer = CrocodileAnalyzer(sample_csv_file, verbose=False)
+        profile = analyzer.observer_profile('Brandon Hall')
+
+        assert profile['count'] == 1
+        assert profile['species'] == {'American Crocodile'}
+        assert profile['length_mean'] == pytest.approx(4.09)
+
+        added = analyzer.ingest([
+            {'Observation ID': 6, 'Common Name': 'Orinoco Crocodile', 'Observed Length (m)': 3.0,
+             'Observed Weight (kg)': 150.0, 'Date of Observation': '10-02-2021',
+             'Country/Region': 'Colombia', 'Observer Name': 'Brandon Hall'},
+            {'Observation ID': 7, 'Common Name': 'American Crocodile', 'Observed Length (m)': 2.0,
+             'Observed Weight (kg)': 80.0, 'Date of Observation': '11-02-2021',
+             'Country/Region': 'Venezuela', 'Observer Name': 'Brandon Hall'}
+        ])
+        assert added == 2
+
+        profile = analyzer.observer_profile('Brandon Hall')
+        assert profile['count'] == 3
+        assert profile['species'] == {'American Crocodile', 'Orinoco Crocodile'}
+        assert profile['countries'] == {'Venezuela', 'Colombia'}
+        assert profile['last_date'] == pd.Timestamp('2021-02-11')
+        assert profile['length_mean'] == pytest.approx((4.09 + 3.0 + 2.0) / 3)
+        assert profile['weight_max'] == 334.5
+        assert analyzer.observer_index.top(1) == [('Brandon Hall', 3)]
+        assert analyzer.compute_observer_statistics()['observations'] == 7
+
+    def test_31_cohort_comparison(self, analyzer):
+        comparison = analyzer.compare_cohorts('Sex', permutations=200, seed=7)
+        levels = comparison['levels'].set_index('Sex')
+        assert levels.loc['Male', 'count'] == 3
+        assert levels.loc['Unknown', 'length_mean'] == pytest.approx((1.08 + 3.75) / 2)
+
+        pair = comparison['pairs'].iloc[0]
+        male = analyzer.data.loc[analyzer.data['Sex'] == 'Male', 'Observed Length (m)']
+        unknown = analyzer.data.loc[analyzer.data['Sex'] == 'Unknown', 'Observed Length (m)']
+        pooled = (((len(male) - 1) * male.var() + (len(unknown) - 1) * unknown.var()) / 3) ** 0.5
+        assert (pair['level_a'], pair['level_b']) == ('Male', 'Unknown')
+        assert pair['length_diff'] == pytest.approx(male.mean() - unknown.mean())
+        assert pair['length_cohen_d'] == pytest.approx((male.mean() - unknown.mean()) / pooled)
+        assert 0 < pair['length_p_value'] <= 1
+
+        parallel = analyzer.compare_cohorts('Sex', permutations=200, seed=7, workers=2)
+        pd.testing.assert_frame_equal(parallel['pairs'], comparison['pairs'])
+
+        with pytest.raises(ValueError):
+            analyzer.compare_cohorts('Age Class', pairs=[('Adult', 'Hatchling')])
+
+    def test_32_text_search_index(self, sample_csv_file, capsys):
+        analyzer = CrocodileAnalyzer(sample_csv_file, verbose=False)
+
+        assert list(analyzer.search_rows('observation 2')) == [1]
+        assert list(analyzer.search_rows('moreletii')) == [0, 3]
+        assert list(analyzer.search_rows('croc*', where={'Country/Region': 'Venezuela'})) == [1, 2]
+        assert list(analyzer.search('Hall')['Observer Name']) == ['Brandon Hall']
+        assert len(analyzer.search('nonexistent')) == 0
+
+        subset = analyzer.search_analyzer('moreletii')
+        subset.function_2_species_count()
+        captured = capsys.readouterr()
+        assert "Morelet's Crocodile" in captured.out
+        assert "Total de espécies únicas: 1" in captured.out
+
+        analyzer.ingest([{'Observation ID': 6, 'Common Name': 'Nile Crocodile', 'Observer Name': 'Ana Lima',
+                          'Notes': 'Injured tail, limping'}])
+        assert list(analyzer.search_rows('injur*')) == [5]
+
+        with patch.object(TextIndex, 'build', side_effect=AssertionError("index rebuilt")):
+            restored = CrocodileAnalyzer(sample_csv_file, verbose=False)
+            assert list(restored.search_rows('moreletii')) == [0, 3]
+
+    def test_33_taxonomy_dimension_table(self, sample_csv_file, capsys):
+        analyzer = CrocodileAnalyzer(sample_csv_file, verbose=False)
+
+        assert 'Scientific Name' not in analyzer.data.columns
+        assert isinstance(analyzer.data['Common Name'].dtype, pd.CategoricalDtype)
+        assert list(analyzer.taxonomy['Common Name']) == ["Morelet's Crocodile", 'American Crocodile',
+                                                          'Orinoco Crocodile', 'Mugger Crocodile']
+        pd.testing.assert_frame_equal(analyzer.logical_frame(), pd.read_csv(sample_csv_file))
+        assert analyzer.missing_counts()['Family'] == 0
+
+        analyzer.function_21_taxonomy_rollup()
+        captured = capsys.readouterr()
+        assert "POR FAMÍLIA:" in captured.out
+        assert "Crocodylidae" in captured.out
+        assert "4 espécies" in captured.out
+
+        analyzer.ingest([{'Observation ID': 6, 'Common Name': 'Nile Crocodile', 'Scientific Name': 'Crocodylus niloticus',
+                          'Family': 'Crocodylidae', 'Genus': 'Crocodylus', 'Observed Length (m)': 4.5}])
+        assert analyzer.taxonomy is not None and len(analyzer.taxonomy) == 5
+        assert analyzer.compute_taxonomy_level('Genus').iloc[0]['count'] == 6
+
+        analyzer.ingest([{'Observation ID': 7, 'Common Name': 'Nile Crocodile', 'Scientific Name': 'Crocodylus niloticus',
+                          'Family': 'Crocodylidae', 'Genus': 'Mecistops'}])
+        assert analyzer.taxonomy is None
+        assert list(analyzer.data['Genus'].iloc[-2:]) == ['Crocodylus', 'Mecistops']
+
+    def test_34_monitor_sliding_window_and_alerts(self, sample_csv_file, tmp_path):
+        def sighting(date, species='Nile Crocodile', status='Least Concern'):
+            return {'Date of Observation': date, 'Common Name': species,
+                    'Country/Region': 'Egypt', 'Conservation Status': status}
+
+        monitor = ObservationMonitor(window_days=3, endangered_share=0.5, species_threshold=2)
+        assert monitor.add([sighting('01-01-2020'), sighting('02-01-2020', 'Orinoco Crocodile', 'Critically Endangered')]) == \
+            ["Participação de espécies ameaçadas em 50.0% (limite 50.0%)"]
+        assert monitor.add([sighting('03-01-2020')]) == ["Nile Crocodile: 2 avistamentos em 3 dias (limite 2)"]
+        assert monitor.total == 3
+
+        # 04-01 empurra 01-01 para fora da janela; registros antigos demais são descartados
+        assert monitor.add([sighting('04-01-2020', 'Orinoco Crocodile'), sighting('15-12-2019')]) == \
+            ["Orinoco Crocodile: 2 avistamentos em 3 dias (limite 2)"]
+        assert monitor.total == 3
+        assert monitor.discarded == 1
+        assert monitor.species == {'Orinoco Crocodile': 2, 'Nile Crocodile': 1}
+        assert "ALERTAS ATIVOS:" in monitor.render()
+
+        monitor.add([sighting('10-01-2020')])
+        assert monitor.total == 1
+        assert monitor.active_alerts == {}
+
+        csv_file = tmp_path / "live.csv"
+        lines = open(sample_csv_file).read().splitlines(keepends=True)
+        csv_file.write_text(''.join(lines[:3]) + lines[3].rstrip('\n'))
+        batches = list(follow_observations(str(csv_file), follow=False))
+        assert sum(len(batch) for batch in batches) == 2
+
+        ndjson = io.StringIO('\n'.join(json.dumps(sighting('05-01-2020')) for _ in range(3)) + '\nnot json\n')
+        assert [len(batch) for batch in read_ndjson(ndjson, batch_rows=2)] == [2, 1]
+
+    def test_35_report_rendering_and_export(self, analyzer, sample_csv_file, tmp_path, capsys):
+        analyzer.function_2_species_count()
+        assert render_report(analyzer, [2]) == capsys.readouterr().out
+
+        report = json.loads(render_report(analyzer, fmt='json'))
+        assert [entry['option'] for entry in report['analyses']] == sorted(ANALYSIS_OPTIONS)
+        species = report['analyses'][1]['tables']['species_count']
+        assert species[0] == {'Common Name': "Morelet's Crocodile", 'count': 2}
+
+        rows = render_report(analyzer, [3], fmt='csv').splitlines()
+        assert rows[0] == 'analysis,table,row,column,value'
+        assert 'function_3_size_statistics,size_statistics,0,valor,2.648' in rows
+
+        markdown = render_report(analyzer, [6], fmt='markdown')
+        assert "## 6. Status de conservação" in markdown
+        assert "| Vulnerable | 2 |" in markdown
+
+        with pytest.raises(ValueError):
+            render_report(analyzer, [1], fmt='xml')
+
+        output = tmp_path / "relatorio.md"
+        main([sample_csv_file, '--report', str(output)])
+        assert "Relatório salvo em" in capsys.readouterr().out
+        assert output.read_text(encoding='utf-8').startswith("# Relatório do dataset de crocodilos")
+        assert "## 21. Observações por família e gênero" in output.read_text(encoding='utf-8')
+
+    def test_36_stratified_sampling_with_refinement(self, sample_csv_file, tmp_path):
+        rng = np.random.default_rng(0)
+        rows = pd.read_csv(sample_csv_file).sample(6000, replace=True, random_state=0).reset_index(drop=True)
+        rows['Observed Length (m)'] = np.round(rng.uniform(0.5, 6.0, len(rows)), 2)
+        csv_file = tmp_path / "large.csv"
+        rows.to_csv(csv_file, index=False)
+
+        with patch('crocodile_analyzer_terminal.READ_CHUNK_ROWS', 1000):
+            sampled = CrocodileAnalyzer(str(csv_file), verbose=False, sample=50)
+        exact = CrocodileAnalyzer(str(csv_file), verbose=False)
+
+        assert sampled.sampling and len(sampled.data) == 5 * 50
+        assert sampled.total_rows == 6000
+        assert sampled.weights.sum() == pytest.approx(6000)
+        # Espécie é dimensão do estrato: a contagem estimada é exata
+        assert sampled.compute_species_count().to_dict() == exact.compute_species_count().to_dict()
+        assert "Contagens exatas" in sampled.sampling_note(2)
+
+        margin = sampled.compute_sampling_error(3)['mean']
+        assert 0 < margin < 0.5
+        assert abs(sampled.compute_size_statistics()['mean'] - exact.compute_size_statistics()['mean']) < 4 * margin
+        assert "[Amostra estratificada: 250 de 6000 observações]" in render_report(sampled, [3])
+
+        # A amostra indexa só as próprias linhas e não usa nem grava o índice do dataset completo
+        assert len(sampled.search('observation')) == 250
+        assert not any(name.startswith('text-') for name in os.listdir(tmp_path / CACHE_DIR_NAME))
+        assert len(exact.search_rows('observation')) == 6000
+        resampled = CrocodileAnalyzer(str(csv_file), verbose=False, sample=50)
+        assert len(resampled.search('observation')) == 250
+
+        with pytest.raises(ValueError):
+            sampled.ingest([{'Common Name': 'Nile Crocodile'}])
+
+        sampled.refine_exact()
+        assert sampled.wait_for_exact(timeout=30)
+        assert not sampled.sampling and len(sampled.data) == 6000
+        assert sampled.compute_size_statistics()['mean'] == pytest.approx(exact.compute_size_statistics()['mean'])
+        assert sampled.sampling_note(3) == ''
+
+    def test_58_imbalanced_sample_estimates_every_option(self, sample_csv_file, tmp_path, monkeypatch):
+        # Um estrato grande (peso 7.5) com medidas, habitats e observadores próprios e quatro
+        # estratos pequenos amostrados por inteiro: qualquer análise sem pesos se afasta do exato
+        rng = np.random.default_rng(7)
+        base = pd.read_csv(sample_csv_file)
+        big = base.loc[[0] * 3000].reset_index(drop=True)
+        big['Observed Length (m)'] = np.round(rng.uniform(4.0, 6.0, len(big)), 2)
+        big['Observed Weight (kg)'] = np.round(rng.uniform(300, 900, len(big)), 1)
+        big.loc[rng.choice(len(big), 300, replace=False), 'Observed Weight (kg)'] = np.nan
+        big['Habitat Type'] = rng.choice(['Swamps', 'Rivers'], len(big), p=[0.7, 0.3])
+        big['Age Class'] = rng.choice(['Adult', 'Juvenile'], len(big), p=[0.8, 0.2])
+        big['Sex'] = rng.choice(['Male', 'Female'], len(big))
+        big['Observer Name'] = rng.choice(['Big A', 'Big B', 'Big C'], len(big), p=[0.5, 0.3, 0.2])
+        small = base.loc[[1, 2, 3, 4] * 40].reset_index(drop=True)
+        small['Observed Length (m)'] = np.round(rng.uniform(0.5, 2.0, len(small)), 2)
+        small['Observed Weight (kg)'] = np.round(rng.uniform(5, 100, len(small)), 1)
+        rows = pd.concat([big, small], ignore_index=True)
+        dates = pd.Timestamp('2010-01-01') + pd.to_timedelta(rng.integers(0, 3000, len(rows)), unit='D')
+        rows['Date of Observation'] = dates.strftime('%d-%m-%Y')
+        rows['Observation ID'] = np.arange(1, len(rows) + 1)
+        csv_file = tmp_path / "imbalanced.csv"
+        rows.to_csv(csv_file, index=False)
+
+        # Semente fixa: a amostra e as tolerâncias abaixo não variam entre execuções
+        reservoir = crocodile_analyzer_terminal.StratifiedReservoir
+        monkeypatch.setattr(crocodile_analyzer_terminal, 'StratifiedReservoir',
+                            lambda per_stratum: reservoir(per_stratum, seed=2024))
+        sampled = CrocodileAnalyzer(str(csv_file), verbose=False, sample=400)
+        exact = CrocodileAnalyzer(str(csv_file), verbose=False)
+        total = exact.total_rows
+        assert sampled.total_rows == total == 3160 and len(sampled.data) == 560
+
+        def close_counts(estimated, expected, tolerance=0.1):
+            estimated, expected = pd.Series(estimated), pd.Series(expected)
+            assert set(estimated.index) <= set(expected.index)
+            assert (estimated.reindex(expected.index, fill_value=0) - expected).abs().max() <= tolerance * total
+
+        def close_statistics(estimated, expected):
+            for key in ('mean', 'median', 'q1', 'q3'):
+                assert estimated[key] == pytest.approx(expected[key], abs=0.2 * expected['std'])
+            assert estimated['std'] == pytest.approx(expected['std'], rel=0.15)
+            assert estimated['count'] == pytest.approx(expected['count'], abs=0.06 * total)
+
+        assert sampled.compute_basic_info()['rows'] == total
+        for option in (2, 5, 6, 7, 8, 9, 12, 13):
+            compute = getattr(sampled, analysis_compute_name(option))
+            close_counts(compute(), getattr(exact, analysis_compute_name(option))())
+        close_statistics(sampled.compute_size_statistics(), exact.compute_size_statistics())
+        close_statistics(sampled.compute_weight_statistics(), exact.compute_weight_statistics())
+        assert sampled.compute_correlation_analysis()['correlation'] == \
+            pytest.approx(exact.compute_correlation_analysis()['correlation'], abs=0.1)
+
+        for age_class, cohort in exact.compute_adult_vs_juvenile().items():
+            estimated = sampled.compute_adult_vs_juvenile()[age_class]
+            assert estimated['count'] == pytest.approx(cohort['count'], abs=0.1 * total)
+            assert estimated['mean_length'] == pytest.approx(cohort['mean_length'], abs=0.4)
+        # Coorte fora do cubo: agregada com os pesos da amostra
+        observers = sampled.compute_cohort_statistics('Observer Name').set_index('Observer Name')
+        expected = exact.compute_cohort_statistics('Observer Name').set_index('Observer Name')
+        close_counts(observers['count'], expected['count'])
+        assert observers.at['Big A', 'weight_mean'] == pytest.approx(expected.at['Big A', 'weight_mean'], rel=0.1)
+
+        endangered = sampled.compute_endangered_species().set_index(['Common Name', 'Conservation Status'])
+        close_counts(endangered['Count'], exact.compute_endangered_species()
+                     .set_index(['Common Name', 'Conservation Status'])['Count'])
+
+        observer_stats = sampled.compute_observer_statistics()
+        exact_observers = exact.compute_observer_statistics()
+        assert observer_stats['observers'] is None
+        assert observer_stats['observations'] == exact_observers['observations']
+        assert [name for name, _ in observer_stats['top'][:3]] == [name for name, _ in exact_observers['top'][:3]]
+        close_counts(dict(observer_stats['top']), dict(exact_observers['top']))
+
+        close_counts(sampled.compute_missing_data_analysis()['missing'], exact.compute_missing_data_analysis()['missing'])
+
+        summary, exact_summary = sampled.compute_summary_report(), exact.compute_summary_report()
+        assert (summary['species'], summary['countries']) == (exact_summary['species'], exact_summary['countries'])
+        assert summary['habitats'] is None and summary['observers'] is None
+        for measure in ('length', 'weight'):
+            assert list(summary[measure].index) == list(exact_summary[measure].index)
+            assert summary[measure]['mean'] == pytest.approx(exact_summary[measure]['mean'],
+                                                             abs=0.2 * exact_summary[measure]['std'])
+            assert summary[measure]['count'] == pytest.approx(exact_summary[measure]['count'], abs=0.06 * total)
+        close_counts(summary['conservation'], exact_summary['conservation'])
+        assert (summary['completeness'] - exact_summary['completeness']).abs().max() < 5
+
+        for level, rollup in exact.compute_taxonomy_rollup().items():
+            close_counts(sampled.compute_taxonomy_rollup()[level].set_index(level)['count'],
+                         rollup.set_index(level)['count'])
+
+        # Extremos e pares distintos não se estimam: recusados, com o motivo no relatório
+        for option in (10, 11, 15):
+            with pytest.raises(ValueError):
+                getattr(sampled, analysis_compute_name(option))()
+            assert "Análise indisponível na amostra" in render_report(sampled, [option])
+        report = render_report(sampled)
+        assert "Observadores: não estimável a partir da amostra" in report
+        assert json.loads(render_report(sampled, [10], fmt='json'))['analyses'][0]['tables'] == {}
+        sampled.precompute(ANALYSIS_OPTIONS)
+
+    def test_59_refine_never_swaps_mid_analysis(self, sample_csv_file, tmp_path, monkeypatch, capsys):
+        rows = pd.read_csv(sample_csv_file).sample(2000, replace=True, random_state=3).reset_index(drop=True)
+        csv_file = tmp_path / "refine.csv"
+        rows.to_csv(csv_file, index=False)
+        sampled = CrocodileAnalyzer(str(csv_file), verbose=False, sample=20)
+        original = CrocodileAnalyzer._weighted_value_counts
+
+        def counts_during_refine(self, values):
+            # O refinamento começa no meio da análise e ganha tempo para tentar trocar os dados
+            if self._refine_thread is None:
+                self.refine_exact()
+                self.refined.wait(timeout=1)
+            return original(self, values)
+
+        monkeypatch.setattr(CrocodileAnalyzer, '_weighted_value_counts', counts_during_refine)
+        estimated = sampled.compute_observer_statistics()
+        assert estimated['observers'] is None and estimated['observations'] == 2000
+        assert sampled.wait_for_exact(timeout=30)
+        assert sampled.compute_observer_statistics()['observers'] == 5
+
+        # Falha ao carregar os dados exatos: registrada no stderr e a amostra continua valendo
+        failing = CrocodileAnalyzer(str(csv_file), verbose=False, sample=20)
+        monkeypatch.setattr(crocodile_analyzer_terminal, 'get_backend', MagicMock(side_effect=RuntimeError("sem memória")))
+        failing.refine_exact().join(timeout=30)
+        assert "Erro ao calcular os resultados exatos: sem memória" in capsys.readouterr().err
+        assert failing.sampling and not failing.refined.is_set()
+        assert failing.compute_size_statistics()['count'] == 2000
+
+    @pytest.mark.parametrize('backend', ['polars', 'duckdb'])
+    def test_37_backend_parity(self, sample_csv_file, backend):
+        pytest.importorskip(backend)
+        rng = np.random.default_rng(1)
+        rows = pd.read_csv(sample_csv_file).sample(3000, replace=True, random_state=1).reset_index(drop=True)
+        rows['Observed Length (m)'] = np.round(rng.uniform(0.3, 6.5, len(rows)), 2)
+        rows.loc[rng.choice(len(rows), 300, replace=False), 'Observed Weight (kg)'] = np.nan
+        rows.loc[rng.choice(len(rows), 50, replace=False), 'Habitat Type'] = np.nan
+        rows.loc[:9, 'Date of Observation'] = 'data inválida'
+
+        reference = CrocodileAnalyzer(sample_csv_file, verbose=False, data=rows)
+        other = CrocodileAnalyzer(sample_csv_file, verbose=False, data=rows, backend=backend)
+        assert other.backend.name == backend
+
+        # Saída idêntica em todas as análises (a 1 mostra a memória do processo)
+        options = [option for option in sorted(ANALYSIS_OPTIONS) if option != 1]
+        assert render_report(other, options) == render_report(reference, options)
+        # Somas em outra ordem podem variar no último bit; os quantis são exatos
+        assert other.compute_size_statistics() == pytest.approx(reference.compute_size_statistics())
+        assert other.compute_weight_statistics()['q1'] == reference.compute_weight_statistics()['q1']
+        pd.testing.assert_series_equal(other.compute_yearly_observations(), reference.compute_yearly_observations())
+        pd.testing.assert_series_equal(other.missing_counts(), reference.missing_counts())
+        # Desvio de grupos constantes é ruído de arredondamento (soma dos quadrados)
+        pd.testing.assert_frame_equal(other.compute_cohort_statistics('Habitat Type'),
+                                      reference.compute_cohort_statistics('Habitat Type'), atol=1e-3)
+        pd.testing.assert_frame_equal(other.compute_cube().cells, reference.compute_cube().cells)
+
+        with pytest.raises(ValueError):
+            CrocodileAnalyzer(sample_csv_file, verbose=False, data=rows, backend='spark')
+
+    def test_38_session_snapshot_restore(self, sample_csv_file, tmp_path, capsys):
+        csv_file = tmp_path / "session.csv"
+        csv_file.write_text(open(sample_csv_file).read())
+        first = CrocodileAnalyzer(str(csv_file), verbose=False, session=True)
+        first.precompute([2, 15, 18])
+        first.search_rows('observation')
+        path = first.save_session()
+        assert os.path.exists(path)
+
+        # Fonte inalterada: nada é relido nem recalculado
+        with patch('crocodile_analyzer_terminal.read_observations') as mock_read:
+            restored = CrocodileAnalyzer(str(csv_file), verbose=True, session=True)
+        mock_read.assert_not_called()
+        assert "Sessão anterior restaurada" in capsys.readouterr().out
+        pd.testing.assert_frame_equal(restored.logical_frame(), first.logical_frame())
+        assert 'compute_species_by_habitat' in restored._memo
+        assert restored._text_index is not None
+        assert render_report(restored, [2, 15, 18]) == render_report(first, [2, 15, 18])
+
+        # Qualquer mudança na fonte troca a impressão digital e a sessão é ignorada
+        with open(csv_file, 'a') as f:
+            f.write("\n6,Nile Crocodile,Crocodylus niloticus,Crocodylidae,Crocodylus,3.1,200,Adult,Male,"
+                    "01-01-2020,Egypt,Rivers,Least Concern,Ana Lima,Test observation 6")
+        reloaded = CrocodileAnalyzer(str(csv_file), verbose=False, session=True)
+        assert len(reloaded.data) == 6 and reloaded._memo == {}
+        assert os.listdir(os.path.dirname(path)).count(os.path.basename(path)) == 1
+        assert os.path.basename(reloaded.save_session()) in os.listdir(os.path.dirname(path))
+        assert not os.path.exists(path)
+
+        # Sessões filtradas convivem com a sessão sem filtros da mesma fonte
+        filtered = CrocodileAnalyzer(str(csv_file), verbose=False, session=True, filters={'country': 'Belize'})
+        filtered_path = filtered.save_session()
+        assert os.path.exists(filtered_path) and os.path.exists(reloaded.save_session())
+        with patch('crocodile_analyzer_terminal.read_observations') as mock_read:
+            restored = CrocodileAnalyzer(str(csv_file), verbose=False, session=True, filters={'country': 'Belize'})
+            CrocodileAnalyzer(str(csv_file), verbose=False, session=True)
+        mock_read.assert_not_called()
+        assert len(restored.data) == 1
+
+        assert CrocodileAnalyzer(str(csv_file), verbose=False, sample=2).save_session() is None
+        assert first.search_analyzer('observation').save_session() is None
+
+    def test_60_session_only_loads_private_files(self, sample_csv_file, tmp_path, user_cache):
+        csv_file = tmp_path / "session.csv"
+        csv_file.write_text(open(sample_csv_file).read())
+        path = CrocodileAnalyzer(str(csv_file), verbose=False, session=True).save_session()
+        assert path.startswith(str(user_cache))
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        assert not (tmp_path / CACHE_DIR_NAME).exists() or \
+            not any(name.endswith('.pkl') for name in os.listdir(tmp_path / CACHE_DIR_NAME))
+
+        marker = tmp_path / "executado"
+
+        class Payload:
+            def __reduce__(self):
+                return (os.mkdir, (str(marker),))
+
+        def plant(target, mode=0o600):
+            with open(target, 'wb') as f:
+                pickle.dump(Payload(), f)
+            os.chmod(target, mode)
+
+        def restores():
+            restored = CrocodileAnalyzer(str(csv_file), verbose=False, session=False).restore_session()
+            assert not marker.exists()
+            return restored
+
+        assert restores()
+        # Arquivo ou diretório acessíveis a outros usuários, ou link simbólico: nunca desserializados
+        plant(path, 0o644)
+        assert not restores()
+        os.chmod(path, 0o600)
+        os.chmod(os.path.dirname(path), 0o755)
+        assert not restores()
+        os.chmod(os.path.dirname(path), 0o700)
+        os.remove(path)
+        plant(tmp_path / "alvo.pkl")
+        os.symlink(tmp_path / "alvo.pkl", path)
+        assert not restores()
+        os.remove(path)
+        if os.geteuid() == 0:
+            plant(path)
+            os.chown(path, 12345, 12345)
+            assert not restores()
+            os.remove(path)
+
+        # Pickle deixado ao lado dos dados, onde ficavam as sessões: ignorado
+        (tmp_path / CACHE_DIR_NAME).mkdir(exist_ok=True)
+        plant(tmp_path / CACHE_DIR_NAME / os.path.basename(path))
+        assert not restores()
+
+    def test_39_memory_ceiling_spills_groupings(self, sample_csv_file):
+        rows = pd.read_csv(sample_csv_file).sample(4000, replace=True, random_state=2).reset_index(drop=True)
+        rows['Observer Name'] = [f"Observador {i % 700}" for i in range(len(rows))]
+        rows.loc[::97, 'Observer Name'] = np.nan
+        reference = CrocodileAnalyzer(sample_csv_file, verbose=False, data=rows)
+        bounded = CrocodileAnalyzer(sample_csv_file, verbose=False, data=rows, memory_limit=20_000)
+
+        # Sem cubo nem índice de observadores: tudo passa pelas partições em disco
+        with patch('crocodile_analyzer_terminal.ObservationCube.build', side_effect=AssertionError), \
+                patch('crocodile_analyzer_terminal.ObserverIndex.build', side_effect=AssertionError):
+            output = render_report(bounded, [15, 17, 18])
+        assert output == render_report(reference, [15, 17, 18])
+        pd.testing.assert_series_equal(bounded.compute_species_by_habitat(), reference.compute_species_by_habitat())
+        pd.testing.assert_frame_equal(bounded.compute_endangered_species(), reference.compute_endangered_species())
+        assert bounded.compute_observer_statistics() == reference.compute_observer_statistics()
+
+        # Um único habitat também se divide entre as partições; sem habitat algum o resultado é vazio
+        for habitat in ['Rivers', np.nan]:
+            single = rows.assign(**{'Habitat Type': habitat})
+            bounded = CrocodileAnalyzer(sample_csv_file, verbose=False, data=single, memory_limit=20_000)
+            reference = CrocodileAnalyzer(sample_csv_file, verbose=False, data=single)
+            pd.testing.assert_series_equal(bounded.compute_species_by_habitat(),
+                                           reference.compute_species_by_habitat())
+            assert render_report(bounded, [15]) == render_report(reference, [15])
+
+        # Teto folgado mantém o caminho em memória
+        roomy = CrocodileAnalyzer(sample_csv_file, verbose=False, data=rows, memory_limit=10 ** 9)
+        roomy.compute_observer_statistics()
+        assert roomy._observer_index is not None
+
+        assert parse_memory_size('512M') == 512 * 1024 ** 2
+        assert parse_memory_size('2g') == 2 * 1024 ** 3
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_memory_size('muito')
+
+    def test_43_read_only_data_directory(self, read_only_csv, tmp_path, monkeypatch):
+        preloader = BackgroundPreloader(read_only_csv, top_n=2).start()
+        assert preloader.get_analyzer(timeout=30) is not None
+        preloader.wait_until_idle(timeout=30)
+        preloader.usage.record(2)
+        assert preloader.usage.path.startswith(str(tmp_path / "user-cache"))
+        assert UsageStatistics(preloader.usage.path).counts == {2: 1}
+        assert not os.path.exists(os.path.join(os.path.dirname(read_only_csv), CACHE_DIR_NAME))
+
+        # Nem o cache do usuário pode ser criado: contagens só em memória
+        blocked = tmp_path / "sem-cache"
+        blocked.write_text("")
+        monkeypatch.setenv('XDG_CACHE_HOME', str(blocked))
+        preloader = BackgroundPreloader(read_only_csv)
+        assert preloader.usage.path is None
+        preloader.usage.record(3)
+        assert preloader.usage.counts == {3: 1}
+
+    def test_44_cube_without_writable_cache(self, read_only_csv, tmp_path, monkeypatch, capsys):
+        blocked = tmp_path / "sem-cache"
+        blocked.write_text("")
+        monkeypatch.setenv('XDG_CACHE_HOME', str(blocked))
+        analyzer = CrocodileAnalyzer(read_only_csv, verbose=False)
+        reference = CrocodileAnalyzer(read_only_csv, verbose=False, data=pd.read_csv(read_only_csv))
+        options = [2, 5, 6, 7, 8, 9, 15, 17, 21]
+        assert render_report(analyzer, options) == render_report(reference, options)
+
+        # Com o cache do usuário disponível o cubo é persistido lá
+        monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / "user-cache"))
+        CrocodileAnalyzer(read_only_csv, verbose=False).compute_cube()
+        assert any(name.startswith('cube-') for _, _, files in os.walk(tmp_path / "user-cache") for name in files)
+
+    def test_45_text_index_without_writable_cache(self, read_only_csv, tmp_path, monkeypatch):
+        blocked = tmp_path / "sem-cache"
+        blocked.write_text("")
+        monkeypatch.setenv('XDG_CACHE_HOME', str(blocked))
+        analyzer = CrocodileAnalyzer(read_only_csv, verbose=False)
+        assert len(analyzer.search_rows('observation')) == 5
+        assert len(analyzer.search('rivers')) == 0 and len(analyzer.search('Mugger')) == 1
+
+        # O preloader termina a construção do índice em memória
+        preloader = BackgroundPreloader(read_only_csv, top_n=0).start()
+        preloader.wait_until_idle(timeout=30)
+        assert preloader.get_analyzer(timeout=0)._text_index is not None
+
+    def test_57_text_report_ignores_other_threads(self, analyzer, capsys, monkeypatch):
+        original = CrocodileAnalyzer.function_2_species_count
+
+        def species_count_with_chatter(self, *args, **kwargs):
+            # Outra thread escreve no stdout enquanto o relatório está sendo montado
+            worker = threading.Thread(target=print, args=("mensagem de outra thread",))
+            worker.start()
+            worker.join()
+            return original(self, *args, **kwargs)
+
+        monkeypatch.setattr(CrocodileAnalyzer, 'function_2_species_count', species_count_with_chatter)
+        report = render_report(analyzer, [1, 2, 3], fmt='text')
+        output = capsys.readouterr().out
+
+        assert "mensagem de outra thread" not in report
+        assert "mensagem de outra thread" in output
+        assert "CONTAGEM POR ESPÉCIE" in report and "CONTAGEM POR ESPÉCIE" not in output
+
+# O grupo mantém o tier de escala em um único worker do xdist (--dist loadgroup),
+# para que o dataset grande seja gerado e carregado uma só vez
+@pytest.mark.scale
+@pytest.mark.xdist_group("scale")
+class TestCrocodileAnalyzerScale:
+
+    def test_28_scale_load_within_budget(self, scale_analyzer):
+        assert len(scale_analyzer.data) == SCALE_ROWS
+        assert scale_analyzer.load_seconds < SCALE_TIME_BUDGET
+
+    @pytest.mark.parametrize("option", sorted(ANALYSIS_OPTIONS))
+    def test_29_scale_analysis_within_budget(self, scale_analyzer, option, capsys):
+        start = time.perf_counter()
+        getattr(scale_analyzer, analysis_function_name(option))()
+        elapsed = time.perf_counter() - start
+
+        captured = capsys.readouterr()
+        assert "=" * 60 in captured.out
+        assert elapsed < SCALE_TIME_BUDGET, f"opção {option} levou {elapsed:.2f}s (limite {SCALE_TIME_BUDGET}s)"
+
+
+
+class FakeSMTP:
+    # Substituto local do servidor SMTP: registra conexões e envios, falha sob demanda
+    instances = []
+    failures = 0
+    refused = set()
+
+    def __init__(self, host, port):
+        if FakeSMTP.failures:
+            FakeSMTP.failures -= 1
+            raise OSError("conexão recusada")
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, sender, recipient, message):
+        if recipient in FakeSMTP.refused:
+            raise smtplib.SMTPRecipientsRefused({recipient: (550, b'mailbox unavailable')})
+        self.sent.append(recipient)
+
+    def quit(self):
+        self.closed = True
+
+
+class TestNotificationDispatcher:
+
+    @pytest.fixture(autouse=True)
+    def fake_smtp(self):
+        FakeSMTP.instances, FakeSMTP.failures, FakeSMTP.refused = [], 0, set()
+        yield FakeSMTP
+
+    def _dispatch(self, recipients, **options):
+        dispatcher = NotificationDispatcher('localhost', 1025, 'ci@example.com', backoff=0,
+                                            smtp_factory=FakeSMTP, **options)
+        # Fila preenchida antes de iniciar: os lotes ficam determinísticos
+        for recipient in recipients:
+            dispatcher.submit(recipient, MIMEText(f"Olá {recipient}"))
+        dispatcher.start()
+        dispatcher.close(timeout=10)
+        return dispatcher
+
+    def test_40_dispatcher_one_connection_per_batch(self):
+        recipients = [f"dev{i}@example.com" for i in range(5)]
+        dispatcher = self._dispatch(recipients, batch_size=2)
+
+        assert dispatcher.sent == recipients and dispatcher.failed == []
+        assert dispatcher.connections == 3
+        assert [smtp.sent for smtp in FakeSMTP.instances] == [recipients[:2], recipients[2:4], recipients[4:]]
+        assert all(smtp.closed for smtp in FakeSMTP.instances)
+
+    def test_41_dispatcher_retries_then_gives_up(self):
+        FakeSMTP.failures = 2
+        dispatcher = self._dispatch(['a@example.com', 'b@example.com'], max_retries=3)
+        assert dispatcher.sent == ['a@example.com', 'b@example.com']
+        assert dispatcher.connections == 1
+
+        FakeSMTP.failures = 10
+        with patch('send_notification.time.sleep') as sleep:
+            dispatcher = NotificationDispatcher('localhost', 1025, 'ci@example.com', max_retries=2, backoff=0.5,
+                                                smtp_factory=FakeSMTP)
+            dispatcher.submit('a@example.com', MIMEText("x"))
+            dispatcher.submit('b@example.com', MIMEText("y"))
+            dispatcher.start()
+            assert not dispatcher.close(timeout=10)
+        assert dispatcher.sent == [] and dispatcher.connections == 0
+        assert [recipient for recipient, _ in dispatcher.failed] == ['a@example.com', 'b@example.com']
+        assert "conexão recusada" in dispatcher.failed[0][1]
+        # Backoff exponencial entre as tentativas, nenhuma espera depois da última
+        assert [call.args[0] for call in sleep.call_args_list] == [0.5, 1.0]
+        assert FakeSMTP.failures == 10 - 3
+
+    def test_42_dispatcher_refused_recipient_fails_alone(self):
+        FakeSMTP.refused = {'b@example.com'}
+        dispatcher = self._dispatch(['a@example.com', 'b@example.com', 'c@example.com'])
+
+        assert dispatcher.sent == ['a@example.com', 'c@example.com']
+        assert [recipient for recipient, _ in dispatcher.failed] == ['b@example.com']
+        assert dispatcher.connections == 1
+
+
+class TestNotificationRendering:
+
+    @pytest.fixture
+    def context(self):
+        send_notification._render_cached.cache_clear()
+        return dict(send_notification.read_pipeline_context('FAILURE'),
+                    repository='grupo/crocodilos', actor='eduardo', sha='abc12345',
+                    branch='<script>alert("x")</script>', run_id='42')
+
+    def test_52_render_email_escapes_html_only(self, context):
+        text_body, html_body = send_notification.render_email(context, '2026-01-01 00:00:00 UTC')
+
+        assert '<script>' not in html_body
+        assert '&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;' in html_body
+        assert 'Branch: <script>alert("x")</script>' in text_body
+        assert html_body.count('2026-01-01 00:00:00 UTC') == 2
+        assert text_body.count('2026-01-01 00:00:00 UTC') == 2
+
+    def test_53_notification_message_has_both_parts(self, context):
+        body = send_notification.render_email(context, '2026-01-01 00:00:00 UTC')
+        message = send_notification.create_notification_message(
+            'ci@example.com', 'dev@example.com', 'FAILURE', 'grupo/crocodilos', body)
+
+        assert message.get_content_type() == 'multipart/alternative'
+        assert message['Subject'] == "[FAILURE] Pipeline CI/CD - grupo/crocodilos"
+        assert message['To'] == 'dev@example.com'
+        parts = message.get_payload()
+        assert [part.get_content_type() for part in parts] == ['text/plain', 'text/html']
+        assert [part.get_payload(decode=True).decode('utf-8') for part in parts] == list(body)
+
+    def test_54_render_cache_ignores_timestamp(self, context):
+        other = dict(context, status='SUCCESS')
+        first = send_notification.render_emails([context, other, context], '2026-01-01 00:00:00 UTC')
+        second = send_notification.render_emails([context, other], '2026-01-01 00:00:01 UTC')
+
+        # Dois contextos distintos: um segundo depois o lote inteiro sai do cache
+        info = send_notification._render_cached.cache_info()
+        assert (info.misses, info.hits) == (2, 3)
+        assert first[0] == first[2]
+        assert '00:00:01 UTC' in second[0][1] and '00:00:00 UTC' not in second[0][1]
+        assert second[0][0] == first[0][0].replace('00:00:00 UTC', '00:00:01 UTC')
+
+
+class TestBuildPackage:
+
+    @pytest.fixture
+    def source_tree(self, tmp_path, monkeypatch):
+        # Árvore mínima do projeto num diretório temporário; a build roda a partir dele
+        monkeypatch.chdir(tmp_path)
+        for env in ('GITHUB_SHA', 'GITHUB_REF', 'GITHUB_REPOSITORY'):
+            monkeypatch.delenv(env, raising=False)
+        (tmp_path / 'crocodile_analyzer_terminal.py').write_text("print('analisador')\n")
+        (tmp_path / 'crocodile_dataset.csv').write_bytes(os.urandom(3000))
+        (tmp_path / 'crocodile_regions.csv').write_text("Country/Region,Continent\nBelize,Americas\n")
+        (tmp_path / 'requirements.txt').write_text("pandas\n")
+        (tmp_path / 'README.md').write_text("# Crocodilos\n")
+        (tmp_path / 'scripts' / 'extra').mkdir(parents=True)
+        (tmp_path / 'scripts' / 'tool.py').write_text("print('tool')\n")
+        (tmp_path / 'scripts' / 'extra' / 'helper.py').write_text("print('helper')\n")
+        fake_pip = MagicMock(returncode=0, stdout='[{"name": "pandas", "version": "3.0"}]')
+        monkeypatch.setattr(build_package.subprocess, 'run', MagicMock(return_value=fake_pip))
+        return tmp_path
+
+    def _build(self, capsys, clean=False):
+        assert build_package.package_application(clean=clean)
+        return capsys.readouterr().out
+
+    def _archives(self):
+        return build_package.archive_filenames(build_package.collect_build_info())
+
+    def test_46_streaming_packager_matches_sources(self, source_tree, monkeypatch):
+        # Blocos pequenos: cada arquivo atravessa as filas em vários pedaços
+        monkeypatch.setattr(build_package, 'CHUNK_SIZE', 7)
+        monkeypatch.setattr(build_package, 'QUEUE_CHUNKS', 2)
+        sources = ['crocodile_dataset.csv', 'README.md', 'scripts/tool.py', 'scripts/extra/helper.py']
+        with build_package.StreamingPackager('pacote.zip', 'pacote.tar.gz', dist_dir='dist') as packager:
+            for source in sources:
+                packager.add_file(source, source)
+
+        expected = {source: (source_tree / source).read_bytes() for source in sources}
+        with zipfile.ZipFile('pacote.zip') as zipf:
+            assert {name: zipf.read(name) for name in zipf.namelist()} == expected
+        with tarfile.open('pacote.tar.gz') as tarf:
+            assert {m.name: tarf.extractfile(m).read() for m in tarf.getmembers()} == expected
+        assert {source: (source_tree / 'dist' / source).read_bytes() for source in sources} == expected
+        assert [record['sha256'] for record in packager.records] == \
+            [build_package.file_sha256(source) for source in sources]
+
+    def test_47_streaming_packager_writer_failure_raises(self, source_tree, monkeypatch):
+        monkeypatch.setattr(build_package, 'CHUNK_SIZE', 7)
+        monkeypatch.setattr(build_package, 'QUEUE_CHUNKS', 2)
+
+        def package(zip_filename, outcome):
+            try:
+                with build_package.StreamingPackager(zip_filename, 'pacote.tar.gz') as packager:
+                    packager.add_file('crocodile_dataset.csv', 'crocodile_dataset.csv')
+                    packager.add_file('README.md', 'README.md')
+            except Exception as e:
+                outcome.append(e)
+
+        # Falha ao abrir o .zip e falha no meio do .tar.gz: o erro chega a quem chamou, sem travar
+        failures = [('inexistente/pacote.zip', None),
+                    ('pacote.zip', patch.object(tarfile.TarFile, 'addfile', side_effect=OSError("disco cheio")))]
+        for zip_filename, failure in failures:
+            outcome = []
+            with failure or contextlib.nullcontext():
+                worker = threading.Thread(target=package, args=(zip_filename, outcome), daemon=True)
+                worker.start()
+                worker.join(timeout=10)
+            assert not worker.is_alive()
+            assert len(outcome) == 1 and isinstance(outcome[0], OSError)
+
+    def test_48_incremental_build_reuses_archives(self, source_tree, capsys):
+        self._build(capsys)
+        zip_filename, tar_filename = self._archives()
+        stamps = [os.stat(name).st_mtime_ns for name in (zip_filename, tar_filename)]
+
+        output = self._build(capsys)
+        assert "pacotes reaproveitados" in output
+        assert [os.stat(name).st_mtime_ns for name in (zip_filename, tar_filename)] == stamps
+
+    def test_49_incremental_build_recopies_changed_file(self, source_tree, capsys):
+        self._build(capsys)
+        (source_tree / 'README.md').write_text("# Crocodilos\n\nNova seção\n")
+        output = self._build(capsys)
+
+        assert " Copiado: README.md" in output
+        assert " Inalterado: crocodile_dataset.csv" in output
+        assert " Inalterado: crocodile_analyzer_terminal.py" in output
+        assert "1 de 7 arquivos alterados" in output
+        assert (source_tree / 'dist' / 'README.md').read_text() == "# Crocodilos\n\nNova seção\n"
+        build_info = json.loads((source_tree / 'dist' / 'build-info.json').read_text())
+        assert build_info['files']['README.md'] == build_package.file_sha256('README.md')
+        with zipfile.ZipFile(self._archives()[0]) as zipf:
+            assert zipf.read('README.md') == (source_tree / 'README.md').read_bytes()
+
+    def test_50_incremental_build_removes_deleted_sources(self, source_tree, capsys):
+        self._build(capsys)
+        assert (source_tree / 'dist' / 'scripts' / 'extra' / 'helper.py').exists()
+        (source_tree / 'scripts' / 'extra' / 'helper.py').unlink()
+        self._build(capsys)
+
+        assert not (source_tree / 'dist' / 'scripts' / 'extra').exists()
+        assert (source_tree / 'dist' / 'scripts' / 'tool.py').exists()
+        with zipfile.ZipFile(self._archives()[0]) as zipf:
+            assert 'scripts/extra/helper.py' not in zipf.namelist()
+
+    def test_51_clean_build_rebuilds_everything(self, source_tree, capsys):
+        self._build(capsys)
+        (source_tree / 'dist' / 'sobra.txt').write_text("arquivo antigo")
+        output = self._build(capsys, clean=True)
+
+        assert "pacotes reaproveitados" not in output and "Inalterado" not in output
+        assert "7 de 7 arquivos alterados" in output
+        assert not (source_tree / 'dist' / 'sobra.txt').exists()
+        assert build_package.subprocess.run.call_count == 2
+
+
+class TestPerformanceGate:
+
+    def _gate(self, tmp_path, monkeypatch, capsys, baseline, results, *args):
+        baseline_file = tmp_path / 'baseline.json'
+        baseline_file.write_text(json.dumps(baseline))
+        monkeypatch.setattr(check_performance, 'run_scenarios', lambda rows, repeats: dict(results))
+        with pytest.raises(SystemExit) as exit_info:
+            check_performance.main(['--baseline', str(baseline_file), '--rows', '1000', *args])
+        return exit_info.value.code, capsys.readouterr().out
+
+    def test_55_perf_gate_scales_baseline_to_machine(self, tmp_path, monkeypatch, capsys):
+        baseline = {'rows': 1000, 'scenarios': {'reference': 0.5, 'load': 0.2, 'function_2_species_count': 0.1}}
+        # Máquina duas vezes mais lenta: tudo dobra e nada regride
+        slower = {'load': 0.4, 'function_2_species_count': 0.2, 'reference': 1.0}
+        code, output = self._gate(tmp_path, monkeypatch, capsys, baseline, slower)
+        assert code == 0 and "fator 2.00" in output
+
+        # Na mesma máquina lenta, só a contagem por espécie piora de verdade
+        regressed = dict(slower, function_2_species_count=0.5)
+        code, output = self._gate(tmp_path, monkeypatch, capsys, baseline, regressed)
+        assert code == 1
+        assert "function_2_species_count: 0.2000s -> 0.5000s" in output
+        assert "load:" not in output.split("FALHA")[1]
+
+        code, output = self._gate(tmp_path, monkeypatch, capsys, baseline, slower, '--absolute')
+        assert code == 1 and "fator" not in output
+
+    def test_56_perf_gate_tolerates_incomplete_baseline(self, tmp_path, monkeypatch, capsys):
+        results = {'load': 0.2, 'reference': 0.5}
+        code, output = self._gate(tmp_path, monkeypatch, capsys, {'scenarios': {'load': 0.2}}, results)
+
+        assert code == 0
+        assert "baseline medida com um número desconhecido de linhas" in output
+        assert "sem o cenário 'reference'" in output
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])